@@ -49,6 +49,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.sites',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     "rest_framework_simplejwt",
@@ -62,6 +63,7 @@ INSTALLED_APPS = [
     'user',
     'recipe',
     'blog_recipes',
+    'thumbnails',
     'django_rest_passwordreset',
     # 'user.apps.UserConfig'
 ]
@@ -114,6 +116,38 @@ DATABASES = {
 }
 
 
+# Caches
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+# The blog_recipes cache holds responses of the read-only blog recipe
+# endpoints. BLOG_CACHE_BACKEND picks locmem, file or redis (redis needs
+# the redis package and REDIS_URL).
+
+BLOG_CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'blog-recipes',
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('BLOG_CACHE_DIR', '/vol/web/cache'),
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ.get('REDIS_URL', 'redis://127.0.0.1:6379'),
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'blog_recipes': {
+        **BLOG_CACHE_BACKENDS[os.environ.get('BLOG_CACHE_BACKEND', 'locmem')],
+        'TIMEOUT': int(os.environ.get('BLOG_CACHE_TIMEOUT', 60 * 60 * 24)),
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -160,6 +194,12 @@ MEDIA_URL = '/static/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+# On-demand thumbnails of uploads. nginx serves them from THUMBNAIL_ROOT
+# once made, and the least recently used are removed past the limit
+THUMBNAIL_ROOT = os.environ.get('THUMBNAIL_ROOT', '/vol/web/thumbnails')
+THUMBNAIL_CACHE_MAX_BYTES = int(
+    os.environ.get('THUMBNAIL_CACHE_MAX_BYTES', 1024 * 1024 * 1024))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -0,0 +1,81 @@
+"""
+Autocomplete latency over 100k synthetic recipe titles
+
+    python manage.py benchmark autocomplete
+"""
+import random
+import statistics
+import string
+import time
+
+from blog_recipes.autocomplete import TitleIndex
+
+
+NUM_TITLES = 100000
+ROUNDS = 20
+FOOD_WORDS = (
+    'chocolate chip cookies banana bread snickerdoodle pumpkin pie lemon '
+    'bars brown butter sugar apple crumble cinnamon rolls vanilla cake '
+    'strawberry shortcake garlic chicken pasta salad soup roasted '
+    'vegetable peanut oatmeal raisin muffins blueberry scones pizza dough '
+    'focaccia sourdough brioche tart cheesecake coconut almond honey '
+    'maple pecan caramel salted spicy easy best homemade skillet sheet '
+    'pan slow cooker instant pot creamy tomato basil pesto'
+).split()
+QUERIES = (
+    'choc',
+    'snickerdodle',
+    'pizza',
+    'pumpkin pie',
+    'banana bred',
+    'cinamon rolls',
+    'chocolate chip cook',
+)
+
+
+def make_titles(count, seed=1):
+    """
+    titles drawn from food words and 5,000 made up words with a Zipf
+    distribution, so common words appear in a large share of titles
+    """
+    rng = random.Random(seed)
+    vocabulary = FOOD_WORDS + [
+        ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10)))
+        for _ in range(5000)
+    ]
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+    return [
+        (
+            recipe_id,
+            ' '.join(
+                word.capitalize() for word in
+                rng.choices(vocabulary, weights, k=rng.randint(2, 6))
+            ),
+            recipe_id % 3,
+        )
+        for recipe_id in range(count)
+    ]
+
+
+def run(stdout):
+    """builds the index and times each query"""
+    titles = make_titles(NUM_TITLES)
+
+    start = time.perf_counter()
+    index = TitleIndex(titles)
+    stdout.write(
+        f'built index of {len(index)} titles '
+        f'in {time.perf_counter() - start:.2f}s'
+    )
+
+    for query in QUERIES:
+        timings = []
+        for _ in range(ROUNDS):
+            start = time.perf_counter()
+            index.search(query, limit=10)
+            timings.append((time.perf_counter() - start) * 1000)
+        stdout.write(
+            f'{query!r:24} first {timings[0]:6.2f} ms  '
+            f'median {statistics.median(timings):6.2f} ms  '
+            f'max {max(timings):6.2f} ms'
+        )
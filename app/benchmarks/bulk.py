@@ -0,0 +1,84 @@
+"""
+Throughput of importing a recipe collection, one POST per recipe
+against a single request to the bulk endpoint
+
+    python manage.py benchmark bulk
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from benchmarks.recipes import QueryCounter
+from recipe.views import RecipeViewSet
+
+
+NUM_RECIPES = 1000
+NUM_TAGS = 20
+
+
+def make_recipes(count):
+    """a collection of recipes sharing tags and ingredients"""
+    return [
+        {
+            'title': f'Recipe {number}',
+            'time_minutes': 30,
+            'price': '5.00',
+            'description': f'Imported recipe number {number}.',
+            'tags': [
+                {'name': f'Tag {(number + offset) % NUM_TAGS}'}
+                for offset in range(3)
+            ],
+            'ingredients': [
+                {'name': f'Ingredient {(number * 7 + offset) % 300}'}
+                for offset in range(10)
+            ],
+        }
+        for number in range(count)
+    ]
+
+
+def post(view, user, data):
+    """status of posting data as user"""
+    request = APIRequestFactory().post(
+        '/', data, format='json', HTTP_HOST='localhost')
+    force_authenticate(request, user)
+    return view(request).status_code
+
+
+def one_by_one(user, recipes):
+    """the import as a request per recipe"""
+    view = RecipeViewSet.as_view({'post': 'create'})
+    for recipe in recipes:
+        assert post(view, user, recipe) == 201
+
+
+def in_bulk(user, recipes):
+    """the import as one request"""
+    view = RecipeViewSet.as_view({'post': 'bulk'})
+    assert post(view, user, recipes) == 201
+
+
+def run(stdout):
+    """imports the collection for a new user each way"""
+    recipes = make_recipes(NUM_RECIPES)
+    stdout.write(
+        'all writes share one transaction, so the one by one numbers '
+        'leave out its per-request commits'
+    )
+    stdout.write(f'{NUM_RECIPES} recipes:')
+    for label, write in (('one by one', one_by_one), ('bulk', in_bulk)):
+        user = get_user_model().objects.create_user(
+            email=f'{label.replace(" ", "-")}@example.com',
+            password='benchmark'
+        )
+        queries = QueryCounter()
+        with connection.execute_wrapper(queries):
+            start = time.perf_counter()
+            write(user, recipes)
+            elapsed = time.perf_counter() - start
+        stdout.write(
+            f'  {label:10} {NUM_RECIPES / elapsed:8.1f} recipes/s  '
+            f'{queries.count:6} queries'
+        )
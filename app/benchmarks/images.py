@@ -0,0 +1,86 @@
+"""
+Peak memory and time per image of the buffered download path against
+the streamed one, on a large camera JPEG
+
+    python manage.py benchmark images
+
+Each path runs in a forked child so its peak RSS is measured alone.
+"""
+import os
+import resource
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+from PIL import Image
+
+from core.images import process_image, encode
+
+
+WIDTH, HEIGHT = 6000, 4000
+CHUNK_SIZE = 64 * 1024
+SPOOL_SIZE = 1024 * 1024
+
+
+def camera_jpeg():
+    """a noisy 24 megapixel JPEG, about the size of a camera photo"""
+    noise = Image.effect_noise((WIDTH // 4, HEIGHT // 4), 64).convert('RGB')
+    image = noise.resize((WIDTH, HEIGHT))
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def buffered(content):
+    """the old path: the whole body in memory, decoded at full size"""
+    body = bytes(content)
+    image = Image.open(BytesIO(body))
+    image.load()
+    encode(image.convert('RGB'), 'jpeg')
+
+
+def streamed(content):
+    """the new path: the body spooled to a file, decoded at draft scale"""
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as file:
+        for start in range(0, len(content), CHUNK_SIZE):
+            file.write(content[start:start + CHUNK_SIZE])
+        file.seek(0)
+        process_image(file)
+
+
+def peak_rss_kb():
+    """peak resident memory of this process, in KB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, linux KB
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def measure(path, content):
+    """(extra peak KB, ms) of running path in a forked child"""
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_end)
+        before = peak_rss_kb()
+        start = time.perf_counter()
+        path(content)
+        elapsed = (time.perf_counter() - start) * 1000
+        os.write(write_end, f'{peak_rss_kb() - before} {elapsed}'.encode())
+        os._exit(0)
+    os.close(write_end)
+    with os.fdopen(read_end) as pipe:
+        peak, elapsed = pipe.read().split()
+    os.waitpid(pid, 0)
+    return int(peak), float(elapsed)
+
+
+def run(stdout):
+    """compares the two download paths on one large image"""
+    content = camera_jpeg()
+    stdout.write(
+        f'{WIDTH}x{HEIGHT} JPEG, {len(content) // 1024}KB download:')
+    for name, path in (('buffered', buffered), ('streamed', streamed)):
+        peak, elapsed = measure(path, content)
+        stdout.write(
+            f'  {name:9} peak +{peak // 1024:4} MB  {elapsed:7.1f} ms')
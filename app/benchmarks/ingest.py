@@ -0,0 +1,110 @@
+"""
+Throughput of writing scraped recipe content, row by row as the
+scraper used to against the batched writer
+
+    python manage.py benchmark ingest
+"""
+import time
+
+from django.db import connection
+
+from benchmarks.recipes import QueryCounter
+from core import models
+from core.management.commands.utils.writer import write_recipe_content
+
+
+NUM_RECIPES = 200
+
+
+def make_content(recipe_number, revision=0):
+    """
+    content the size of a typical blog recipe: two ingredient
+    sections, eight instructions and three notes. Each revision
+    changes a few rows
+    """
+    ingredients = [
+        ('', [
+            f'{item + 1} cups ingredient {recipe_number}-{item}'
+            for item in range(10)
+        ]),
+        ('topping', [
+            f'{item + revision} tbsp topping {item}' for item in range(4)
+        ]),
+    ]
+    instructions = [
+        ('', [f'Step {step} of recipe {recipe_number}.' for step in range(8)])
+    ]
+    notes = [f'Note {note}, revision {revision}.' for note in range(3)]
+    return ingredients, instructions, notes
+
+
+def write_row_by_row(recipe, ingredients, instructions, notes):
+    """the scraper's previous write path, one update_or_create per row"""
+    for title, items in ingredients:
+        ingredient_list, create = models.BlogIngredientList\
+            .objects.update_or_create(recipe=recipe, title=title)
+        for item in items:
+            models.BlogIngredient.objects.update_or_create(
+                ingredient_list=ingredient_list,
+                ingredient=item
+            )
+    for title, items in instructions:
+        instruction_list, create = models.BlogInstructionList\
+            .objects.update_or_create(recipe=recipe, title=title)
+        for item in items:
+            models.BlogInstruction.objects.update_or_create(
+                instruction_list=instruction_list,
+                instruction=item
+            )
+    for note in notes:
+        models.BlogNote.objects.update_or_create(recipe=recipe, note=note)
+    recipe.refresh_pantry_ingredients()
+
+
+def create_recipes(author, prefix):
+    """empty recipes to write content to"""
+    return [
+        models.BlogRecipe.objects.create(
+            author=author,
+            title=f'Recipe {number}',
+            slug=f'{prefix}-{number}',
+            link=f'https://example.com/{prefix}-{number}/',
+            rating=0,
+            num_reviews=0,
+        )
+        for number in range(NUM_RECIPES)
+    ]
+
+
+def time_writes(stdout, label, write, recipes, revision):
+    """writes every recipe and reports recipes/s and queries/recipe"""
+    queries = QueryCounter()
+    with connection.execute_wrapper(queries):
+        start = time.perf_counter()
+        for number, recipe in enumerate(recipes):
+            write(recipe, *make_content(number, revision))
+        elapsed = time.perf_counter() - start
+    stdout.write(
+        f'{label:28} {len(recipes) / elapsed:8.1f} recipes/s  '
+        f'{queries.count / len(recipes):6.1f} queries/recipe'
+    )
+
+
+def run(stdout):
+    """writes new recipes, then re-scrapes them with a few changes"""
+    author = models.BlogAuthor.objects.create(
+        name='Benchmark Blog',
+        website_link='https://example.com/'
+    )
+    stdout.write(
+        'all writes share one transaction, so the row by row numbers '
+        'leave out its per-statement commits'
+    )
+    for label, write in (
+        ('row by row', write_row_by_row),
+        ('batched', write_recipe_content),
+    ):
+        recipes = create_recipes(author, label.replace(' ', '-'))
+        time_writes(stdout, f'{label}: new', write, recipes, 0)
+        time_writes(stdout, f'{label}: unchanged', write, recipes, 0)
+        time_writes(stdout, f'{label}: changed', write, recipes, 1)
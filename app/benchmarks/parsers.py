@@ -0,0 +1,56 @@
+"""
+Parse time of each parser backend over the saved page of each site
+
+    python manage.py benchmark parsers
+"""
+import statistics
+import time
+
+from core.management.commands.utils.extract import RecipeExtractor
+from core.management.commands.utils.parsers import (
+    UnsupportedSelector,
+    available_parsers
+)
+from core.tests.test_parsers import data, load_page
+
+
+ROUNDS = 10
+# comments and related posts make real pages around 150KB
+NUM_COMMENTS = 1000
+
+
+def pad_page(html):
+    """the saved page with a comment section the size of a real one"""
+    comments = ''.join(
+        f'<li class="comment"><div class="comment-author">Reader {number}'
+        f'</div><p>Comment {number} with a <a href="#c{number}">link</a> '
+        f'and <strong>some</strong> text.</p></li>'
+        for number in range(NUM_COMMENTS)
+    )
+    return html.replace(
+        '</main>', f'<ol class="comment-list">{comments}</ol></main>')
+
+
+def run(stdout):
+    """times extracting each site's page with each parser"""
+    for site, website in data.items():
+        html = pad_page(load_page(site))
+        url = f'https://example.com/{site}/'
+        stdout.write(f'{site} ({len(html) // 1024}KB):')
+        for parser in available_parsers():
+            try:
+                extractor = RecipeExtractor(website, parser)
+            except UnsupportedSelector as error:
+                stdout.write(f'  {parser:12} skipped, {error}')
+                continue
+            timings = []
+            for _ in range(ROUNDS):
+                start = time.perf_counter()
+                extractor.extract(url, html)
+                timings.append((time.perf_counter() - start) * 1000)
+            configured = ' (configured)' \
+                if website.get('parser') == parser else ''
+            stdout.write(
+                f'  {parser:12} median {statistics.median(timings):7.1f} ms'
+                f'{configured}'
+            )
@@ -0,0 +1,111 @@
+"""
+Latency and queries of the recipe list for a user with many recipes,
+with tags and ingredients loaded per recipe as the view used to,
+against prefetched
+
+    python manage.py benchmark recipes
+"""
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.views import RecipeViewSet
+
+
+RECIPE_COUNTS = (1000, 3000)
+TAGS_PER_RECIPE = 3
+INGREDIENTS_PER_RECIPE = 10
+ROUNDS = 5
+
+
+class PerRecipeViewSet(RecipeViewSet):
+    """the recipe viewset without its prefetches"""
+    def get_queryset(self):
+        return super().get_queryset().prefetch_related(None)
+
+
+def create_recipes(user, count):
+    """count recipes, each with a few of the user's tags and ingredients"""
+    tags = Tag.objects.bulk_create([
+        Tag(user=user, name=f'Tag {number}') for number in range(20)])
+    ingredients = Ingredient.objects.bulk_create([
+        Ingredient(user=user, name=f'Ingredient {number}')
+        for number in range(200)
+    ])
+    recipes = Recipe.objects.bulk_create([
+        Recipe(
+            user=user,
+            title=f'Recipe {number}',
+            time_minutes=30,
+            price=Decimal('5.00'),
+        )
+        for number in range(count)
+    ])
+    Recipe.tags.through.objects.bulk_create([
+        Recipe.tags.through(
+            recipe=recipe, tag=tags[(number + offset) % len(tags)])
+        for number, recipe in enumerate(recipes)
+        for offset in range(TAGS_PER_RECIPE)
+    ])
+    Recipe.ingredients.through.objects.bulk_create([
+        Recipe.ingredients.through(
+            recipe=recipe,
+            ingredient=ingredients[(number + offset) % len(ingredients)]
+        )
+        for number, recipe in enumerate(recipes)
+        for offset in range(INGREDIENTS_PER_RECIPE)
+    ])
+    # plan the queries with statistics for the new rows, as a live
+    # database would
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'ANALYZE core_recipe, core_recipe_tags, core_recipe_ingredients')
+
+
+class QueryCounter:
+    """
+    counts queries run through a connection. CaptureQueriesContext
+    only keeps the last 9000
+    """
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def time_list(viewset, user):
+    """(median ms, queries) of rendering the user's recipe list"""
+    view = viewset.as_view({'get': 'list'})
+    timings = []
+    for _ in range(ROUNDS):
+        request = APIRequestFactory().get('/', HTTP_HOST='localhost')
+        force_authenticate(request, user)
+        queries = QueryCounter()
+        with connection.execute_wrapper(queries):
+            start = time.perf_counter()
+            view(request).render()
+            timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), queries.count
+
+
+def run(stdout):
+    """times the list at each size with and without prefetching"""
+    for count in RECIPE_COUNTS:
+        user = get_user_model().objects.create_user(
+            email=f'benchmark-{count}@example.com', password='benchmark')
+        create_recipes(user, count)
+        stdout.write(f'{count} recipes:')
+        for label, viewset in (
+            ('per recipe', PerRecipeViewSet),
+            ('prefetched', RecipeViewSet),
+        ):
+            median, queries = time_list(viewset, user)
+            stdout.write(
+                f'  {label:10} median {median:8.1f} ms  {queries:5} queries')
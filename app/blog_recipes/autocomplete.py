@@ -0,0 +1,258 @@
+"""
+Typo-tolerant autocomplete over blog recipe titles
+"""
+import bisect
+import heapq
+import re
+import threading
+from collections import Counter, defaultdict
+
+from blog_recipes.cache import get_cache_version
+from core.models import BlogRecipe
+
+
+WORD_RE = re.compile(r'[^\W_]+')
+
+
+def trigrams(word):
+    """trigrams of a word, padded like pg_trgm"""
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleIndex:
+    """
+    In-memory index of recipe titles for autocomplete.
+
+    Each query word is matched against the words used in titles by
+    trigram similarity (so "snickerdodle" finds "snickerdoodle") and
+    the last one also by prefix, since it is usually still being
+    typed. Titles are then ranked by the average score of their best
+    matching word for each query word, and by rating for ties.
+    """
+    min_similarity = 0.3
+    prefix_score = 0.9
+    max_word_matches = 50
+    max_combinations = 200
+
+    def __init__(self, entries):
+        """
+        entries is an iterable of (id, title, author_id), best rated
+        first
+        """
+        self.ids = []
+        self.titles = []
+        self.author_ids = []
+        self.author_positions = defaultdict(set)
+        title_words = []
+        for position, (recipe_id, title, author_id) in enumerate(entries):
+            self.ids.append(recipe_id)
+            self.titles.append(title)
+            self.author_ids.append(author_id)
+            self.author_positions[author_id].add(position)
+            title_words.append(set(WORD_RE.findall(title.lower())))
+
+        # word ids follow alphabetical order so prefixes are id ranges
+        self.words = sorted(set().union(*title_words))
+        word_ids = {word: word_id for word_id, word in enumerate(self.words)}
+
+        self.postings = [[] for _ in self.words]
+        self.posting_sets = {}
+        for position, words in enumerate(title_words):
+            for word in words:
+                self.postings[word_ids[word]].append(position)
+
+        self.word_sizes = []
+        self.word_grams = defaultdict(list)
+        for word_id, word in enumerate(self.words):
+            grams = trigrams(word)
+            self.word_sizes.append(len(grams))
+            for gram in grams:
+                self.word_grams[gram].append(word_id)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def posting_set(self, word_id):
+        """titles containing a word as a set, kept once built"""
+        if word_id not in self.posting_sets:
+            self.posting_sets[word_id] = frozenset(self.postings[word_id])
+        return self.posting_sets[word_id]
+
+    def match_word(self, word, prefix=False):
+        """
+        Return {word_id: score} for the indexed words similar to word,
+        and starting with it when prefix is set
+        """
+        grams = trigrams(word)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.word_grams.get(gram, ()))
+
+        scores = {}
+        for word_id, count in shared.items():
+            size = self.word_sizes[word_id]
+            similarity = count / (len(grams) + size - count)
+            if similarity >= self.min_similarity:
+                scores[word_id] = similarity
+
+        if prefix:
+            start = bisect.bisect_left(self.words, word)
+            end = bisect.bisect_left(self.words, word + '\uffff', start)
+            for word_id in heapq.nlargest(
+                    self.max_word_matches, range(start, end),
+                    key=lambda word_id: len(self.postings[word_id])):
+                scores[word_id] = max(
+                    scores.get(word_id, 0), self.prefix_score)
+
+        best = heapq.nlargest(
+            self.max_word_matches, scores.items(), key=lambda item: item[1])
+        return dict(best)
+
+    def search(self, query, limit=10, author_id=None):
+        """
+        Return up to limit (id, title, author_id, score) tuples, best
+        match first
+        """
+        words = WORD_RE.findall(query.lower())
+        matches = [
+            self.match_word(word, prefix=i == len(words) - 1)
+            for i, word in enumerate(words)
+        ]
+        matches = [matched for matched in matches if matched]
+        if not matches:
+            return []
+
+        if len(matches) == 1:
+            ranked = self._rank_single(matches[0], limit, author_id)
+        else:
+            ranked = self._rank_many(matches, limit, author_id)
+
+        return [
+            (
+                self.ids[position],
+                self.titles[position],
+                self.author_ids[position],
+                round(score / len(words), 3),
+            )
+            for score, position in ranked
+        ]
+
+    def _rank_single(self, matched, limit, author_id):
+        """
+        rank titles for a single matched word. Titles come in score
+        tiers and postings are in rating order, so only the first
+        limit titles need to be visited
+        """
+        tiers = defaultdict(list)
+        for word_id, score in matched.items():
+            tiers[score].append(word_id)
+
+        ranked = []
+        seen = set()
+        for score in sorted(tiers, reverse=True):
+            postings = [self.postings[word_id] for word_id in tiers[score]]
+            for position in heapq.merge(*postings):
+                if position in seen:
+                    continue
+                seen.add(position)
+                if author_id and self.author_ids[position] != author_id:
+                    continue
+                ranked.append((score, position))
+                if len(ranked) == limit:
+                    return ranked
+        return ranked
+
+    def _rank_many(self, matches, limit, author_id):
+        """
+        rank titles for several matched words. The score tiers of the
+        words are combined best total first and the titles of each
+        combination are found by intersecting the tiers' title sets,
+        so only the few combinations needed to fill limit are visited
+        """
+        tiers = []
+        for matched in matches:
+            by_score = defaultdict(list)
+            for word_id, score in matched.items():
+                by_score[score].append(word_id)
+            tiers.append(sorted(by_score.items(), reverse=True))
+
+        tier_titles = {}
+
+        def titles_in(word, tier):
+            if (word, tier) not in tier_titles:
+                word_ids = tiers[word][tier][1]
+                if len(word_ids) == 1:
+                    tier_titles[word, tier] = self.posting_set(word_ids[0])
+                else:
+                    tier_titles[word, tier] = set().union(*(
+                        self.postings[word_id] for word_id in word_ids
+                    ))
+            return tier_titles[word, tier]
+
+        def total(combination):
+            return sum(
+                tiers[word][tier][0]
+                for word, tier in enumerate(combination)
+            )
+
+        first = (0,) * len(tiers)
+        heap = [(-total(first), first)]
+        queued = {first}
+        ranked = []
+        seen = set()
+        cutoff = None
+        visited = 0
+        while heap and visited < self.max_combinations:
+            negative_total, combination = heapq.heappop(heap)
+            if cutoff is not None and -negative_total < cutoff:
+                break
+            visited += 1
+
+            title_sets = sorted(
+                (titles_in(word, tier)
+                 for word, tier in enumerate(combination)),
+                key=len
+            )
+            if author_id:
+                title_sets.insert(
+                    0, self.author_positions.get(author_id, set()))
+            found = title_sets[0].intersection(*title_sets[1:]) - seen
+            seen |= found
+            ranked.extend((-negative_total, position) for position in found)
+            if cutoff is None and len(ranked) >= limit:
+                # finish the combinations with the same total
+                cutoff = -negative_total
+
+            for word, tier in enumerate(combination):
+                if tier + 1 < len(tiers[word]):
+                    following = combination[:word] + (tier + 1,) + \
+                        combination[word + 1:]
+                    if following not in queued:
+                        queued.add(following)
+                        heapq.heappush(heap, (-total(following), following))
+
+        ranked.sort(key=lambda item: (-item[0], item[1]))
+        return ranked[:limit]
+
+
+_index_lock = threading.Lock()
+_index = {'version': None, 'index': None}
+
+
+def get_title_index():
+    """
+    Return the title index of this process, rebuilding it when the
+    scraper has bumped the cache version since it was built
+    """
+    version = get_cache_version()
+    if _index['version'] != version:
+        with _index_lock:
+            if _index['version'] != version:
+                _index['index'] = TitleIndex(
+                    BlogRecipe.objects.order_by('-rating', '-id')
+                    .values_list('id', 'title', 'author_id')
+                    .iterator()
+                )
+                _index['version'] = version
+    return _index['index']
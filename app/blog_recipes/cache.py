@@ -0,0 +1,79 @@
+"""
+Versioned response cache for the read-only blog recipe endpoints
+"""
+import functools
+import hashlib
+
+from django.core.cache import caches
+from django.db.models import Count, Max, Sum
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.models import BlogAuthor
+
+
+CACHE_ALIAS = 'blog_recipes'
+
+
+def get_cache_version(author_id=None):
+    """
+    Return the version of the cached data for an author, or for every
+    author when none is given. The scraper bumps it on every write,
+    so keys built from an older version are never read again. The
+    latest updated_at is part of it because replacing an author can
+    leave the count and the total of the versions as they were
+    """
+    authors = BlogAuthor.objects.all()
+    if author_id:
+        authors = authors.filter(id=author_id)
+    versions = authors.aggregate(
+        total=Sum('cache_version'),
+        authors=Count('id'),
+        updated_at=Max('updated_at')
+    )
+    updated_at = versions['updated_at']
+    return '{}.{}.{}'.format(
+        versions['total'] or 0,
+        versions['authors'],
+        updated_at.timestamp() if updated_at else 0
+    )
+
+
+def get_cache_key(view_name, request):
+    """
+    Build a cache key from the full url, including the author, the
+    categories and title filters and the page params. The host is part
+    of the key because image urls in the response are absolute
+    """
+    params = sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values
+    )
+    url = f'{request.scheme}://{request.get_host()}{request.path}?{params}'
+    digest = hashlib.md5(url.encode('utf-8')).hexdigest()
+    return f'{view_name}:{digest}'
+
+
+def cache_response(view_method):
+    """
+    Cache the data of successful responses of a read-only viewset
+    action. Keys are versioned with get_cache_version
+    """
+    @functools.wraps(view_method)
+    def wrapper(view, request, *args, **kwargs):
+        cache = caches[CACHE_ALIAS]
+        key = get_cache_key(
+            f'{type(view).__name__}.{view_method.__name__}', request)
+        version = get_cache_version(kwargs.get('author_id'))
+
+        data = cache.get(key, version=version)
+        if data is not None:
+            return Response(data)
+
+        response = view_method(view, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, version=version)
+        return response
+
+    return wrapper
@@ -0,0 +1,61 @@
+"""
+ETag and Last-Modified support for the read-only blog recipe endpoints
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+
+from core.models import BlogAuthor, BlogRecipe
+
+
+def authors_queryset(**kwargs):
+    """rows behind the authors list"""
+    return BlogAuthor.objects.all()
+
+
+def recipes_queryset(author_id=None, **kwargs):
+    """rows behind the recipe list, or a single recipe when id is given"""
+    recipes = BlogRecipe.objects.all()
+    if author_id:
+        recipes = recipes.filter(author__id=author_id)
+    if kwargs.get('id'):
+        recipes = recipes.filter(id=kwargs['id'])
+    return recipes
+
+
+def conditional_response(get_queryset):
+    """
+    Answer If-None-Match and If-Modified-Since with a 304 before the
+    view runs, using the latest updated_at and the row count of the
+    queryset returned by get_queryset(**view_kwargs)
+    """
+    def get_state(request, **kwargs):
+        """aggregates the queryset once per request"""
+        state = getattr(request, '_conditional_state', None)
+        if state is None:
+            state = get_queryset(**kwargs).aggregate(
+                last_modified=Max('updated_at'),
+                count=Count('id')
+            )
+            request._conditional_state = state
+        return state
+
+    def etag(request, *args, **kwargs):
+        state = get_state(request, **kwargs)
+        if state['last_modified'] is None:
+            return None
+        tag = '{}|{}|{}'.format(
+            request.build_absolute_uri(),
+            state['last_modified'].isoformat(),
+            state['count']
+        )
+        return hashlib.md5(tag.encode('utf-8')).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        return get_state(request, **kwargs)['last_modified']
+
+    return method_decorator(
+        condition(etag_func=etag, last_modified_func=last_modified)
+    )
@@ -0,0 +1,35 @@
+"""
+Find blog recipes by the ingredients in a pantry
+"""
+from django.db.models import Count, F, FloatField
+from django.db.models.functions import Cast, NullIf
+
+from core.ingredients import ingredient_names
+
+
+def pantry_names(pantry):
+    """canonical ingredient names from a comma separated pantry"""
+    names = []
+    for item in pantry.split(','):
+        for name in ingredient_names(item):
+            if name not in names:
+                names.append(name)
+    return names
+
+
+def rank_by_pantry(queryset, names):
+    """
+    Filter recipes using any of the pantry ingredients and order them
+    by the share of their ingredients the pantry covers. Matches are
+    annotated with matched and coverage
+    """
+    return queryset.filter(
+        pantry_ingredients__name__in=names
+    ).annotate(
+        matched=Count('pantry_ingredients'),
+    ).annotate(
+        coverage=Cast(F('matched'), FloatField())
+        / NullIf(F('ingredient_count'), 0),
+    ).order_by(
+        F('coverage').desc(nulls_last=True), '-matched', '-rating', '-id'
+    )
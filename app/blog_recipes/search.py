@@ -0,0 +1,89 @@
+"""
+Full-text search over blog recipes
+"""
+import re
+
+from django.contrib.postgres.search import (
+    SearchHeadline,
+    SearchQuery,
+    SearchRank
+)
+from django.db import connection
+from django.db.models import Case, F, FloatField, Q, Value, When
+
+
+HEADLINE_START = '<b>'
+HEADLINE_STOP = '</b>'
+HEADLINE_CONTEXT = 60
+
+
+def search_recipes(queryset, terms):
+    """
+    Filter recipes matching the search terms and order them by
+    relevance. Matches are annotated with rank and, on Postgres,
+    headline
+    """
+    if connection.vendor == 'postgresql':
+        return _postgres_search(queryset, terms)
+    return _simple_search(queryset, terms)
+
+
+def _postgres_search(queryset, terms):
+    """ranked search over the GIN-indexed weighted search vector"""
+    query = SearchQuery(terms, search_type='websearch', config='english')
+    return queryset.filter(search_vector=query).annotate(
+        rank=SearchRank(F('search_vector'), query),
+        headline=SearchHeadline(
+            'search_text',
+            query,
+            config='english',
+            start_sel=HEADLINE_START,
+            stop_sel=HEADLINE_STOP,
+            max_fragments=2
+        ),
+    ).order_by('-rank', '-rating', '-id')
+
+
+def _simple_search(queryset, terms):
+    """
+    search for databases without full-text search (e.g. SQLite):
+    every word must appear in the search text, and words in the title
+    or description rank higher
+    """
+    words = terms.split()
+    if not words:
+        return queryset.none()
+
+    match = Q()
+    rank = Value(0.0)
+    for word in words:
+        match &= Q(search_text__icontains=word)
+        rank = rank + Case(
+            When(title__icontains=word, then=Value(1.0)),
+            When(description__icontains=word, then=Value(0.4)),
+            default=Value(0.1),
+            output_field=FloatField()
+        )
+
+    return queryset.filter(match).annotate(
+        rank=rank
+    ).order_by('-rank', '-rating', '-id')
+
+
+def highlight(text, terms):
+    """
+    Return a snippet of text around the first search term, with the
+    terms wrapped like Postgres headlines
+    """
+    words = [re.escape(word) for word in terms.split() if word]
+    if not text or not words:
+        return ''
+
+    pattern = re.compile('|'.join(words), re.IGNORECASE)
+    match = pattern.search(text)
+    start = max(match.start() - HEADLINE_CONTEXT, 0) if match else 0
+    snippet = text[start:start + HEADLINE_CONTEXT * 3]
+    return pattern.sub(
+        lambda word: f'{HEADLINE_START}{word.group(0)}{HEADLINE_STOP}',
+        snippet
+    )
@@ -1,8 +1,11 @@
 """
 serializers for blog recipeapi
 """
+from django.db.models import OuterRef, Subquery
 from rest_framework import serializers
 
+from blog_recipes.search import highlight
+
 from core.models import (
     BlogRecipe,
     BlogIngredient,
@@ -10,6 +13,7 @@ from core.models import (
     BlogInstruction,
     BlogAuthor,
     BlogImage,
+    BlogImageVariant,
     BlogCategory,
     BlogIngredientList,
     BlogInstructionList,
@@ -104,14 +108,27 @@ class BlogAuthorSerializer(serializers.ModelSerializer):
         return obj.recipes.count()
 
 
+class BlogImageVariantSerializer(serializers.ModelSerializer):
+    """
+    Serializer for the resized copies of an image
+    """
+    class Meta:
+        """Meta class"""
+        model = BlogImageVariant
+        fields = ("width", "height", "format", "file")
+
+
 class BlogRecipeImageSerializer(serializers.ModelSerializer):
     """
     Serializer for uploading images to recipes
     """
+    variants = BlogImageVariantSerializer(many=True, read_only=True)
+
     class Meta:
         """Meta class"""
         model = BlogImage
-        fields = ("image_url", "name")
+        fields = (
+            "image_url", "name", "thumbnail", "width", "height", "variants")
         read_only_fields = ("id",)
 
 
@@ -120,16 +137,33 @@ class BlogRecipeSerializer(serializers.ModelSerializer):
     author = serializers.SerializerMethodField()
     categories = serializers.SerializerMethodField()
     main_image = serializers.SerializerMethodField()
+    thumbnail = serializers.SerializerMethodField()
 
     class Meta:
         """Meta class"""
         model = BlogRecipe
         fields = (
             "id", "title", "categories", "link",
-            "rating", "author", "slug", "main_image"
+            "rating", "author", "slug", "main_image", "thumbnail"
         )
         read_only_fields = ('id',)
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Load authors, categories and the main image and thumbnail paths
+        up front so listing recipes costs a fixed number of queries
+        """
+        first_image = BlogImage.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by('id')
+        return queryset.select_related('author') \
+            .prefetch_related('categories') \
+            .annotate(
+                image_url_path=Subquery(first_image.values('image_url')[:1]),
+                thumbnail_path=Subquery(first_image.values('thumbnail')[:1])
+            )
+
     def get_author(self, obj):
         """gets author name and id"""
         return {
@@ -139,31 +173,85 @@ class BlogRecipeSerializer(serializers.ModelSerializer):
 
     def get_categories(self, obj):
         """orders categories by id to preserve original order"""
-        ordered_categories = obj.categories.order_by('id')
-        return [category['name']
-                for category in ordered_categories.values()]
+        ordered_categories = sorted(
+            obj.categories.all(), key=lambda category: category.id)
+        return [category.name for category in ordered_categories]
+
+    def get_first_image_path(self, obj, field):
+        """path of the image_url or thumbnail of the first image"""
+        if hasattr(obj, f'{field}_path'):
+            return getattr(obj, f'{field}_path')
+        first_image = obj.images.order_by('id').first()
+        return getattr(first_image, field).name if first_image else None
+
+    def get_image_url(self, image_path):
+        """absolute url of a stored image"""
+        if not image_path:
+            return None
 
-    def get_main_image(self, obj):
-        """Return only the first image"""
-        images = obj.images
         request = self.context.get('request')
         # get the host name
-        host = request.build_absolute_uri() \
-            .split('/')[0] + '//' + \
-            request.build_absolute_uri().split('/')[2]
-        if images.exists():
-            first_image = images.first().image_url.url
-            return host + first_image
-        else:
-            return None
+        host = f'{request.scheme}://{request.get_host()}'
+        storage = BlogImage._meta.get_field('image_url').storage
+        return host + storage.url(image_path)
+
+    def get_main_image(self, obj):
+        """Return only the first image"""
+        return self.get_image_url(self.get_first_image_path(obj, 'image_url'))
+
+    def get_thumbnail(self, obj):
+        """
+        thumbnail of the first image, or the image itself when it has no
+        thumbnail yet
+        """
+        return self.get_image_url(
+            self.get_first_image_path(obj, 'thumbnail')
+            or self.get_first_image_path(obj, 'image_url')
+        )
+
+
+class BlogRecipeSearchSerializer(BlogRecipeSerializer):
+    """Serializer for recipes matched by a search"""
+    rank = serializers.FloatField(read_only=True)
+    headline = serializers.SerializerMethodField()
+
+    class Meta(BlogRecipeSerializer.Meta):
+        """Meta class"""
+        fields = BlogRecipeSerializer.Meta.fields + ("rank", "headline")
+
+    def get_headline(self, obj):
+        """snippet of the recipe text with the search terms highlighted"""
+        headline = getattr(obj, 'headline', None)
+        if headline is None:
+            headline = highlight(
+                obj.search_text, self.context.get('search_terms', ''))
+        return headline
+
+
+class BlogRecipePantrySerializer(BlogRecipeSerializer):
+    """Serializer for recipes matched by pantry ingredients"""
+    matched = serializers.IntegerField(read_only=True)
+    coverage = serializers.FloatField(read_only=True)
+
+    class Meta(BlogRecipeSerializer.Meta):
+        """Meta class"""
+        fields = BlogRecipeSerializer.Meta.fields + ("matched", "coverage")
+
+
+class BlogRecipeSuggestionSerializer(serializers.Serializer):
+    """Serializer for autocomplete suggestions"""
+    id = serializers.IntegerField()
+    title = serializers.CharField()
+    author_id = serializers.IntegerField()
+    score = serializers.FloatField()
 
 
 class BlogRecipeDetailSerializer(BlogRecipeSerializer):
     """
     Serializer for recipe detail object
     """
-    ingredient_list = BlogIngredientListSerializer(many=True, read_only=True)
-    instruction_list = BlogInstructionListSerializer(many=True, read_only=True)
+    ingredient_list = serializers.SerializerMethodField()
+    instruction_list = serializers.SerializerMethodField()
     notes = serializers.SerializerMethodField()
     images = BlogRecipeImageSerializer(many=True, read_only=True)
 
@@ -176,10 +264,17 @@ class BlogRecipeDetailSerializer(BlogRecipeSerializer):
         )
         read_only_fields = ('id',)
 
+    def get_ingredient_list(self, obj):
+        """ingredient sections from the precomputed detail document"""
+        return obj.get_detail()['ingredient_list']
+
+    def get_instruction_list(self, obj):
+        """instruction sections from the precomputed detail document"""
+        return obj.get_detail()['instruction_list']
+
     def get_notes(self, obj):
-        """orders notes by id to preserve original order"""
-        ordered_notes = obj.notes.order_by('id')
-        return [note['note'] for note in ordered_notes.values()]
+        """notes from the precomputed detail document"""
+        return obj.get_detail()['notes']
 
 
 class FavoriteBlogRecipesSerializer(serializers.ModelSerializer):
@@ -1,21 +1,33 @@
 """
 tests for recipe api
 """
+from datetime import timedelta
+from unittest import mock
+
+from django.db import connection
 from django.test import TestCase, RequestFactory
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.utils import timezone
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
 
+from core.management.commands.utils.add_to_db import add_to_categories
 from core.models import (
     BlogRecipe,
     BlogAuthor,
     BlogCategory,
-    BlogImage
+    BlogImage,
+    BlogIngredient,
+    BlogIngredientList,
+    BlogNote
 )
 
+from blog_recipes.search import highlight
 from blog_recipes.serializers import (
     BlogRecipeSerializer,
     BlogRecipeDetailSerializer
@@ -101,6 +113,7 @@ class BlogRecipeApiTests(TestCase):
         self.author = create_author()
         self.factory = RequestFactory()
         self.client.force_authenticate(self.user)
+        caches['blog_recipes'].clear()
 
     def test_retrieve_recipes(self):
         """
@@ -123,6 +136,32 @@ class BlogRecipeApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data.get('results', []), serializer.data)
 
+    def test_list_thumbnail(self):
+        """
+        Test recipes are listed with the thumbnail of their first image,
+        or the image itself when it has no thumbnail
+        """
+        recipe = create_recipe(author=self.author)
+        first_image = recipe.images.order_by("id").first()
+        first_image.thumbnail = "uploads/blog-recipe/image1-thumb.jpg"
+        first_image.save()
+        create_recipe(
+            title="cake2",
+            author=self.author,
+            slug="chocolate-cake-2")
+
+        res = self.client.get(
+            reverse("blog-recipes:blogrecipe-list", args=[self.author.id]))
+
+        thumbnails = {
+            recipe["slug"]: recipe["thumbnail"]
+            for recipe in res.data["results"]
+        }
+        self.assertTrue(thumbnails[recipe.slug].endswith(
+            "/uploads/blog-recipe/image1-thumb.jpg"))
+        self.assertTrue(
+            thumbnails["chocolate-cake-2"].endswith("/image1.jpg"))
+
     def test_view_recipe_detail(self):
         """
         Test viewing a recipe detail
@@ -145,6 +184,249 @@ class BlogRecipeApiTests(TestCase):
             recipe, context={'request': request})
         self.assertEqual(res.data, serializer.data)
 
+    def test_recipe_detail_served_from_detail_document(self):
+        """
+        Test the detail view builds the detail document once and
+        serves it until it is refreshed
+        """
+        recipe = create_recipe(author=self.author)
+        ingredient_list = BlogIngredientList.objects.create(
+            recipe=recipe,
+            title="For the cake"
+        )
+        ingredient = BlogIngredient.objects.create(
+            ingredient_list=ingredient_list,
+            ingredient="1 cup flour"
+        )
+        BlogIngredient.objects.create(
+            ingredient_list=ingredient_list,
+            ingredient="2 eggs"
+        )
+        BlogNote.objects.create(recipe=recipe, note="Make ahead")
+        self.assertIsNone(recipe.detail)
+
+        res = self.client.get(detail_url(recipe.id))
+        recipe.refresh_from_db()
+        expected_ingredients = [{
+            "title": "For the cake",
+            "ingredients": ["1 cup flour", "2 eggs"],
+        }]
+        self.assertEqual(res.data["ingredient_list"], expected_ingredients)
+        self.assertEqual(res.data["notes"], ["Make ahead"])
+        self.assertEqual(recipe.detail["notes"], ["Make ahead"])
+
+        ingredient.ingredient = "2 cups flour"
+        ingredient.save()
+        caches['blog_recipes'].clear()
+        res = self.client.get(detail_url(recipe.id))
+        self.assertEqual(res.data["ingredient_list"], expected_ingredients)
+
+        recipe.refresh_detail()
+        self.author.bump_cache_version()
+        res = self.client.get(detail_url(recipe.id))
+        self.assertEqual(
+            res.data["ingredient_list"][0]["ingredients"],
+            ["2 cups flour", "2 eggs"]
+        )
+
+    def test_list_cached_until_version_bumped(self):
+        """
+        Test the recipe list is served from the cache until the
+        author's cache version is bumped
+        """
+        create_recipe(author=self.author)
+        url = reverse("blog-recipes:blogrecipe-list", args=[self.author.id])
+        res = self.client.get(url)
+        self.assertEqual(len(res.data["results"]), 1)
+
+        create_recipe(author=self.author, slug="recipe2")
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url)
+        self.assertEqual(len(res.data["results"]), 1)
+        # conditional GET state and cache version only
+        self.assertEqual(len(queries), 2)
+
+        self.author.bump_cache_version()
+        res = self.client.get(url)
+        self.assertEqual(len(res.data["results"]), 2)
+
+    def test_all_authors_list_cache_invalidated(self):
+        """
+        Test the list of every author's recipes is no longer served from
+        the cache once a recipe is updated, or an author is replaced
+        """
+        recipe = create_recipe(author=self.author)
+        self.client.get(RECIPES_URL)
+
+        recipe.title = "Banana Muffins"
+        recipe.save()
+        self.author.bump_cache_version()
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(
+            [r["title"] for r in res.data["results"]], ["Banana Muffins"])
+
+        old_author = create_author(name="Old Blog")
+        self.client.get(RECIPES_URL)
+        # the same number of authors and total of their versions
+        old_author.delete()
+        new_author = create_author(name="New Blog")
+        create_recipe(author=new_author, title="Pizza", slug="pizza")
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(
+            [r["title"] for r in res.data["results"]],
+            ["Pizza", "Banana Muffins"]
+        )
+
+    def test_list_cache_keyed_on_query_params(self):
+        """
+        Test filtered lists are cached separately
+        """
+        create_recipe(author=self.author, title="Banana Bread")
+        create_recipe(author=self.author, title="Pizza", slug="pizza")
+        url = reverse("blog-recipes:blogrecipe-list", args=[self.author.id])
+
+        res = self.client.get(url)
+        self.assertEqual(len(res.data["results"]), 2)
+        res = self.client.get(url, {"title": "pizza"})
+        self.assertEqual(len(res.data["results"]), 1)
+
+    def test_list_not_modified_for_matching_etag(self):
+        """
+        Test the recipe list answers If-None-Match with a 304 until a
+        recipe changes
+        """
+        recipe = create_recipe(author=self.author)
+        url = reverse("blog-recipes:blogrecipe-list", args=[self.author.id])
+        res = self.client.get(url)
+        etag = res["ETag"]
+        self.assertTrue(res.has_header("Last-Modified"))
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b"")
+
+        recipe.rating = 4.1
+        recipe.save()
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
+
+    def test_list_modified_when_recipe_added_to_category(self):
+        """
+        Test the recipe list is not answered with a 304 once the scraper
+        puts an unchanged recipe in a new category
+        """
+        recipe = create_recipe(author=self.author)
+        url = reverse("blog-recipes:blogrecipe-list", args=[self.author.id])
+        etag = self.client.get(url)["ETag"]
+
+        add_to_categories(self.author, {recipe.id: ["dessert"]})
+        self.author.bump_cache_version()
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
+
+    def test_detail_not_modified_since_last_update(self):
+        """
+        Test the recipe detail answers If-Modified-Since with a 304
+        """
+        recipe = create_recipe(author=self.author)
+        # the detail document is built on the first request, an hour on
+        # so it would be sent with an older Last-Modified than it wrote
+        later = timezone.now() + timedelta(hours=1)
+        with mock.patch("django.utils.timezone.now", return_value=later):
+            res = self.client.get(detail_url(recipe.id))
+        last_modified = res["Last-Modified"]
+        stored = BlogRecipe.objects.get(id=recipe.id)
+        self.assertIsNotNone(stored.detail)
+        self.assertEqual(stored.updated_at, recipe.updated_at)
+
+        res = self.client.get(
+            detail_url(recipe.id), HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_authors_not_modified_for_matching_etag(self):
+        """
+        Test the authors list answers If-None-Match with a 304 until
+        the scraper writes
+        """
+        url = reverse("blog-recipes:blogauthor-list")
+        res = self.client.get(url)
+        etag = res["ETag"]
+
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        create_author(name="Budget Bytes")
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["count"], 2)
+
+    def test_authors_page_size_capped(self):
+        """
+        Test the authors list is paginated and page_size is capped
+        """
+        for i in range(55):
+            create_author(name=f"author {i}")
+        url = reverse("blog-recipes:blogauthor-list")
+
+        res = self.client.get(url, {"page_size": 1000})
+        self.assertEqual(res.data["count"], 56)
+        self.assertEqual(len(res.data["results"]), 50)
+        self.assertIsNotNone(res.data["next"])
+
+    def test_list_all_recipes(self):
+        """
+        Test author 0 lists the recipes of every author, paginated
+        """
+        author2 = create_author(name="Budget Bytes")
+        for i in range(16):
+            create_recipe(
+                author=self.author if i % 2 else author2,
+                slug=f"recipe-{i}"
+            )
+
+        res = self.client.get(RECIPES_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["count"], 16)
+        self.assertEqual(len(res.data["results"]), 15)
+
+    def test_list_cursor_pagination(self):
+        """
+        Test cursor pagination walks the recipes in rating order,
+        including recipes with the same rating, without counting them
+        """
+        ratings = [4.5, 5.0, 4.5, 3.0, 4.5]
+        recipes = [
+            create_recipe(author=self.author, slug=f"recipe-{i}", rating=r)
+            for i, r in enumerate(ratings)
+        ]
+        expected_ids = [
+            recipe.id for recipe in
+            sorted(recipes, key=lambda r: (-r.rating, -r.id))
+        ]
+        url = reverse("blog-recipes:blogrecipe-list", args=[self.author.id])
+
+        res = self.client.get(url, {"pagination": "cursor", "page_size": 2})
+        self.assertNotIn("count", res.data)
+        ids = [recipe["id"] for recipe in res.data["results"]]
+        while res.data["next"]:
+            res = self.client.get(res.data["next"])
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(res.data["results"]), 2)
+            ids.extend(recipe["id"] for recipe in res.data["results"])
+
+        self.assertEqual(ids, expected_ids)
+
+    def test_list_invalid_cursor(self):
+        """
+        Test an invalid cursor returns a 404
+        """
+        url = reverse("blog-recipes:blogrecipe-list", args=[self.author.id])
+        res = self.client.get(url, {"cursor": "not-a-cursor"})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_filter_by_category_query_params(self):
         """
         Test filtering recipes by category query params
@@ -197,6 +479,275 @@ class BlogRecipeApiTests(TestCase):
         self.assertNotIn(serializer3.data, res.data.get('results', []))
         self.assertEqual(len(res.data.get('results', [])), 2)
 
+    def test_list_query_count_is_constant(self):
+        """
+        Test listing recipes runs the same number of queries
+        regardless of how many recipes are returned
+        """
+        category = BlogCategory.objects.create(
+            name="cookies",
+            author=self.author
+        )
+        url = reverse("blog-recipes:blogrecipe-list", args=[self.author.id])
+
+        def count_list_queries():
+            caches['blog_recipes'].clear()
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.get(url)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            return len(queries)
+
+        create_recipe(author=self.author).categories.add(category)
+        num_queries = count_list_queries()
+
+        for i in range(5):
+            recipe = create_recipe(author=self.author, slug=f"recipe-{i}")
+            recipe.categories.add(category)
+
+        self.assertEqual(count_list_queries(), num_queries)
+
+
+class BlogRecipeSearchTests(TestCase):
+    """
+    Test searching blog recipes
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.author = create_author()
+        caches['blog_recipes'].clear()
+
+    def test_search_ranks_title_matches_first(self):
+        """
+        Test recipes matching the title rank above recipes matching
+        the description, and non-matching recipes are excluded
+        """
+        muffins = create_recipe(
+            author=self.author,
+            title="Morning Muffins",
+            slug="morning-muffins",
+            description="Muffins with ripe banana"
+        )
+        bread = create_recipe(
+            author=self.author,
+            title="Banana Bread",
+            slug="banana-bread",
+            description="A moist quick bread"
+        )
+        pizza = create_recipe(
+            author=self.author,
+            title="Pizza Dough",
+            slug="pizza-dough"
+        )
+        for recipe in (muffins, bread, pizza):
+            recipe.refresh_detail()
+
+        res = self.client.get(RECIPES_URL, {"q": "banana"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        ids = [recipe["id"] for recipe in res.data["results"]]
+        self.assertEqual(ids, [bread.id, muffins.id])
+        self.assertIn("<b>", res.data["results"][0]["headline"])
+        self.assertGreater(
+            res.data["results"][0]["rank"], res.data["results"][1]["rank"])
+
+    def test_search_without_full_text_search(self):
+        """
+        Test the search for databases without full-text search ranks
+        title matches first, needs every word and highlights the terms
+        """
+        muffins = create_recipe(
+            author=self.author,
+            title="Morning Muffins",
+            slug="morning-muffins",
+            description="Muffins with ripe banana"
+        )
+        bread = create_recipe(
+            author=self.author,
+            title="Banana Bread",
+            slug="banana-bread",
+            description="A moist quick bread"
+        )
+        for recipe in (muffins, bread):
+            recipe.refresh_detail()
+
+        with mock.patch("blog_recipes.search.connection", vendor="sqlite"):
+            res = self.client.get(RECIPES_URL, {"q": "banana"})
+            both = self.client.get(RECIPES_URL, {"q": "ripe banana"})
+
+        results = res.data["results"]
+        self.assertEqual(
+            [recipe["id"] for recipe in results], [bread.id, muffins.id])
+        self.assertGreater(results[0]["rank"], results[1]["rank"])
+        self.assertEqual(
+            results[0]["headline"].split("\n")[0], "<b>Banana</b> Bread")
+        self.assertEqual(
+            [recipe["id"] for recipe in both.data["results"]], [muffins.id])
+
+    def test_search_ingredients(self):
+        """
+        Test searching matches ingredient text
+        """
+        recipe = create_recipe(author=self.author, title="Brownies")
+        ingredient_list = BlogIngredientList.objects.create(
+            recipe=recipe,
+            title=""
+        )
+        BlogIngredient.objects.create(
+            ingredient_list=ingredient_list,
+            ingredient="1 cup chopped walnuts"
+        )
+        recipe.refresh_detail()
+
+        res = self.client.get(RECIPES_URL, {"q": "walnuts"})
+
+        ids = [recipe["id"] for recipe in res.data["results"]]
+        self.assertEqual(ids, [recipe.id])
+
+    def test_highlight(self):
+        """
+        Test highlighting wraps every search term in the snippet
+        """
+        snippet = highlight("Banana bread with ripe bananas", "banana")
+        self.assertEqual(
+            snippet, "<b>Banana</b> bread with ripe <b>banana</b>s")
+
+
+def create_ingredients(recipe, *ingredients):
+    """
+    Helper function to add ingredients to a recipe
+    """
+    ingredient_list = BlogIngredientList.objects.create(
+        recipe=recipe,
+        title=""
+    )
+    for ingredient in ingredients:
+        BlogIngredient.objects.create(
+            ingredient_list=ingredient_list,
+            ingredient=ingredient
+        )
+    recipe.refresh_pantry_ingredients()
+
+
+class PantryApiTests(TestCase):
+    """
+    Test finding blog recipes by pantry ingredients
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.author = create_author()
+        caches['blog_recipes'].clear()
+
+    def test_pantry_ranks_by_coverage(self):
+        """
+        Test recipes the pantry covers best are listed first and
+        recipes using none of the pantry are excluded
+        """
+        cookies = create_recipe(
+            author=self.author,
+            title="Sugar Cookies",
+            slug="sugar-cookies",
+            rating=4.1
+        )
+        create_ingredients(
+            cookies,
+            "2 cups (250g) all-purpose flour",
+            "1 cup (200g) granulated sugar",
+            "1 large egg, at room temperature"
+        )
+        cake = create_recipe(
+            author=self.author,
+            title="Butter Cake",
+            slug="butter-cake",
+            rating=4.9
+        )
+        create_ingredients(
+            cake,
+            "3 cups (375g) all-purpose flour",
+            "1 cup (230g) unsalted butter, softened",
+            "2 cups (400g) granulated sugar",
+            "4 large eggs",
+            "1 cup (240ml) whole milk"
+        )
+        salad = create_recipe(
+            author=self.author,
+            title="Green Salad",
+            slug="green-salad"
+        )
+        create_ingredients(salad, "1 head lettuce", "2 tablespoons olive oil")
+
+        res = self.client.get(RECIPES_URL, {"pantry": "Flour, sugar, eggs"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        results = res.data["results"]
+        self.assertEqual(
+            [recipe["id"] for recipe in results], [cookies.id, cake.id])
+        self.assertEqual(results[0]["matched"], 3)
+        self.assertEqual(results[0]["coverage"], 1.0)
+        self.assertAlmostEqual(results[1]["coverage"], 0.6)
+
+    def test_pantry_with_search_rejected(self):
+        """
+        Test combining a pantry with a search is a bad request
+        """
+        res = self.client.get(RECIPES_URL, {"pantry": "flour", "q": "cake"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AutocompleteApiTests(TestCase):
+    """
+    Test blog recipe title autocomplete
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.author = create_author()
+        self.url = reverse("blog-recipes:autocomplete-list")
+
+    def test_autocomplete_misspelled_title(self):
+        """
+        Test a misspelled title still finds the recipe
+        """
+        recipe = create_recipe(author=self.author, title="Snickerdoodles")
+        create_recipe(author=self.author, title="Pizza Dough", slug="pizza")
+
+        res = self.client.get(self.url, {"q": "snickerdodle"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+        self.assertEqual(res.data[0]["id"], recipe.id)
+        self.assertEqual(res.data[0]["title"], "Snickerdoodles")
+
+    def test_autocomplete_prefix_by_author(self):
+        """
+        Test a partial word matches titles, limited to an author
+        """
+        author2 = create_author(name="Budget Bytes")
+        create_recipe(author=self.author, title="Chocolate Cake")
+        recipe = create_recipe(
+            author=author2,
+            title="Chocolate Chip Cookies",
+            slug="chocolate-chip-cookies"
+        )
+
+        res = self.client.get(self.url, {"q": "choc", "author": author2.id})
+
+        self.assertEqual([r["id"] for r in res.data], [recipe.id])
+
+    def test_autocomplete_index_rebuilt_after_scrape(self):
+        """
+        Test new recipes are suggested once the scraper bumps the
+        cache version
+        """
+        create_recipe(author=self.author, title="Banana Bread")
+        res = self.client.get(self.url, {"q": "muffins"})
+        self.assertEqual(res.data, [])
+
+        create_recipe(author=self.author, title="Banana Muffins", slug="m")
+        self.author.bump_cache_version()
+        res = self.client.get(self.url, {"q": "muffins"})
+
+        self.assertEqual([r["title"] for r in res.data], ["Banana Muffins"])
+
 
 class FavoriteApiTests(TestCase):
     """
@@ -253,3 +804,35 @@ class FavoriteApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(res.data, None)
         self.assertEqual(recipe2.favorites.count(), 1)
+
+    def test_list_favorites_paginated(self):
+        """
+        Test favorites are listed newest first, a page at a time
+        """
+        recipes = [
+            create_recipe(author=self.author, slug=f"recipe-{i}")
+            for i in range(3)
+        ]
+        for recipe in recipes:
+            self.client.post(
+                reverse("blog-recipes:favorite-list"),
+                {"recipe_id": recipe.id})
+
+        res = self.client.get(
+            reverse("blog-recipes:favorite-list"), {"page_size": 2})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["count"], 3)
+        self.assertEqual(
+            [recipe["id"] for recipe in res.data["results"]],
+            [recipes[2].id, recipes[1].id]
+        )
+
+        res = self.client.get(
+            reverse("blog-recipes:favorite-list"),
+            {"pagination": "cursor", "page_size": 2})
+        res = self.client.get(res.data["next"])
+        self.assertEqual(
+            [recipe["id"] for recipe in res.data["results"]],
+            [recipes[0].id]
+        )
+        self.assertIsNone(res.data["next"])
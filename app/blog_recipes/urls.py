@@ -21,6 +21,9 @@ router_author.register('authors', views.AuthorViewSet, basename='blogauthor')
 router_author.register(
     'favorites', views.FavoritesViewSet, basename='favorite'
     )
+router_author.register(
+    'autocomplete', views.AutocompleteViewSet, basename='autocomplete'
+    )
 
 
 app_name = 'blog-recipes'
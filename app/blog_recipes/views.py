@@ -8,9 +8,11 @@ from drf_spectacular.utils import (
     OpenApiTypes
 )
 
+from django.db.models import Exists, OuterRef, Prefetch
 from django_filters.rest_framework import DjangoFilterBackend
 from django_filters import FilterSet, CharFilter
 from rest_framework import viewsets, mixins, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
 
@@ -21,20 +23,45 @@ from core.models import (
     Favorite
 )
 from blog_recipes import serializers
+from blog_recipes.autocomplete import get_title_index
+from blog_recipes.pagination import KeysetPagination
+from blog_recipes.pantry import pantry_names, rank_by_pantry
+from blog_recipes.search import search_recipes
+from blog_recipes.cache import cache_response
+from blog_recipes.conditional import (
+    conditional_response,
+    authors_queryset,
+    recipes_queryset
+)
 
 
 class CustomPageNumberPagination(PageNumberPagination):
+    """
+    Page number pagination for every blog recipe endpoint, with an
+    opt-in keyset mode (?pagination=cursor) ordered by the view's
+    keyset_ordering. Page sizes are capped at max_page_size
+    """
     page_size = 15  # Set your desired page size
     page_size_query_param = 'page_size'
     max_page_size = 50
+    keyset = None
 
     def paginate_queryset(self, queryset, request, view=None):
-        # Check if the view is an instance of YourSpecificViewClass
-        if view and isinstance(view, BlogRecipeByAuthorViewSet):
-            return super().paginate_queryset(queryset, request, view)
-        else:
-            # Return the entire queryset without pagination
-            return None
+        if getattr(view, 'keyset_ordering', None) and \
+                KeysetPagination.is_requested(request):
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        if self.keyset:
+            return self.keyset.get_paginated_response_schema(schema)
+        return super().get_paginated_response_schema(schema)
 
 
 class RecipeFilter(FilterSet):
@@ -58,7 +85,17 @@ class AuthorViewSet(
     Manage Authors in the database
     """
     serializer_class = serializers.BlogAuthorSerializer
-    queryset = BlogAuthor.objects.all()
+    queryset = BlogAuthor.objects.order_by("id")
+    pagination_class = CustomPageNumberPagination
+    keyset_ordering = ("id",)
+
+    @conditional_response(authors_queryset)
+    @cache_response
+    def list(self, request, *args, **kwargs):
+        """
+        return list of authors
+        """
+        return super().list(request, *args, **kwargs)
 
 
 @extend_schema_view(
@@ -70,6 +107,17 @@ class AuthorViewSet(
                 type=OpenApiTypes.STR,
                 description="Filter by categories(commas separated)",
             ),
+            OpenApiParameter(
+                name="q",
+                type=OpenApiTypes.STR,
+                description="Full-text search, ordered by relevance",
+            ),
+            OpenApiParameter(
+                name="pantry",
+                type=OpenApiTypes.STR,
+                description="Ingredients on hand(commas separated), "
+                            "ordered by the share of the recipe covered",
+            ),
         ]
     ),
 )
@@ -88,6 +136,7 @@ class BlogRecipeByAuthorViewSet(
     # pagination_class = PageNumberPagination
     pagination_class = CustomPageNumberPagination
     page_size_query_param = 'page_size'
+    keyset_ordering = ("-rating", "-id")
 
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
@@ -101,16 +150,40 @@ class BlogRecipeByAuthorViewSet(
         if author_id:
             queryset = queryset.filter(author__id=int(author_id))
 
-        return queryset.distinct()
+        return serializers.BlogRecipeSerializer.setup_eager_loading(
+            queryset.distinct()
+        ).prefetch_related('images__variants')
 
     def get_serializer_class(self):
         """
         Return appropriate serializer class
         """
         if self.action == "list":
+            if self.request.query_params.get("pantry"):
+                return serializers.BlogRecipePantrySerializer
+            if self.request.query_params.get("q"):
+                return serializers.BlogRecipeSearchSerializer
             return serializers.BlogRecipeSerializer
         return self.serializer_class
 
+    def get_serializer_context(self):
+        """
+        Add the search terms for highlighting
+        """
+        context = super().get_serializer_context()
+        context["search_terms"] = self.request.query_params.get("q", "")
+        return context
+
+    @conditional_response(recipes_queryset)
+    @cache_response
+    def retrieve(self, request, *args, **kwargs):
+        """
+        return a single recipe
+        """
+        return super().retrieve(request, *args, **kwargs)
+
+    @conditional_response(recipes_queryset)
+    @cache_response
     def list(self, request, *args, **kwargs):
         """
         return list of recipes by author,
@@ -119,24 +192,116 @@ class BlogRecipeByAuthorViewSet(
         author = kwargs.get('author_id')
         categories = self.request.query_params.get("categories")
 
-        if author is None:
+        if not author:
             queryset = self.queryset.all()
         else:
             queryset = self.queryset.filter(author__id=author)
 
         if categories:
             categories = categories.split(",")
-            queryset = queryset.filter(categories__name__in=categories)
+            # EXISTS instead of a join so recipes in several of the
+            # categories are only listed once
+            queryset = queryset.filter(Exists(
+                BlogRecipe.categories.through.objects.filter(
+                    blogrecipe_id=OuterRef("pk"),
+                    blogcategory__name__in=categories
+                )
+            ))
 
         filtered_queryset = self.filter_queryset(queryset)
+        search_terms = self.request.query_params.get("q")
+        pantry = self.request.query_params.get("pantry")
+        if pantry and search_terms:
+            raise ValidationError(
+                {"pantry": "Cannot be combined with a search."})
+        if pantry:
+            # ordered by coverage, so only page numbers apply
+            self.keyset_ordering = None
+            ordered_queryset = rank_by_pantry(
+                filtered_queryset, pantry_names(pantry))
+        elif search_terms:
+            # ordered by relevance, so only page numbers apply
+            self.keyset_ordering = None
+            ordered_queryset = search_recipes(filtered_queryset, search_terms)
+        else:
+            ordered_queryset = filtered_queryset.order_by(
+                *self.keyset_ordering)
+
         paginated_queryset = self.paginate_queryset(
-            filtered_queryset.order_by("-rating", "-id")
+            serializers.BlogRecipeSerializer.setup_eager_loading(
+                ordered_queryset
             )
+        )
 
         serializer = self.get_serializer(paginated_queryset, many=True)
         return self.get_paginated_response(serializer.data)
 
 
+@extend_schema_view(
+    list=extend_schema(
+        description="Suggest recipe titles for partial or misspelled input",
+        parameters=[
+            OpenApiParameter(
+                name="q",
+                type=OpenApiTypes.STR,
+                description="Title typed so far",
+            ),
+            OpenApiParameter(
+                name="author",
+                type=OpenApiTypes.INT,
+                description="Only suggest recipes by this author",
+            ),
+            OpenApiParameter(
+                name="limit",
+                type=OpenApiTypes.INT,
+                description="Number of suggestions (max 25)",
+            ),
+        ]
+    ),
+)
+class AutocompleteViewSet(viewsets.GenericViewSet):
+    """
+    Suggest recipe titles from an in-memory trigram index
+    """
+    serializer_class = serializers.BlogRecipeSuggestionSerializer
+    default_limit = 10
+    max_limit = 25
+
+    def _param_to_int(self, name, default):
+        """
+        Convert a query param to an int, falling back to default
+        """
+        value = self.request.query_params.get(name)
+        if value is None:
+            return default
+        try:
+            return int(value)
+        except ValueError:
+            return default
+
+    def list(self, request, *args, **kwargs):
+        """
+        return the best matching titles
+        """
+        limit = self._param_to_int("limit", self.default_limit)
+        limit = min(max(limit, 1), self.max_limit)
+        suggestions = get_title_index().search(
+            request.query_params.get("q", ""),
+            limit=limit,
+            author_id=self._param_to_int("author", None)
+        )
+        serializer = self.get_serializer([
+            {
+                "id": recipe_id,
+                "title": title,
+                "author_id": author_id,
+                "score": score,
+            }
+            for recipe_id, title, author_id, score in suggestions
+        ], many=True)
+        return Response(serializer.data)
+
+
 class FavoritesViewSet(
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
@@ -149,6 +314,8 @@ class FavoritesViewSet(
 
     serializer_class = serializers.FavoriteBlogRecipesSerializer
     queryset = Favorite.objects.all()
+    pagination_class = CustomPageNumberPagination
+    keyset_ordering = ("-id",)
 
     def get_queryset(self):
         """
@@ -174,8 +341,15 @@ class FavoritesViewSet(
         return list of recipes by author,
         if provided. Otherwise, return all recipes
         """
-        serializer = self.get_serializer(self.get_queryset(), many=True)
-        return Response(serializer.data)
+        recipes = serializers.BlogRecipeSerializer.setup_eager_loading(
+            BlogRecipe.objects.all()
+        )
+        queryset = self.get_queryset().prefetch_related(
+            Prefetch('recipe', queryset=recipes)
+        )
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     def destroy(self, request, *args, **kwargs):
         """
@@ -0,0 +1,237 @@
+"""
+Resizing and deduplicating scraped recipe images
+
+process_image is pure CPU work on a downloaded file, so the scraper
+runs it in a pool while it writes other recipes. Each image becomes a
+JPEG bounded by ORIGINAL_SIZE, a thumbnail bounded by THUMBNAIL_SIZE
+for list pages and responsive variants no wider than VARIANT_WIDTHS,
+in WebP (when Pillow is built with it) with a JPEG fallback.
+
+Memory per image is bounded: downloads over MAX_DOWNLOAD_BYTES and
+images over MAX_PIXELS are skipped, and JPEGs are decoded straight at
+a reduced scale when they are bigger than needed.
+
+Images are deduplicated twice: identical downloads, by the hash of
+their bytes, share stored files across recipes without being decoded
+again, and near identical pictures of one recipe, by a perceptual
+hash, are only kept once.
+"""
+import hashlib
+import os
+from io import BytesIO
+
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+from django.core.files.base import ContentFile
+from django.db import transaction
+
+from core import models
+
+
+MAX_DOWNLOAD_BYTES = 20 * 1024 * 1024
+MAX_PIXELS = 50_000_000
+ORIGINAL_SIZE = (2048, 2048)
+THUMBNAIL_SIZE = (400, 400)
+VARIANT_WIDTHS = (480, 960, 1440)
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+# perceptual hashes at most this many bits apart are the same picture
+DUPLICATE_DISTANCE = 6
+
+EXTENSIONS = {'jpeg': 'jpg', 'webp': 'webp'}
+
+
+def variant_formats():
+    """formats of the responsive variants, best first"""
+    return ('webp', 'jpeg') if features.check('webp') else ('jpeg',)
+
+
+def perceptual_hash(image):
+    """
+    64 bit difference hash of the image as 16 hex digits. Resized or
+    recompressed copies of a picture hash the same or a few bits apart
+    """
+    small = image.convert('L').resize((9, 8), Image.Resampling.LANCZOS)
+    pixels = list(small.getdata())
+    bits = 0
+    for row in range(8):
+        for column in range(8):
+            left = pixels[row * 9 + column]
+            bits = bits << 1 | (left > pixels[row * 9 + column + 1])
+    return f'{bits:016x}'
+
+
+def hash_distance(first, second):
+    """number of bits two perceptual hashes differ in"""
+    return bin(int(first, 16) ^ int(second, 16)).count('1')
+
+
+def encode(image, image_format):
+    """the image encoded as JPEG or WebP"""
+    buffer = BytesIO()
+    if image_format == 'webp':
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+    else:
+        image.save(
+            buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True,
+            progressive=True
+        )
+    return buffer.getvalue()
+
+
+def fit_size(size, bounds):
+    """size scaled down, keeping its shape, to fit in bounds"""
+    width, height = size
+    scale = min(bounds[0] / width, bounds[1] / height, 1)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def file_hash(file):
+    """sha256 of a file's contents, leaving it at the start"""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: file.read(64 * 1024), b''):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def variant_widths(width):
+    """widths of the responsive variants of an image width pixels wide"""
+    widths = [size for size in VARIANT_WIDTHS if size < width]
+    widths.append(min(width, VARIANT_WIDTHS[-1]))
+    return sorted(set(widths))
+
+
+def process_image(file):
+    """
+    decodes a downloaded image from a binary file and returns a dict of
+    its hashes, size and encoded files, or None when the file is not an
+    image or is too big to decode
+    """
+    content_hash = file_hash(file)
+    try:
+        image = Image.open(file)
+        if image.width * image.height > MAX_PIXELS:
+            return None
+        # JPEGs are decoded at the smallest 1/2, 1/4 or 1/8 scale that
+        # is still bigger than ORIGINAL_SIZE. Other formats ignore it
+        image.draft('RGB', fit_size(image.size, ORIGINAL_SIZE))
+        image.load()
+        image = ImageOps.exif_transpose(image)
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        return None
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    if image.width > ORIGINAL_SIZE[0] or image.height > ORIGINAL_SIZE[1]:
+        image = image.resize(
+            fit_size(image.size, ORIGINAL_SIZE), Image.Resampling.LANCZOS)
+
+    thumbnail = image.copy()
+    thumbnail.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
+
+    variants = []
+    for width in variant_widths(image.width):
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width \
+            else image.resize((width, height), Image.Resampling.LANCZOS)
+        for image_format in variant_formats():
+            variants.append(
+                (width, height, image_format, encode(resized, image_format)))
+
+    return {
+        'content_hash': content_hash,
+        'perceptual_hash': perceptual_hash(image),
+        'width': image.width,
+        'height': image.height,
+        'original': encode(image, 'jpeg'),
+        'thumbnail': encode(thumbnail, 'jpeg'),
+        'variants': variants,
+    }
+
+
+def is_duplicate(image_hash, kept_hashes):
+    """
+    whether the image with perceptual hash image_hash looks like one of
+    the images with the perceptual hashes in kept_hashes
+    """
+    return any(
+        hash_distance(image_hash, kept_hash) <= DUPLICATE_DISTANCE
+        for kept_hash in kept_hashes
+    )
+
+
+def stored_images(content_hashes):
+    """
+    {content hash: image} of the content_hashes whose download already
+    has stored files, with the image's variants
+    """
+    stored = models.BlogImage.objects.filter(
+        content_hash__in=content_hashes,
+        thumbnail__gt=''
+    ).prefetch_related('variants')
+    return {image.content_hash: image for image in stored}
+
+
+def copy_image(recipe, name, existing):
+    """adds an image to recipe that shares existing's stored files"""
+    image = models.BlogImage.objects.create(
+        recipe=recipe,
+        name=name,
+        image_url=existing.image_url.name,
+        thumbnail=existing.thumbnail.name,
+        content_hash=existing.content_hash,
+        perceptual_hash=existing.perceptual_hash,
+        width=existing.width,
+        height=existing.height,
+    )
+    models.BlogImageVariant.objects.bulk_create([
+        models.BlogImageVariant(
+            image=image,
+            width=variant.width,
+            height=variant.height,
+            format=variant.format,
+            file=variant.file.name,
+        )
+        for variant in existing.variants.all()
+    ])
+    return image
+
+
+@transaction.atomic
+def save_image(recipe, name, processed):
+    """
+    saves a processed image to recipe. Files already stored for the
+    same download are reused rather than written again
+    """
+    existing = stored_images([processed['content_hash']]) \
+        .get(processed['content_hash'])
+    if existing is not None:
+        return copy_image(recipe, name, existing)
+
+    stem = os.path.splitext(name)[0]
+    image = models.BlogImage(
+        recipe=recipe,
+        name=name,
+        content_hash=processed['content_hash'],
+        perceptual_hash=processed['perceptual_hash'],
+        width=processed['width'],
+        height=processed['height'],
+    )
+    image.image_url.save(
+        f'{stem}.jpg', ContentFile(processed['original']), save=False)
+    image.thumbnail.save(
+        f'{stem}-thumb.jpg', ContentFile(processed['thumbnail']),
+        save=False
+    )
+    image.save()
+
+    variants = []
+    for width, height, image_format, data in processed['variants']:
+        variant = models.BlogImageVariant(
+            image=image, width=width, height=height, format=image_format)
+        variant.file.save(
+            f'{stem}-{width}.{EXTENSIONS[image_format]}', ContentFile(data),
+            save=False
+        )
+        variants.append(variant)
+    models.BlogImageVariant.objects.bulk_create(variants)
+    return image
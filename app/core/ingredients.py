@@ -0,0 +1,144 @@
+"""
+Normalization of free text ingredients to canonical ingredient names,
+e.g. "1 cup (120g) all-purpose flour, spooned & leveled" -> "flour"
+"""
+import re
+import unicodedata
+
+
+UNITS = {
+    'c', 'can', 'cans', 'clove', 'cloves', 'cup', 'cups', 'dash',
+    'dashes', 'g', 'gram', 'grams', 'head', 'heads', 'jar', 'jars', 'kg',
+    'l', 'lb', 'lbs', 'liter', 'liters', 'ml', 'ounce', 'ounces', 'oz',
+    'package', 'packages', 'pinch', 'pinches', 'pint', 'pints', 'pound',
+    'pounds', 'quart', 'quarts', 'scoop', 'scoops', 'slice', 'slices',
+    'sprig', 'sprigs', 'stalk', 'stalks', 'stick', 'sticks', 'tablespoon',
+    'tablespoons', 'tbsp', 'tbs', 'teaspoon', 'teaspoons', 'tsp', 'bunch',
+    'bunches', 'bag', 'bags', 'box', 'boxes', 'container', 'containers',
+}
+
+DESCRIPTORS = {
+    'a', 'about', 'additional', 'an', 'approximately', 'boneless',
+    'chilled', 'chopped', 'coarsely', 'cold', 'cooked', 'crushed',
+    'cubed', 'diced', 'divided', 'extra', 'finely', 'fresh', 'freshly',
+    'frozen', 'grated', 'heaping', 'halved', 'large', 'level', 'lightly',
+    'medium', 'melted', 'minced', 'of', 'optional', 'packed', 'peeled',
+    'plus', 'roughly', 'shredded', 'skinless', 'sliced', 'small',
+    'softened', 'thinly', 'to', 'taste', 'warm', 'whole', 'at', 'room',
+    'temperature', 'for', 'serving', 'garnish', 'the', 'unsalted',
+    'salted', 'rinsed', 'drained', 'beaten', 'sifted', 'ground',
+}
+
+# spellings that mean the same pantry item
+ALIASES = {
+    'all purpose flour': 'flour',
+    'white flour': 'flour',
+    'plain flour': 'flour',
+    'granulated sugar': 'sugar',
+    'white sugar': 'sugar',
+    'cane sugar': 'sugar',
+    'confectioners sugar': 'powdered sugar',
+    'icing sugar': 'powdered sugar',
+    'light brown sugar': 'brown sugar',
+    'dark brown sugar': 'brown sugar',
+    'egg yolk': 'egg',
+    'egg white': 'egg',
+    'kosher salt': 'salt',
+    'sea salt': 'salt',
+    'table salt': 'salt',
+    'pure vanilla extract': 'vanilla extract',
+    'vanilla': 'vanilla extract',
+    'whole milk': 'milk',
+    'baking soda': 'baking soda',
+    'bicarbonate of soda': 'baking soda',
+    'extra virgin olive oil': 'olive oil',
+    'scallion': 'green onion',
+    'old fashioned oats': 'oats',
+    'rolled oats': 'oats',
+    'old fashioned rolled oats': 'oats',
+    'quick oats': 'oats',
+    'semi sweet chocolate chip': 'chocolate chip',
+    'bittersweet chocolate chip': 'chocolate chip',
+}
+
+# "juice of 1 lemon" -> "lemon juice"
+PART_OF = {'juice', 'zest', 'peel'}
+
+# words that look plural but are not
+SINGULAR = {
+    'asparagus', 'citrus', 'couscous', 'hummus', 'molasses', 'swiss',
+    'grits', 'oats', 'greens', 'brussels', 'series', 'chives', 'lentils',
+}
+
+QUANTITY_RE = re.compile(r'^[\d/.\-⁄~x]+$')
+PARENTHESES_RE = re.compile(r'\([^)]*\)|\[[^\]]*\]')
+SEPARATOR_RE = re.compile(r',|;|:| - |\bfor\b')
+WORD_RE = re.compile(r"[a-z0-9/.\-⁄~']+")
+
+
+def _singular(word):
+    """naive singular form of an english noun"""
+    if word in SINGULAR or len(word) <= 3:
+        return word
+    if word.endswith('ies'):
+        return word[:-3] + 'y'
+    if word.endswith(('oes', 'ches', 'shes', 'sses', 'xes')):
+        return word[:-2]
+    if word.endswith('s') and not word.endswith(('ss', 'us')):
+        return word[:-1]
+    return word
+
+
+def _words(text):
+    """words of text without quantities, units and descriptors"""
+    words = [word.strip(".'") for word in WORD_RE.findall(text)]
+    return [
+        word for word in words
+        if word and not QUANTITY_RE.match(word)
+        and word not in UNITS and word not in DESCRIPTORS
+    ]
+
+
+def _canonical(words):
+    """canonical name of the words left for one ingredient"""
+    if len(words) > 1 and words[0] in PART_OF:
+        words = words[1:] + words[:1]
+    else:
+        words = words[:-1] + [_singular(words[-1])]
+    name = ' '.join(' '.join(words).replace('-', ' ').split())
+    return ALIASES.get(name, name)
+
+
+def ingredient_names(text):
+    """
+    Return the canonical names in a scraped ingredient line or a
+    pantry item, e.g. ["salt", "pepper"] for "Salt and pepper, to
+    taste". Quantities, units, preparation notes and anything after a
+    comma are dropped, the last word is made singular and known
+    aliases are merged
+    """
+    text = unicodedata.normalize('NFKD', text).lower()
+    text = PARENTHESES_RE.sub(' ', text)
+    text = SEPARATOR_RE.split(text, maxsplit=1)[0]
+    text = text.replace('&', ' and ')
+
+    # "butter or margarine" -> butter, but "light or dark brown sugar"
+    # -> brown sugar, since a lone first word only qualifies the second
+    alternatives = [_words(part) for part in text.split(' or ')]
+    words = alternatives[0]
+    if len(alternatives) > 1 and len(words) == 1 and \
+            len(alternatives[1]) > 1:
+        words = alternatives[1][1:]
+
+    names = []
+    group = []
+    for word in words + ['and']:
+        if word != 'and':
+            group.append(word)
+            continue
+        if group:
+            name = _canonical(group)
+            if name not in names:
+                names.append(name)
+        group = []
+    return names
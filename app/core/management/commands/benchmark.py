@@ -0,0 +1,30 @@
+"""
+Django command to run benchmarks from the benchmarks package
+"""
+import importlib
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+
+class Command(BaseCommand):
+    """
+    Django command to run benchmarks. Each one runs in a transaction
+    that is rolled back, so no benchmark data is left in the DB
+    """
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'benchmarks',
+            nargs='+',
+            type=str,
+            help='Names of modules in the benchmarks package'
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        for name in options['benchmarks']:
+            module = importlib.import_module(f'benchmarks.{name}')
+            self.stdout.write(self.style.MIGRATE_HEADING(f'{name}:'))
+            with transaction.atomic():
+                module.run(self.stdout)
+                transaction.set_rollback(True)
@@ -0,0 +1,33 @@
+"""
+Django command to rebuild the precomputed blog recipe detail documents
+and pantry ingredient names
+"""
+from django.core.management.base import BaseCommand
+
+from core.models import BlogRecipe
+
+
+class Command(BaseCommand):
+    """Django command to backfill BlogRecipe.detail"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--missing-only',
+            action='store_true',
+            help='Only rebuild recipes that have no detail yet'
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        recipes = BlogRecipe.objects.all()
+        if options['missing_only']:
+            recipes = recipes.filter(detail__isnull=True)
+
+        count = 0
+        for recipe in recipes.iterator():
+            recipe.refresh_detail()
+            recipe.refresh_pantry_ingredients()
+            count += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f'{count} recipe details rebuilt!'))
@@ -2,12 +2,20 @@
 This script scrapes Sally's Baking Addiction
 for recipes and saves them to the DB.
 """
-from core.management.commands.utils.get_urls import get_urls
+from core.management.commands.utils.crawler import Crawler
+from core.management.commands.utils.response_cache import (
+    MODES,
+    ResponseCache
+)
+from core.management.commands.utils.get_urls import get_category_urls
 from core.management.commands.utils.add_to_db import add_recipe_to_db
+from core.management.commands.utils.sitemap import get_sitemap_urls
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 
 with open(
     'core/management/commands/utils/blog_data.json',
@@ -31,22 +39,92 @@ class Command(BaseCommand):
             type=str,
             help='Specify the category to scrape'
         )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=1,
+            help='Requests in flight at once per host'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Processes parsing pages'
+        )
+        parser.add_argument(
+            '--delay',
+            type=float,
+            default=0.5,
+            help='Seconds between the start of requests to a host'
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Fetch and write every recipe, even if it is unchanged'
+        )
+        parser.add_argument(
+            '--discover',
+            choices=('categories', 'sitemap'),
+            default='categories',
+            help='Find recipes by paging through categories, or from the '
+                 'sitemaps, fetching only recipes changed since the last '
+                 'crawl. Recipes found in the sitemaps keep their '
+                 'categories'
+        )
+        parser.add_argument(
+            '--cache',
+            choices=MODES,
+            help='Record responses to the cache directory, or replay '
+                 'them from it without the network'
+        )
+        parser.add_argument(
+            '--cache-dir',
+            type=str,
+            default='.scrape_cache',
+            help='Directory of the response cache'
+        )
 
     def handle(self, *args, **options):
         """Handle the command"""
         website = data[options['website'][0]]
         categories = options['category']
+        sitemap = options['discover'] == 'sitemap'
+        if sitemap and categories:
+            raise CommandError('--category cannot be used with sitemaps')
         if not categories:
             categories = website['categories']
 
         HEADERS = {'User-Agent': 'Mozilla/5.0 (iPad; CPU OS 12_2 like Mac OS X)\
                 AppleWebKit/605.1.15 (KHTML, like Gecko) Mobile/15E148'}
 
-        for category in categories:
-            cleaned_filename = category.split('/')[-1]
-            url = f'{website["category_entry_url"]}{category}/'
-            href_list = get_urls(url, HEADERS, website)
-            add_recipe_to_db(href_list, cleaned_filename, HEADERS, website)
-            print(f'recipes successfully compiled for {category}!')
+        cache = None
+        if options['cache']:
+            cache = ResponseCache(options['cache_dir'], options['cache'])
+
+        # Pillow releases the GIL while it resizes and encodes, so images
+        # are processed in threads
+        with Crawler(
+            HEADERS,
+            concurrency=options['concurrency'],
+            delay=options['delay'],
+            cache=cache
+        ) as crawler, ThreadPoolExecutor(options['workers']) as image_pool:
+            if sitemap:
+                lastmods = get_sitemap_urls(website, crawler)
+                add_recipe_to_db(
+                    list(lastmods), None, HEADERS, website, crawler,
+                    options['workers'], incremental=not options['full'],
+                    lastmods=lastmods, image_pool=image_pool
+                )
+            else:
+                url_categories = get_category_urls(
+                    website, categories, HEADERS, crawler)
+                add_recipe_to_db(
+                    list(url_categories), url_categories, HEADERS, website,
+                    crawler, options['workers'],
+                    incremental=not options['full'], image_pool=image_pool
+                )
+                print('recipes successfully compiled for '
+                      f'{", ".join(categories)}!')
 
         print('Complete!')
@@ -1,146 +1,226 @@
 """
 Add/update each recipe to the database
 """
-from urllib.parse import urlparse
-
-import requests
-from bs4 import BeautifulSoup as bs
+from django.db import transaction
+from django.utils import timezone
 
 from core import models
-from core.management.commands.utils.helpers import (
-    get_rating,
-    get_num_reviews,
-    get_text,
-    get_scraped_arrays,
-    set_ingredients,
-    set_instructions,
-    set_images
+from core.management.commands.utils.helpers import set_images
+from core.management.commands.utils.crawler import Crawler
+from core.management.commands.utils.extract import (
+    content_hash,
+    extract_pages
 )
+from core.management.commands.utils.writer import write_recipe_content
+
+
+def get_author(website):
+    """the site's author, created if it is new"""
+    author, create = models.BlogAuthor.objects.get_or_create(
+        name=website['name'],
+        website_link=website['website_link'],
+    )
+    return author
 
 
-def add_recipe_to_db(href_list, category, headers, website):
+def add_to_categories(author, recipe_categories):
     """
-    creates a json file from a list of urls
+    puts each recipe id in recipe_categories in the author's categories
+    named for it, creating the categories that are new. Every link is
+    made in one insert and links that already exist are left alone.
+    Recipes given a new category are marked as updated, so responses
+    listing them are no longer answered as not modified
     """
+    names = {
+        name for category_names in recipe_categories.values()
+        for name in category_names
+    }
+    if not names:
+        return
+    categories = {
+        blog_category.name: blog_category
+        for blog_category in models.BlogCategory.objects.filter(
+            author=author, name__in=names)
+    }
+    categories.update(
+        (blog_category.name, blog_category)
+        for blog_category in models.BlogCategory.objects.bulk_create([
+            models.BlogCategory(name=name, author=author)
+            for name in sorted(names - set(categories))
+        ])
+    )
+
+    RecipeCategory = models.BlogRecipe.categories.through
+    linked = set(RecipeCategory.objects.filter(
+        blogrecipe_id__in=recipe_categories
+    ).values_list('blogrecipe_id', 'blogcategory_id'))
+    new_links = {
+        (recipe_id, categories[name].id)
+        for recipe_id, category_names in recipe_categories.items()
+        for name in category_names
+    } - linked
+    if not new_links:
+        return
+    RecipeCategory.objects.bulk_create([
+        RecipeCategory(blogrecipe_id=recipe_id, blogcategory_id=category_id)
+        for recipe_id, category_id in sorted(new_links)
+    ], ignore_conflicts=True)
+    models.BlogRecipe.objects.filter(
+        id__in={recipe_id for recipe_id, _ in new_links}
+    ).update(updated_at=timezone.now())
+
+
+def add_recipe_to_db(href_list, category, headers, website, crawler=None,
+                     workers=1, incremental=True, lastmods=None,
+                     image_pool=None):
+    """
+    scrapes each url and saves the recipe to the db. category is the
+    name of the category of every recipe, None to leave categories as
+    they are, or a dict of the category names of each url. Pages are
+    fetched by crawler and parsed by workers processes as the previous
+    ones are written. Images are processed in image_pool, when given.
+
+    When incremental, pages seen before are asked for with conditional
+    requests, and a recipe is only written when its extracted content
+    differs from the last crawl. Pages whose lastmod (from the
+    sitemaps) is older than the last crawl are not fetched at all
+    """
+    if crawler is None:
+        with Crawler(headers) as crawler:
+            return add_recipe_to_db(
+                href_list, category, headers, website, crawler, workers,
+                incremental, lastmods, image_pool
+            )
+
     # scraping through each url
     print("Beginning data collection...")
 
+    states = models.CrawlState.objects.in_bulk(href_list, field_name='url') \
+        if incremental else {}
+    # validators of each fetched page, until its recipe is written
+    validators = {}
+    # crawl states of pages that did not change, saved at the end
+    unchanged = []
+
+    lastmods = lastmods or {}
+    to_fetch = []
     for url in href_list:
-        res = requests.get(url, headers=headers)
-        soup = bs(res.text, 'html.parser')
-        if soup.select(
-            website['selectors']['main_recipe_class']) is None or (
-                len(soup.select(
-                 website['selectors']['main_recipe_class'])) == 0):
+        state = states.get(url)
+        lastmod = lastmods.get(url)
+        if state is not None and state.recipe_id is not None and \
+                lastmod is not None and lastmod <= state.checked_at:
+            unchanged.append(state)
+        else:
+            to_fetch.append(url)
+
+    def fetch_pages():
+        # pages whose recipe was deleted are fetched in full
+        request_headers = {
+            url: state.conditional_headers()
+            for url, state in states.items() if state.recipe_id is not None
+        }
+        for url, res in crawler.fetch_iter(to_fetch, request_headers):
+            if res.status_code == 304 and url in states:
+                unchanged.append(states[url])
+                continue
+            validators[url] = (
+                res.headers.get('ETag', ''),
+                res.headers.get('Last-Modified', '')
+            )
+            yield url, res.text
+
+    def category_names(url):
+        if category is None:
+            return []
+        if isinstance(category, str):
+            return [category]
+        return category.get(url, [])
+
+    # author and categories are created with the first recipe found
+    author = None
+    num_written = 0
+    # categories of each recipe, linked in one go at the end
+    recipe_categories = {}
+
+    for scraped in extract_pages(fetch_pages(), website, workers):
+        if scraped is None:
             continue
 
-        parsed_url = urlparse(url)
-
-        author, create = models.BlogAuthor.objects.update_or_create(
-            name=website['name'],
-            website_link=website['website_link'],
-        )
-        category, create = models.BlogCategory.objects.update_or_create(
-            name=category,
-            author=author
-        )
+        etag, last_modified = validators.pop(scraped['url'], ('', ''))
+        scraped_hash = content_hash(scraped)
+        state = states.get(scraped['url'])
+        if state is not None and state.recipe_id is not None and \
+                state.content_hash == scraped_hash:
+            state.etag, state.last_modified = etag, last_modified
+            unchanged.append(state)
+            continue
 
-        slug = parsed_url.path.replace("/", "")
+        # everything is parsed before the transaction so it is only
+        # held open for the writes
+        with transaction.atomic():
+            if author is None:
+                author = get_author(website)
 
-        rating = 0
-        if website['name'] == "Half Baked Harvest":
-            num_reviews = get_num_reviews(
-                website['selectors']['num_reviews'], "data-attr", soup)
-            rating = get_rating(
-                website['selectors']['rating'], "data-attr", soup)
-        else:
-            rating = get_rating(
-                website['selectors']['rating'], "text", soup)
-            num_reviews = get_num_reviews(
-                website['selectors']['num_reviews'], "text", soup)
-
-        existing_recipe = models.BlogRecipe.objects.filter(
-            author=author,
-            slug=slug
-        ).first()
-
-        if existing_recipe:
-            existing_recipe.title = get_text(
-                website['selectors']['title'],
-                soup)
-            existing_recipe.slug = slug
-            existing_recipe.link = url
-            existing_recipe.rating = rating
-            existing_recipe.num_reviews = num_reviews
-            existing_recipe.description = get_text(
-                website['selectors']['description'],
-                soup)
-            existing_recipe.prep_time = get_text(
-                website['selectors']['prep_time'],
-                soup)
-            existing_recipe.cook_time = get_text(
-                website['selectors']['cook_time'],
-                soup)
-            existing_recipe.total_time = get_text(
-                website['selectors']['total_time'],
-                soup)
-            existing_recipe.servings = get_text(
-                website['selectors']['servings'],
-                soup)
-            existing_recipe.save()
-            recipe = existing_recipe
-        else:
             recipe, create = models.BlogRecipe.objects.update_or_create(
-                title=get_text(website['selectors']['title'], soup),
                 author=author,
-                slug=slug,
-                link=url,
-                rating=rating,
-                num_reviews=num_reviews,
-                description=get_text(website['selectors']['description'],
-                                     soup),
-                prep_time=get_text(website['selectors']['prep_time'],
-                                   soup),
-                cook_time=get_text(website['selectors']['cook_time'],
-                                   soup),
-                total_time=get_text(website['selectors']['total_time'],
-                                    soup),
-                servings=get_text(website['selectors']['servings'], soup)
+                slug=scraped['slug'],
+                defaults={
+                    "title": scraped['title'],
+                    "link": scraped['url'],
+                    "rating": scraped['rating'],
+                    "num_reviews": scraped['num_reviews'],
+                    "description": scraped['description'],
+                    "prep_time": scraped['prep_time'],
+                    "cook_time": scraped['cook_time'],
+                    "total_time": scraped['total_time'],
+                    "servings": scraped['servings'],
+                }
+            )
+            write_recipe_content(
+                recipe,
+                scraped['ingredients'],
+                scraped['instructions'],
+                scraped['notes']
             )
 
-        if category not in recipe.categories.all():
-            recipe.categories.add(category)
-
-        set_ingredients(
-            website['selectors']['ingredients']['class'],
-            website['selectors']['ingredients']['section_title'],
-            website['selectors']['ingredients']['list_type'],
-            soup,
-            recipe
-        )
-
-        set_instructions(
-            website['selectors']['instructions']['class'],
-            website['selectors']['instructions']['section_title'],
-            website['selectors']['instructions']['list_type'],
-            soup,
-            recipe,
-            website['name']
+        recipe_categories.setdefault(recipe.id, []).extend(
+            category_names(scraped['url']))
+        set_images(
+            recipe, website, scraped['images'], headers, crawler, image_pool)
+        recipe.refresh_detail()
+        author.bump_cache_version()
+        # saved once everything else is written, so a recipe that
+        # failed part way is written again by the next crawl
+        models.CrawlState.objects.update_or_create(
+            url=scraped['url'],
+            defaults={
+                'recipe': recipe,
+                'etag': etag,
+                'last_modified': last_modified,
+                'content_hash': scraped_hash,
+            }
         )
-
-        if website['selectors']['notes']["class"] != "":
-            notes = get_scraped_arrays(
-                website['selectors']['notes']['class'],
-                website['selectors']['notes']['list_type'],
-                soup,
-                website['selectors']['notes']['is_list_item']
-                )
-            for note in notes:
-                models.BlogNote.objects.update_or_create(
-                    recipe=recipe,
-                    note=note
-                )
-
-        set_images(recipe, website, soup, headers)
-
-    print(f"Data collected!({len(href_list)} recipes added to db)")
+        num_written += 1
+
+    # unchanged recipes may still be new to a category
+    for state in unchanged:
+        if state.recipe_id is not None:
+            recipe_categories.setdefault(state.recipe_id, []).extend(
+                category_names(state.url))
+    if any(recipe_categories.values()):
+        if author is None:
+            author = get_author(website)
+        add_to_categories(author, recipe_categories)
+        author.bump_cache_version()
+
+    if unchanged:
+        checked_at = timezone.now()
+        for state in unchanged:
+            state.checked_at = checked_at
+        models.CrawlState.objects.bulk_update(
+            unchanged, ['etag', 'last_modified', 'checked_at'])
+
+    print(
+        f"Data collected!({num_written} recipes added to db, "
+        f"{len(unchanged)} unchanged)"
+    )
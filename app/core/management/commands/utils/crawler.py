@@ -0,0 +1,255 @@
+"""
+Concurrent page and image fetching for the scraper
+"""
+import asyncio
+import queue
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+
+from core.management.commands.utils.response_cache import CacheMiss
+
+
+# statuses worth asking again for
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# hosts that can use all of their request slots at once
+MAX_HOSTS = 4
+# streamed bodies are read this much at a time, and kept in memory
+# until they grow past SPOOL_SIZE
+CHUNK_SIZE = 64 * 1024
+SPOOL_SIZE = 1024 * 1024
+
+
+class ResponseTooLarge(Exception):
+    """streamed body is bigger than the caller allows"""
+
+
+def stream_body(response, max_bytes):
+    """
+    reads the body of a streamed response into response.file, a
+    temporary file that moves from memory to disk once it is big. Gives
+    up with ResponseTooLarge once the body is over max_bytes
+    """
+    try:
+        length = response.headers.get('Content-Length', '')
+        if length.isdigit() and int(length) > max_bytes:
+            raise ResponseTooLarge(
+                f'{response.url} is {length} bytes, over {max_bytes}')
+        file = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        size = 0
+        for chunk in response.iter_content(CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_bytes:
+                file.close()
+                raise ResponseTooLarge(
+                    f'{response.url} is over {max_bytes} bytes')
+            file.write(chunk)
+        file.seek(0)
+        response.file = file
+    finally:
+        response.close()
+    return response
+
+
+class Host:
+    """request slots and politeness state for one host"""
+
+    def __init__(self, concurrency):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.lock = asyncio.Lock()
+        self.last_request = 0.0
+
+    async def wait_turn(self, delay):
+        """waits until delay seconds after the last request started"""
+        async with self.lock:
+            wait = self.last_request + delay - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self.last_request = time.monotonic()
+
+
+class Crawler:
+    """
+    Fetches URLs on an asyncio event loop running in a background
+    thread, so the caller's thread is free to parse pages and write
+    them to the DB while the next ones download. requests has no
+    asyncio API, so each request runs in a worker thread.
+
+    Each host gets at most concurrency requests in flight, requests to
+    a host start at least delay seconds apart, and connection errors
+    and RETRY_STATUSES are retried with exponential backoff (or the
+    server's Retry-After).
+
+    With a ResponseCache, responses are recorded to disk, or replayed
+    from it without touching the network (or waiting out the delay)
+
+        with Crawler(headers, concurrency=4) as crawler:
+            for url, response in crawler.fetch_iter(urls):
+                ...
+    """
+
+    def __init__(self, headers, concurrency=1, delay=0.0, retries=3,
+                 backoff=1.0, timeout=30, cache=None):
+        self.headers = headers
+        self.concurrency = concurrency
+        self.cache = cache
+        self.delay = 0.0 if cache is not None and cache.replaying \
+            else delay
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.hosts = {}
+        self.local = threading.local()
+        self.loop = None
+
+    def __enter__(self):
+        self.loop = asyncio.new_event_loop()
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.concurrency * MAX_HOSTS)
+        self.loop.set_default_executor(self.executor)
+        self.thread = threading.Thread(
+            target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        self.executor.shutdown()
+
+    def get(self, url, headers=None, max_bytes=None):
+        """
+        blocking GET with a session per worker thread. headers are
+        sent along with the crawler's own. With max_bytes, the body is
+        streamed to response.file rather than read into memory
+        """
+        if self.cache is not None and self.cache.replaying:
+            response = self.cache.load(url)
+            return stream_body(response, max_bytes) \
+                if max_bytes is not None else response
+
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+            self.local.session.headers.update(self.headers)
+        response = self.local.session.get(
+            url, headers=headers, timeout=self.timeout,
+            stream=max_bytes is not None
+        )
+        if max_bytes is not None:
+            stream_body(response, max_bytes)
+        # not modified and retried responses are not worth replaying
+        if self.cache is not None and response.status_code != 304 and \
+                response.status_code not in RETRY_STATUSES:
+            self.cache.save_response(url, response)
+        return response
+
+    def retry_wait(self, attempt, response=None):
+        """seconds to wait before retrying"""
+        wait = self.backoff * 2 ** attempt
+        retry_after = response.headers.get('Retry-After') \
+            if response is not None else None
+        if retry_after and retry_after.isdigit():
+            wait = max(wait, int(retry_after))
+        return wait
+
+    async def fetch_async(self, url, headers=None, max_bytes=None):
+        """
+        fetches url, retrying failures. Returns the last response, or
+        raises the last connection error once retries run out. Bodies
+        over max_bytes raise ResponseTooLarge without a retry
+        """
+        host_name = urlparse(url).netloc
+        if host_name not in self.hosts:
+            self.hosts[host_name] = Host(self.concurrency)
+        host = self.hosts[host_name]
+
+        async with host.semaphore:
+            for attempt in range(self.retries + 1):
+                await host.wait_turn(self.delay)
+                try:
+                    response = await self.loop.run_in_executor(
+                        None, self.get, url, headers, max_bytes)
+                except CacheMiss:
+                    raise
+                except requests.RequestException:
+                    if attempt == self.retries:
+                        raise
+                    response = None
+                else:
+                    if response.status_code not in RETRY_STATUSES or \
+                            attempt == self.retries:
+                        return response
+                await asyncio.sleep(self.retry_wait(attempt, response))
+
+    def fetch(self, url, max_bytes=None):
+        """fetches a single url"""
+        return asyncio.run_coroutine_threadsafe(
+            self.fetch_async(url, max_bytes=max_bytes), self.loop).result()
+
+    def fetch_many(self, urls, max_bytes=None):
+        """
+        fetches urls concurrently and returns their responses in the
+        same order. Urls that could not be fetched, or whose bodies are
+        over max_bytes, give None. With max_bytes, bodies are streamed
+        to response.file, which the caller closes
+        """
+        async def gather():
+            results = await asyncio.gather(
+                *(self.fetch_async(url, max_bytes=max_bytes)
+                  for url in urls),
+                return_exceptions=True
+            )
+            return [
+                None if isinstance(result, Exception) else result
+                for result in results
+            ]
+        return asyncio.run_coroutine_threadsafe(gather(), self.loop).result()
+
+    def fetch_iter(self, urls, request_headers=None):
+        """
+        yields (url, response) for urls as they are fetched. Only a
+        few more urls than can be fetched at once are in flight, so
+        responses never pile up ahead of a slow consumer. Urls that
+        could not be fetched are reported and skipped.
+
+        request_headers maps urls to extra headers for their request,
+        such as the validators of a conditional request
+        """
+        request_headers = request_headers or {}
+        urls = iter(urls)
+        results = queue.Queue()
+        window = self.concurrency * 2
+        pending = []
+
+        async def fetch_into_results(url):
+            try:
+                results.put((url, await self.fetch_async(
+                    url, request_headers.get(url))))
+            except Exception as error:  # reported by the consumer
+                results.put((url, error))
+
+        def submit_next():
+            for url in urls:
+                pending.append(asyncio.run_coroutine_threadsafe(
+                    fetch_into_results(url), self.loop))
+                return True
+            return False
+
+        try:
+            in_flight = sum(submit_next() for _ in range(window))
+            while in_flight:
+                url, response = results.get()
+                in_flight -= 1
+                in_flight += submit_next()
+                if isinstance(response, Exception):
+                    print(f'Could not fetch {url}: {response}')
+                    continue
+                yield url, response
+        finally:
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,274 @@
+"""
+Extract recipes from scraped pages into plain dicts
+
+Parsing is CPU bound, so extract_pages can spread it over worker
+processes while the command's process keeps fetching pages and
+writing to the DB. Nothing here touches the DB.
+"""
+import hashlib
+import json
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlparse
+
+from core.management.commands.utils.parsers import DEFAULT_PARSER, get_parser
+
+
+RECIPE_FIELDS = (
+    'title', 'description', 'prep_time', 'cook_time', 'total_time',
+    'servings'
+)
+
+
+def get_text(parser, pattern, node):
+    """text of the first match of pattern, or an empty string"""
+    match = parser.select_one(pattern, node)
+    return parser.text(match) if match is not None else ""
+
+
+def get_number(parser, pattern, attribute, node):
+    """
+    number in a data attribute of the first match of pattern, or in its
+    text when attribute is None
+    """
+    if attribute:
+        return float(parser.attr(parser.select(pattern, node)[0], attribute))
+    text = get_text(parser, pattern, node)
+    return 0 if text == "" else float(text)
+
+
+def get_section_titles(parser, section_pattern, title_pattern, node):
+    """gets section titles for ingredients and instructions"""
+    section_titles = []
+    for section in parser.select(section_pattern, node):
+        titles = parser.select(title_pattern, section) \
+            if title_pattern else []
+        if titles:
+            section_titles.extend(parser.text(title) for title in titles)
+        else:
+            section_titles.append('')
+    return section_titles
+
+
+def content_hash(recipe):
+    """
+    hash of an extracted recipe, which changes only when something
+    written to the DB would
+    """
+    document = json.dumps(recipe, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(document.encode('utf-8')).hexdigest()
+
+
+class RecipeExtractor:
+    """
+    Extracts recipes and category links from a site's pages with the
+    parser named by "parser" in its blog_data.json entry. The site's
+    selectors are compiled once, when the extractor is made
+    """
+
+    def __init__(self, website, parser=None):
+        self.name = website['name']
+        self.parser = get_parser(
+            parser or website.get('parser', DEFAULT_PARSER))
+        compile_selector = self.parser.compile
+        selectors = website['selectors']
+        self.patterns = {
+            key: compile_selector(selectors[key])
+            for key in (
+                'links', 'next_btn', 'main_recipe_class', 'rating',
+                'num_reviews', 'img_html'
+            ) + RECIPE_FIELDS
+        }
+        self.ingredients = self.compile_sections(selectors['ingredients'])
+        self.instructions = self.compile_sections(selectors['instructions'])
+
+        notes = selectors['notes']
+        self.notes = None
+        if notes['class'] != "":
+            if notes['is_list_item']:
+                self.notes = compile_selector(
+                    f"{notes['class']} > {notes['list_type']} > li")
+            else:
+                self.notes = compile_selector(
+                    f"{notes['class']} {notes['list_type']}")
+
+        self.list_item = compile_selector('li')
+        # ratings are in data attributes rather than text
+        self.rating_attributes = ('data-average', 'data-count') \
+            if self.name == "Half Baked Harvest" else (None, None)
+
+    def compile_sections(self, selectors):
+        """patterns for the sections, their titles and their lists"""
+        return {
+            'class': self.parser.compile(selectors['class']),
+            'section_title': self.parser.compile(selectors['section_title'])
+            if selectors['section_title'] else None,
+            'list_type': self.parser.compile(selectors['list_type']),
+        }
+
+    def extract_links(self, html):
+        """
+        returns the recipe urls on a category page and the url of the
+        next page, or an empty string on the last page
+        """
+        parser = self.parser
+        page = parser.parse(html)
+        hrefs = [
+            parser.attr(link, 'href')
+            for link in parser.select(self.patterns['links'], page)
+        ]
+        next_btn = parser.select_one(self.patterns['next_btn'], page)
+        if next_btn is None:
+            return hrefs, ''
+        return hrefs, parser.attr(next_btn, 'href')
+
+    def extract(self, url, html):
+        """
+        returns the recipe on a page as a dict, or None when the page has
+        no recipe
+        """
+        parser = self.parser
+        page = parser.parse(html)
+        if parser.select_one(self.patterns['main_recipe_class'], page) \
+                is None:
+            return None
+
+        recipe = {
+            field: get_text(parser, self.patterns[field], page)
+            for field in RECIPE_FIELDS
+        }
+        rating_attribute, num_reviews_attribute = self.rating_attributes
+        image_urls = [
+            parser.attr(img, 'src')
+            for img in parser.select(self.patterns['img_html'], page)
+        ]
+        recipe.update(
+            url=url,
+            slug=urlparse(url).path.replace("/", ""),
+            rating=get_number(
+                parser, self.patterns['rating'], rating_attribute, page),
+            num_reviews=get_number(
+                parser, self.patterns['num_reviews'], num_reviews_attribute,
+                page
+            ),
+            ingredients=self.get_ingredient_sections(page),
+            notes=[
+                parser.text(note) for note in parser.select(self.notes, page)
+            ] if self.notes else [],
+            images=[
+                src for src in image_urls
+                if src is not None and src[:5] == "https"
+            ],
+        )
+        recipe['instructions'] = self.get_instruction_sections(
+            page, recipe['slug'])
+        return recipe
+
+    def get_sections(self, patterns, page):
+        """(section title, list element) for each list in the sections"""
+        parser = self.parser
+        titles = get_section_titles(
+            parser, patterns['class'], patterns['section_title'], page)
+        lists = [
+            item_list
+            for section in parser.select(patterns['class'], page)
+            for item_list in parser.select(patterns['list_type'], section)
+        ]
+        return zip(titles, lists)
+
+    def get_ingredient_sections(self, page):
+        """gets (title, ingredients) for each ingredient section"""
+        parser = self.parser
+        sections = []
+        for title, ul in self.get_sections(self.ingredients, page):
+            li_arr = []
+            for li in parser.select(self.list_item, ul):
+                text = parser.text(li)
+                if text[:1] == "▢":
+                    text = text[2:]
+                li_arr.append(text)
+            sections.append((title, li_arr))
+        return sections
+
+    def get_instruction_sections(self, page, slug):
+        """gets (title, instructions) for each instruction section"""
+        parser = self.parser
+        sections = []
+        for title, ul in self.get_sections(self.instructions, page):
+            li_arr = []
+            for li in parser.select(self.list_item, ul):
+                if self.name == "Half Baked Harvest":
+                    # blog is fucked. no consitancy.
+                    # nested spans SOMETIMES for no good reason
+                    # get only direct span children
+                    divs = parser.children(li, 'div')[0]
+                    span_arr = parser.children(divs, 'span')
+
+                    # for buffalo chicken
+                    if len(span_arr) == 0:
+                        span_arr = parser.children(li, 'span')
+                        if len(span_arr) == 0:
+                            text = parser.text(divs)
+                            if text == "":
+                                print("1- no text here", slug)
+                            li_arr.append(text)
+                    else:
+                        for span in span_arr:
+                            text = parser.text(span)
+                            if text == "":
+                                print("2- no text here", slug)
+
+                            if text[:1].isdigit():
+                                li_arr.append(text[3:])
+                            else:
+                                li_arr.append(text)
+                else:
+                    text = parser.text(li)
+                    if text == "":
+                        print("3-no text here", slug)
+                    li_arr.append(text)
+            sections.append((title, li_arr))
+        return sections
+
+
+# extractor of each worker process, made once by init_worker
+worker_extractor = None
+
+
+def init_worker(website):
+    """compiles the site's selectors in a worker process"""
+    global worker_extractor
+    worker_extractor = RecipeExtractor(website)
+
+
+def extract_in_worker(url, html):
+    """extracts a recipe with the worker's extractor"""
+    return worker_extractor.extract(url, html)
+
+
+def extract_pages(pages, website, workers=1):
+    """
+    yields the extracted recipe (or None) for each (url, html) in
+    pages, in order. With more than one worker, pages are parsed in a
+    pool of processes, with a few pages queued per worker so the pool
+    stays busy without reading far ahead of the consumer
+    """
+    if workers <= 1:
+        extractor = RecipeExtractor(website)
+        for url, html in pages:
+            yield extractor.extract(url, html)
+        return
+
+    with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=init_worker,
+            initargs=(website,)
+    ) as pool:
+        pending = deque()
+        for url, html in pages:
+            pending.append(pool.submit(extract_in_worker, url, html))
+            while len(pending) > workers * 2 or \
+                    (pending and pending[0].done()):
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
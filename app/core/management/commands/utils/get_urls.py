@@ -2,35 +2,52 @@
 Getting urls from a category page
 """
 import copy
-import requests
-from bs4 import BeautifulSoup as bs
 
+from core.management.commands.utils.crawler import Crawler
+from core.management.commands.utils.extract import RecipeExtractor
 
-def get_urls(url, headers, website):
+
+def get_urls(url, headers, website, crawler=None):
     """
     gets all urls for the recipes in a category and returns a list of them
     """
+    if crawler is None:
+        with Crawler(headers) as crawler:
+            return get_urls(url, headers, website, crawler)
+
+    extractor = RecipeExtractor(website)
     url_copy = copy.copy(url)
 
     href_list = []
 
     print("getting urls....")
     while not url_copy == "":
-        res = requests.get(url_copy, headers=headers)
-        soup = bs(res.text, 'html.parser')
-        links = soup.select(website['selectors']['links'])
-        hrefs = [link.get('href') for link in links]
+        res = crawler.fetch(url_copy)
+        hrefs, next_url = extractor.extract_links(res.text)
 
         print('Adding %s links to list...' % len(hrefs))
         href_list.extend(hrefs)
-        next_url = ''
-
-        if soup.select(website['selectors']['next_btn']):
-            next_url = soup.select(
-                website['selectors']['next_btn']
-                )[0].get('href')
 
         url_copy = next_url
 
     print(f'Url list completed ({len(href_list)} items)')
     return href_list
+
+
+def get_category_urls(website, categories, headers, crawler):
+    """
+    gets the recipe urls of every category and returns a dict of the
+    names of the categories each url is in, so a recipe listed in
+    several categories is only scraped once
+    """
+    url_categories = {}
+    for category in categories:
+        name = category.split('/')[-1]
+        url = f'{website["category_entry_url"]}{category}/'
+        for href in get_urls(url, headers, website, crawler):
+            names = url_categories.setdefault(href, [])
+            if name not in names:
+                names.append(name)
+    print(
+        f'{len(url_categories)} recipes in {len(categories)} categories')
+    return url_categories
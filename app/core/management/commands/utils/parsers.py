@@ -0,0 +1,150 @@
+"""
+HTML parser backends for the recipe extractor
+
+Each backend parses a page and runs compiled CSS selectors over it.
+The extractor only goes through these methods, so a site can pick its
+backend with "parser" in blog_data.json:
+
+- html.parser: BeautifulSoup's pure python parser, the default
+- lxml: lxml.html with selectors translated to XPath by cssselect
+- selectolax: the lexbor engine, the fastest
+
+Every site in blog_data.json uses selectolax, so it is a requirement
+of the scraper like lxml. A site whose backend's package is missing
+falls back to html.parser, which gives the same recipes more slowly.
+"""
+import soupsieve
+from bs4 import BeautifulSoup as bs
+
+try:
+    import lxml.html
+    from lxml.cssselect import CSSSelector, SelectorError
+except ImportError:  # pragma: no cover
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # pragma: no cover
+    LexborHTMLParser = None
+
+
+DEFAULT_PARSER = 'html.parser'
+
+
+class UnsupportedSelector(ValueError):
+    """a site's CSS selector that a parser backend cannot run"""
+
+
+class SoupParser:
+    """BeautifulSoup with html.parser, selectors run by soupsieve"""
+    available = True
+
+    def compile(self, selector):
+        return soupsieve.compile(selector)
+
+    def parse(self, html):
+        return bs(html, 'html.parser')
+
+    def select(self, pattern, node):
+        return pattern.select(node)
+
+    def select_one(self, pattern, node):
+        return pattern.select_one(node)
+
+    def text(self, node):
+        return node.getText()
+
+    def attr(self, node, name):
+        return node.get(name)
+
+    def children(self, node, tag):
+        """direct children of node with the tag name"""
+        return node.find_all(tag, recursive=False)
+
+
+class LxmlParser:
+    """lxml.html, selectors compiled to XPath"""
+    available = lxml is not None
+
+    def compile(self, selector):
+        try:
+            return CSSSelector(selector, translator='html')
+        except SelectorError as error:
+            # older cssselect releases lack some CSS4 selectors
+            raise UnsupportedSelector(
+                f'lxml cannot use the selector {selector!r}: {error}')
+
+    def parse(self, html):
+        if not html.strip():
+            html = '<html></html>'
+        return lxml.html.document_fromstring(html)
+
+    def select(self, pattern, node):
+        return pattern(node)
+
+    def select_one(self, pattern, node):
+        matches = pattern(node)
+        return matches[0] if matches else None
+
+    def text(self, node):
+        return node.text_content()
+
+    def attr(self, node, name):
+        return node.get(name)
+
+    def children(self, node, tag):
+        """direct children of node with the tag name"""
+        return [child for child in node if child.tag == tag]
+
+
+class SelectolaxParser:
+    """selectolax's lexbor engine, which parses selectors itself"""
+    available = LexborHTMLParser is not None
+
+    def compile(self, selector):
+        return selector
+
+    def parse(self, html):
+        return LexborHTMLParser(html)
+
+    def select(self, pattern, node):
+        return node.css(pattern)
+
+    def select_one(self, pattern, node):
+        return node.css_first(pattern)
+
+    def text(self, node):
+        return node.text(deep=True)
+
+    def attr(self, node, name):
+        return node.attributes.get(name)
+
+    def children(self, node, tag):
+        """direct children of node with the tag name"""
+        return [child for child in node.iter() if child.tag == tag]
+
+
+PARSERS = {
+    'html.parser': SoupParser,
+    'lxml': LxmlParser,
+    'selectolax': SelectolaxParser,
+}
+
+
+def available_parsers():
+    """names of the parsers whose packages are installed"""
+    return [name for name, parser in PARSERS.items() if parser.available]
+
+
+def get_parser(name=DEFAULT_PARSER):
+    """
+    the parser backend called name, or html.parser when its package is
+    not installed
+    """
+    if name not in PARSERS:
+        raise ValueError(
+            f'Unknown parser {name!r}, expected one of {", ".join(PARSERS)}')
+    if not PARSERS[name].available:
+        print(f'The {name} package is not installed, using {DEFAULT_PARSER}')
+        name = DEFAULT_PARSER
+    return PARSERS[name]()
@@ -0,0 +1,126 @@
+"""
+On-disk cache of HTTP responses, to record a crawl once and replay it
+
+Bodies are gzipped and stored under the sha256 of their content, so a
+page or image served at several urls is kept once. Each url has a
+small JSON entry with the status, the headers and the hash of its
+body:
+
+    <directory>/responses/<2 hex>/<sha256 of url>.json
+    <directory>/bodies/<2 hex>/<sha256 of body>.gz
+
+In record mode the crawler fetches from the network and saves what it
+gets. In replay mode it only reads the cache and urls that were never
+recorded fail with CacheMiss.
+"""
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+
+RECORD = 'record'
+REPLAY = 'replay'
+MODES = (RECORD, REPLAY)
+
+
+class CacheMiss(requests.RequestException):
+    """url asked for in replay mode was never recorded"""
+
+
+def write_atomic(path, content):
+    """writes content to path so readers never see a partial file"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            file.write(content)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+class ResponseCache:
+    """
+    Records responses to, and replays them from, directory. Safe to use
+    from the crawler's worker threads
+    """
+
+    def __init__(self, directory, mode=REPLAY):
+        if mode not in MODES:
+            raise ValueError(
+                f'Unknown cache mode {mode!r}, expected one of '
+                f'{", ".join(MODES)}'
+            )
+        self.directory = directory
+        self.mode = mode
+
+    @property
+    def replaying(self):
+        """whether responses only come from the cache"""
+        return self.mode == REPLAY
+
+    def path(self, kind, digest, extension):
+        """path of a file in the cache, fanned out by its first byte"""
+        return os.path.join(
+            self.directory, kind, digest[:2], f'{digest}{extension}')
+
+    def entry_path(self, url):
+        """path of the entry recorded for url"""
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return self.path('responses', digest, '.json')
+
+    def save(self, url, status_code, headers, content):
+        """records a response for url"""
+        body = hashlib.sha256(content).hexdigest()
+        body_path = self.path('bodies', body, '.gz')
+        if not os.path.exists(body_path):
+            # mtime=0 keeps the same body byte for byte identical
+            write_atomic(body_path, gzip.compress(content, mtime=0))
+
+        entry = {
+            'url': url,
+            'status_code': status_code,
+            'headers': dict(headers),
+            'body': body,
+        }
+        write_atomic(self.entry_path(url), json.dumps(entry).encode())
+
+    def save_response(self, url, response):
+        """
+        records a requests response for url, reading streamed bodies
+        back from response.file
+        """
+        file = getattr(response, 'file', None)
+        if file is not None:
+            content = file.read()
+            file.seek(0)
+        else:
+            content = response.content
+        self.save(url, response.status_code, response.headers, content)
+
+    def load(self, url):
+        """the recorded response for url, or CacheMiss"""
+        try:
+            with open(self.entry_path(url), 'rb') as file:
+                entry = json.load(file)
+            with open(self.path('bodies', entry['body'], '.gz'), 'rb') \
+                    as file:
+                content = gzip.decompress(file.read())
+        except FileNotFoundError:
+            raise CacheMiss(f'{url} is not in the response cache')
+
+        response = requests.Response()
+        response.url = url
+        response.status_code = entry['status_code']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = content
+        response._content_consumed = True
+        return response
@@ -0,0 +1,128 @@
+"""
+Finding recipe urls, and when they last changed, from a site's sitemaps
+
+A site's "sitemap" in blog_data.json names its sitemap (usually an
+index of other sitemaps) and the part of the url of the sitemaps that
+list recipes:
+
+    "sitemap": {
+        "url": "https://example.com/sitemap_index.xml",
+        "include": "post-sitemap"
+    }
+
+Sitemaps can list tens of thousands of urls, so they are parsed as a
+stream and each entry is dropped once it is read. A sitemap is
+downloaded to a temporary file and given up on as soon as it, or its
+gunzipped content, grows past MAX_SITEMAP_BYTES.
+"""
+import zlib
+from datetime import datetime, time
+from xml.etree.ElementTree import XMLPullParser
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from core.management.commands.utils.crawler import ResponseTooLarge
+
+
+CHUNK_SIZE = 64 * 1024
+# the sitemaps protocol's limit on a sitemap, uncompressed
+MAX_SITEMAP_BYTES = 50 * 1024 * 1024
+
+
+def parse_lastmod(text):
+    """
+    aware datetime of a W3C datetime or date, or None when it is
+    missing or malformed
+    """
+    text = (text or '').strip()
+    try:
+        moment = parse_datetime(text)
+        if moment is None:
+            day = parse_date(text)
+            moment = datetime.combine(day, time()) if day else None
+    except ValueError:
+        return None
+    if moment is not None and timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, timezone.utc)
+    return moment
+
+
+def local_name(tag):
+    """tag without its XML namespace"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def iter_entries(file, gzipped=False):
+    """
+    yields (kind, loc, lastmod) for each <url> or <sitemap> entry of
+    a sitemap file, fed to the parser a chunk at a time. Raises
+    ResponseTooLarge once a gzipped sitemap unpacks to more than
+    MAX_SITEMAP_BYTES
+    """
+    parser = XMLPullParser(events=('end',))
+    # wbits=31 reads the gzip wrapper of .xml.gz sitemaps
+    decompressor = zlib.decompressobj(wbits=31) if gzipped else None
+    fields = {}
+    size = 0
+
+    for chunk in iter(lambda: file.read(CHUNK_SIZE), b''):
+        if decompressor:
+            chunk = decompressor.decompress(chunk)
+            size += len(chunk)
+            if size > MAX_SITEMAP_BYTES:
+                raise ResponseTooLarge(
+                    f'sitemap unpacks to over {MAX_SITEMAP_BYTES} bytes')
+        parser.feed(chunk)
+        for _, element in parser.read_events():
+            name = local_name(element.tag)
+            if name in ('loc', 'lastmod'):
+                fields[name] = (element.text or '').strip()
+            elif name in ('url', 'sitemap'):
+                if fields.get('loc'):
+                    yield name, fields['loc'], \
+                        parse_lastmod(fields.get('lastmod'))
+                fields = {}
+                element.clear()
+    parser.close()
+
+
+def read_sitemap(crawler, url, include=''):
+    """
+    yields (url, lastmod) for each page in the sitemap at url. Sitemap
+    indexes are followed into the sitemaps whose url contains include
+    """
+    try:
+        response = crawler.fetch(url, max_bytes=MAX_SITEMAP_BYTES)
+    except ResponseTooLarge as error:
+        print(f'skipping sitemap: {error}')
+        return
+    response.raise_for_status()
+    with response.file as file:
+        entries = iter_entries(file, url.endswith('.gz'))
+        try:
+            for kind, loc, lastmod in entries:
+                if kind == 'url':
+                    yield loc, lastmod
+                elif include in loc:
+                    yield from read_sitemap(crawler, loc, include)
+        except ResponseTooLarge as error:
+            print(f'skipping the rest of {url}: {error}')
+
+
+def get_sitemap_urls(website, crawler):
+    """
+    returns {url: lastmod} for every recipe in the site's sitemaps, in
+    sitemap order. A url listed more than once keeps its latest lastmod
+    """
+    sitemap = website['sitemap']
+    print("reading sitemaps....")
+    lastmods = {}
+    for url, lastmod in read_sitemap(
+            crawler, sitemap['url'], sitemap.get('include', '')):
+        seen = lastmods.get(url)
+        if url not in lastmods or \
+                (lastmod is not None and (seen is None or lastmod > seen)):
+            lastmods[url] = lastmod
+    print(f'Url list completed ({len(lastmods)} items)')
+    return lastmods
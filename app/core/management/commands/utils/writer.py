@@ -0,0 +1,103 @@
+"""
+Write scraped recipe content to the database in batches
+"""
+from django.db import transaction
+
+from core import models
+
+
+def diff_rows(rows, values, field):
+    """
+    positional diff of existing rows (ordered by id) against scraped
+    values. Returns the rows whose field changed, the values that need
+    new rows and the rows left over
+    """
+    changed = []
+    for row, value in zip(rows, values):
+        if getattr(row, field) != value:
+            setattr(row, field, value)
+            changed.append(row)
+    return changed, values[len(rows):], rows[len(values):]
+
+
+def apply_diff(model, field, changed, created, removed):
+    """
+    applies a diff with one bulk query per kind of change and returns
+    the created rows
+    """
+    if changed:
+        model.objects.bulk_update(changed, [field])
+    if removed:
+        model.objects.filter(id__in=[row.id for row in removed]).delete()
+    if created:
+        return model.objects.bulk_create(created)
+    return []
+
+
+def write_sections(recipe, sections, list_model, item_model, list_field,
+                   item_field):
+    """
+    writes (title, items) sections to the recipe's lists. Lists and
+    items are read back in id order, so rows are matched up by position
+    and only what changed is written
+    """
+    lists = list(list_model.objects.filter(recipe=recipe).order_by('id'))
+    changed, titles, removed = diff_rows(
+        lists, [title for title, _ in sections], 'title')
+    created = apply_diff(
+        list_model, 'title', changed,
+        [list_model(recipe=recipe, title=title) for title in titles],
+        removed
+    )
+    lists = lists[:len(sections)] + created
+
+    items_by_list = {}
+    for item in item_model.objects.filter(
+            **{f'{list_field}__recipe': recipe}).order_by('id'):
+        items_by_list.setdefault(
+            getattr(item, f'{list_field}_id'), []).append(item)
+
+    changed, created, removed = [], [], []
+    for section_list, (_, values) in zip(lists, sections):
+        list_changed, list_created, list_removed = diff_rows(
+            items_by_list.get(section_list.id, []), values, item_field)
+        changed += list_changed
+        created += [
+            item_model(**{list_field: section_list, item_field: value})
+            for value in list_created
+        ]
+        removed += list_removed
+    apply_diff(item_model, item_field, changed, created, removed)
+
+
+def write_notes(recipe, notes):
+    """writes the recipe's notes, matched up by position"""
+    rows = list(models.BlogNote.objects.filter(recipe=recipe).order_by('id'))
+    changed, values, removed = diff_rows(rows, notes, 'note')
+    apply_diff(
+        models.BlogNote, 'note', changed,
+        [models.BlogNote(recipe=recipe, note=note) for note in values],
+        removed
+    )
+
+
+def write_recipe_content(recipe, ingredients, instructions, notes):
+    """
+    replaces the ingredients, instructions and notes of recipe with the
+    scraped ones in a single transaction. Unchanged content is only
+    read, so re-scraping a recipe costs a handful of queries however
+    long it is
+    """
+    with transaction.atomic():
+        write_sections(
+            recipe, ingredients,
+            models.BlogIngredientList, models.BlogIngredient,
+            'ingredient_list', 'ingredient'
+        )
+        write_sections(
+            recipe, instructions,
+            models.BlogInstructionList, models.BlogInstruction,
+            'instruction_list', 'instruction'
+        )
+        write_notes(recipe, notes)
+        recipe.refresh_pantry_ingredients()
@@ -0,0 +1,18 @@
+# Generated by Django 4.0.10 on 2026-10-18 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0052_alter_favorite_recipe'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogrecipe',
+            name='detail',
+            field=models.JSONField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.0.10 on 2026-10-18 10:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0053_blogrecipe_detail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogauthor',
+            name='cache_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.0.10 on 2026-10-18 10:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0054_blogauthor_cache_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogauthor',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='blogrecipe',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.0.10 on 2026-10-18 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0055_blogauthor_updated_at_blogrecipe_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='blogrecipe',
+            index=models.Index(fields=['author', '-rating', '-id'], name='blogrecipe_author_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='blogrecipe',
+            index=models.Index(fields=['-rating', '-id'], name='blogrecipe_rating_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.0.10 on 2026-10-18 12:02
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0056_blogrecipe_author_rating_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogrecipe',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='blogrecipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='blogrecipe',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='blogrecipe_search_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.0.10 on 2026-10-18 13:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0057_blogrecipe_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogrecipe',
+            name='ingredient_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='BlogPantryIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pantry_ingredients', to='core.blogrecipe')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='blogpantryingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'recipe'), name='unique_pantry_ingredient'),
+        ),
+    ]
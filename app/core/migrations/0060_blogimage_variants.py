@@ -0,0 +1,55 @@
+# Generated by Django 4.0.10 on 2026-10-18 19:24
+
+import core.models
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0059_crawlstate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogimage',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='blogimage',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='blogimage',
+            name='perceptual_hash',
+            field=models.CharField(blank=True, max_length=16),
+        ),
+        migrations.AddField(
+            model_name='blogimage',
+            name='thumbnail',
+            field=models.ImageField(blank=True, null=True, upload_to=core.models.blog_recipe_image_file_path),
+        ),
+        migrations.AddField(
+            model_name='blogimage',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='BlogImageVariant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('format', models.CharField(max_length=10)),
+                ('file', models.FileField(upload_to=core.models.blog_recipe_image_file_path)),
+                ('image', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='variants', to='core.blogimage')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='blogimagevariant',
+            constraint=models.UniqueConstraint(fields=('image', 'width', 'format'), name='unique_image_variant'),
+        ),
+    ]
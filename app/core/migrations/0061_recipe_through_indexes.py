@@ -0,0 +1,29 @@
+# Generated by Django 4.0.10 on 2026-10-18 20:05
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    The auto-created through tables of Recipe.tags and
+    Recipe.ingredients can't declare indexes in Meta. Their unique
+    (recipe_id, tag_id) index serves lookups by recipe, and these serve
+    the EXISTS filters by tag or ingredient from the index alone
+    """
+
+    dependencies = [
+        ('core', '0060_blogimage_variants'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX recipe_tags_tag_recipe_idx '
+            'ON core_recipe_tags (tag_id, recipe_id);',
+            'DROP INDEX recipe_tags_tag_recipe_idx;',
+        ),
+        migrations.RunSQL(
+            'CREATE INDEX recipe_ingredients_ingredient_recipe_idx '
+            'ON core_recipe_ingredients (ingredient_id, recipe_id);',
+            'DROP INDEX recipe_ingredients_ingredient_recipe_idx;',
+        ),
+    ]
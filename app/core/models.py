@@ -4,9 +4,14 @@ Create Models for the core app
 import uuid
 import os
 from django.conf import settings
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db import connection, models
+from django.utils import timezone
 from django.utils.text import slugify
 
+from core.ingredients import ingredient_names
+
 
 from django.contrib.auth.models import (
     AbstractBaseUser,
@@ -91,6 +96,8 @@ class Recipe(models.Model):
     time_minutes = models.IntegerField()
     price = models.DecimalField(decimal_places=2, max_digits=5)
     link = models.CharField(max_length=255, blank=True)
+    # the through tables have (tag/ingredient, recipe) indexes for
+    # filtering, added in migration 0061
     ingredients = models.ManyToManyField('Ingredient')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
     tags = models.ManyToManyField('Tag')
@@ -109,6 +116,14 @@ class Tag(models.Model):
     )
     name = models.CharField(max_length=255)
 
+    class Meta:
+        indexes = [
+            # lists ordered by name, and lookups by name when saving
+            # recipes
+            models.Index(
+                fields=['user', 'name'], name='tag_user_name_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -123,6 +138,14 @@ class Ingredient(models.Model):
     )
     name = models.CharField(max_length=255)
 
+    class Meta:
+        indexes = [
+            # lists ordered by name, and lookups by name when saving
+            # recipes
+            models.Index(
+                fields=['user', 'name'], name='ingredient_user_name_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -134,10 +157,20 @@ class BlogAuthor(models.Model):
     """
     name = models.CharField(max_length=255)
     website_link = models.CharField(max_length=255)
+    # bumped by the scraper to invalidate cached blog recipe responses
+    cache_version = models.PositiveIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
 
+    def bump_cache_version(self):
+        """invalidates cached responses containing this author's recipes"""
+        BlogAuthor.objects.filter(pk=self.pk).update(
+            cache_version=models.F('cache_version') + 1,
+            updated_at=timezone.now()
+        )
+
 
 class BlogRecipe(models.Model):
     """
@@ -159,6 +192,28 @@ class BlogRecipe(models.Model):
     cook_time = models.CharField(max_length=255)
     total_time = models.CharField(max_length=255)
     servings = models.CharField(max_length=255)
+    # ingredients, instructions and notes precomputed for the detail view
+    detail = models.JSONField(null=True, blank=True, editable=False)
+    # full-text search document, rebuilt along with the detail
+    search_text = models.TextField(blank=True, default='', editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+    # number of canonical ingredient names, for pantry coverage
+    ingredient_count = models.PositiveIntegerField(default=0, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # keyset pagination of recipe lists
+            models.Index(
+                fields=['author', '-rating', '-id'],
+                name='blogrecipe_author_rating_idx'
+            ),
+            models.Index(
+                fields=['-rating', '-id'],
+                name='blogrecipe_rating_idx'
+            ),
+            GinIndex(fields=['search_vector'], name='blogrecipe_search_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         """saves the slug and adds one, if not provided"""
@@ -166,6 +221,138 @@ class BlogRecipe(models.Model):
             self.slug = slugify(self.title)
         super().save(*args, **kwargs)
 
+    def build_detail(self):
+        """
+        Build the ingredient, instruction and notes document served by
+        the recipe detail endpoint. Everything is ordered by id to
+        preserve the original order
+        """
+        ingredient_lists = self.ingredient_list.order_by('id') \
+            .prefetch_related(models.Prefetch(
+                'ingredients',
+                queryset=BlogIngredient.objects.order_by('id')
+            ))
+        instruction_lists = self.instruction_list.order_by('id') \
+            .prefetch_related(models.Prefetch(
+                'instructions',
+                queryset=BlogInstruction.objects.order_by('id')
+            ))
+
+        return {
+            'ingredient_list': [
+                {
+                    'title': ingredient_list.title,
+                    'ingredients': [
+                        ingredient.ingredient
+                        for ingredient in ingredient_list.ingredients.all()
+                    ],
+                }
+                for ingredient_list in ingredient_lists
+            ],
+            'instruction_list': [
+                {
+                    'title': instruction_list.title,
+                    'instructions': [
+                        instruction.instruction
+                        for instruction in instruction_list.instructions.all()
+                    ],
+                }
+                for instruction_list in instruction_lists
+            ],
+            'notes': list(
+                self.notes.order_by('id').values_list('note', flat=True)
+            ),
+        }
+
+    def get_search_sections(self):
+        """
+        text of the recipe grouped by search weight, from the title
+        (A) down to the notes (D)
+        """
+        detail = self.detail or self.build_detail()
+        ingredients = [
+            ingredient
+            for ingredient_list in detail['ingredient_list']
+            for ingredient in ingredient_list['ingredients']
+        ]
+        instructions = [
+            instruction
+            for instruction_list in detail['instruction_list']
+            for instruction in instruction_list['instructions']
+        ]
+        return {
+            'A': self.title,
+            'B': '\n'.join([self.description] + ingredients),
+            'C': '\n'.join(instructions),
+            'D': '\n'.join(detail['notes']),
+        }
+
+    def refresh_search(self):
+        """
+        rebuilds the search text and, on Postgres, the weighted
+        search vector
+        """
+        sections = self.get_search_sections()
+        self.search_text = '\n'.join(
+            text for text in sections.values() if text)
+        update = {'search_text': self.search_text}
+        if connection.vendor == 'postgresql':
+            vectors = [
+                SearchVector(
+                    models.Value(text, output_field=models.TextField()),
+                    weight=weight,
+                    config='english'
+                )
+                for weight, text in sections.items()
+            ]
+            search_vector = vectors[0]
+            for vector in vectors[1:]:
+                search_vector = search_vector + vector
+            update['search_vector'] = search_vector
+        BlogRecipe.objects.filter(pk=self.pk).update(**update)
+
+    def refresh_pantry_ingredients(self):
+        """
+        rebuilds the canonical ingredient names used to find recipes
+        by pantry ingredients
+        """
+        names = set()
+        for ingredient in BlogIngredient.objects.filter(
+                ingredient_list__recipe=self
+                ).values_list('ingredient', flat=True):
+            names.update(name[:255] for name in ingredient_names(ingredient))
+
+        existing = set(self.pantry_ingredients.values_list('name', flat=True))
+        if existing - names:
+            self.pantry_ingredients.filter(name__in=existing - names).delete()
+        BlogPantryIngredient.objects.bulk_create([
+            BlogPantryIngredient(recipe=self, name=name)
+            for name in names - existing
+        ])
+
+        if self.ingredient_count != len(names):
+            self.ingredient_count = len(names)
+            BlogRecipe.objects.filter(pk=self.pk).update(
+                ingredient_count=self.ingredient_count)
+
+    def refresh_detail(self):
+        """rebuilds and stores the detail and search documents"""
+        self.detail = self.build_detail()
+        self.save(update_fields=['detail', 'updated_at'])
+        self.refresh_search()
+
+    def get_detail(self):
+        """
+        returns the detail document, building it if it is missing. One
+        built here, on a read, is stored without touching updated_at,
+        which the response's Last-Modified was already taken from
+        """
+        if self.detail is None:
+            self.detail = self.build_detail()
+            BlogRecipe.objects.filter(pk=self.pk).update(detail=self.detail)
+            self.refresh_search()
+        return self.detail
+
     def __str__(self):
         return f"{self.title} by {self.author}"
 
@@ -182,11 +369,46 @@ class BlogImage(models.Model):
     name = models.CharField(max_length=255)
     image_url = models.ImageField(null=True,
                                   upload_to=blog_recipe_image_file_path)
+    # bounded by core.images.THUMBNAIL_SIZE, for list pages
+    thumbnail = models.ImageField(null=True, blank=True,
+                                  upload_to=blog_recipe_image_file_path)
+    # sha256 of the downloaded bytes, to share files between recipes
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    # difference hash, to spot the same picture at another size
+    perceptual_hash = models.CharField(max_length=16, blank=True)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
 
     def __str__(self):
         return self.name
 
 
+class BlogImageVariant(models.Model):
+    """
+    Resized copy of an image in one format, for responsive images
+    """
+    image = models.ForeignKey(
+        BlogImage,
+        related_name='variants',
+        on_delete=models.CASCADE
+    )
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    format = models.CharField(max_length=10)
+    file = models.FileField(upload_to=blog_recipe_image_file_path)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['image', 'width', 'format'],
+                name='unique_image_variant'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.image} {self.width}w {self.format}'
+
+
 class BlogIngredientList(models.Model):
     """
     Ingredient list object
@@ -217,6 +439,30 @@ class BlogIngredient(models.Model):
         return self.ingredient
 
 
+class BlogPantryIngredient(models.Model):
+    """
+    Canonical ingredient name used by a recipe. Inverted index for
+    finding recipes by the ingredients in a pantry
+    """
+    recipe = models.ForeignKey(
+        BlogRecipe,
+        related_name='pantry_ingredients',
+        on_delete=models.CASCADE
+    )
+    name = models.CharField(max_length=255)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'recipe'],
+                name='unique_pantry_ingredient'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} for {self.recipe}'
+
+
 class BlogInstructionList(models.Model):
     """
     Instruction list object
@@ -277,6 +523,37 @@ class BlogCategory(models.Model):
         return self.name
 
 
+class CrawlState(models.Model):
+    """
+    What the scraper last saw at a recipe url: the validators for
+    conditional requests and a hash of the extracted recipe, so
+    unchanged pages are neither downloaded nor written again
+    """
+    url = models.CharField(max_length=255, unique=True)
+    recipe = models.ForeignKey(
+        BlogRecipe,
+        related_name='crawl_states',
+        null=True,
+        on_delete=models.SET_NULL
+    )
+    etag = models.CharField(max_length=255, blank=True)
+    last_modified = models.CharField(max_length=255, blank=True)
+    content_hash = models.CharField(max_length=64, blank=True)
+    checked_at = models.DateTimeField(auto_now=True)
+
+    def conditional_headers(self):
+        """headers asking the server for the page only if it changed"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def __str__(self):
+        return self.url
+
+
 class Favorite(models.Model):
     """
     Favorite object
@@ -8,7 +8,9 @@ from psycopg2 import OperationalError as Psycopg2OperationalError
 
 from django.core.management import call_command
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase
+
+from core import models
 
 
 @patch('core.management.commands.wait_for_db.Command.check')
@@ -31,3 +33,35 @@ class CommandTests(SimpleTestCase):
 
         self.assertEqual(patched_check.call_count, 6)
         patched_check.assert_called_with(databases=['default'])
+
+
+class BuildBlogDetailsCommandTests(TestCase):
+    """Test the build_blog_details command"""
+
+    def setUp(self):
+        author = models.BlogAuthor.objects.create(
+            name="Sally's Baking Addiction",
+            website_link="https://sallysbakingaddiction.com/"
+        )
+        self.recipe = models.BlogRecipe.objects.create(
+            title="Banana Bread",
+            author=author,
+            rating=4.8,
+            num_reviews=10,
+            prep_time="15 minutes",
+            cook_time="60 minutes",
+            total_time="75 minutes",
+            servings="1 loaf"
+        )
+        models.BlogNote.objects.create(recipe=self.recipe, note="Freezes well")
+
+    def test_build_blog_details(self):
+        """Test details are built for recipes missing one"""
+        call_command('build_blog_details', '--missing-only')
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.detail, {
+            'ingredient_list': [],
+            'instruction_list': [],
+            'notes': ['Freezes well'],
+        })
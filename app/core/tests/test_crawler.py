@@ -0,0 +1,523 @@
+"""
+tests for the concurrent crawler, against a local fixture server
+"""
+import gzip
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from core.management.commands.utils import add_to_db
+from core.management.commands.utils.add_to_db import add_recipe_to_db
+from core.management.commands.utils.crawler import (
+    Crawler,
+    ResponseTooLarge
+)
+from core.management.commands.utils.get_urls import (
+    get_category_urls,
+    get_urls
+)
+from core.models import BlogRecipe, CrawlState
+
+
+HEADERS = {"User-Agent": "test"}
+NUM_RECIPES = 5
+
+WEBSITE = {
+    "name": "Fixture Kitchen",
+    "website_link": "http://fixture-kitchen.test/",
+    "selectors": {
+        "links": ".archive > article > a",
+        "next_btn": ".nav-links > .next",
+        "main_recipe_class": ".recipe-card",
+        "title": ".recipe-title",
+        "rating": ".rating > .average",
+        "num_reviews": ".rating > .count",
+        "description": ".recipe-summary",
+        "prep_time": ".prep-time",
+        "cook_time": ".cook-time",
+        "total_time": ".total-time",
+        "servings": ".servings",
+        "ingredients": {
+            "class": ".ingredients",
+            "list_type": "ul",
+            "section_title": "h4",
+            "is_list_item": True
+        },
+        "instructions": {
+            "class": ".instructions",
+            "list_type": "ol",
+            "is_list_item": True,
+            "section_title": ""
+        },
+        "notes": {
+            "class": ".notes",
+            "list_type": "ol",
+            "is_list_item": True
+        },
+        "img_html": ".recipe-card img"
+    }
+}
+
+
+def category_page(base_url, page):
+    """
+    Category page linking to recipes, three per page
+    """
+    links = "".join(
+        f'<article><a href="{base_url}/recipe-{number}/">'
+        f'Recipe {number}</a></article>'
+        for number in range(page * 3, min(page * 3 + 3, NUM_RECIPES))
+    )
+    next_link = ""
+    if page * 3 + 3 < NUM_RECIPES:
+        next_link = f'<a class="next" '\
+            f'href="{base_url}/category/page/{page + 1}/">Next</a>'
+    return f'''<html><body>
+        <div class="archive">{links}</div>
+        <div class="nav-links">{next_link}</div>
+    </body></html>'''
+
+
+def recipe_page(number):
+    """
+    Recipe page in the fixture site's markup
+    """
+    return f'''<html><body><div class="recipe-card">
+        <h2 class="recipe-title">Recipe {number}</h2>
+        <div class="rating"><span class="average">4.5</span>
+        <span class="count">12</span></div>
+        <div class="recipe-summary">Recipe number {number}</div>
+        <span class="prep-time">10 minutes</span>
+        <span class="cook-time">20 minutes</span>
+        <span class="total-time">30 minutes</span>
+        <span class="servings">4</span>
+        <div class="ingredients"><h4>Dough</h4>
+            <ul><li>2 cups flour</li><li>1 cup water</li></ul></div>
+        <div class="instructions">
+            <ol><li>Mix.</li><li>Bake.</li></ol></div>
+        <div class="notes"><ol><li>Keeps for {number} days.</li></ol></div>
+    </div></body></html>'''
+
+
+def sitemap_index(base_url):
+    """
+    Sitemap index of the fixture site. One of its sitemaps is gzipped
+    and lists the first recipe again
+    """
+    sitemaps = "".join(
+        f"<sitemap><loc>{base_url}/{name}</loc></sitemap>"
+        for name in (
+            "post-sitemap.xml", "post-sitemap2.xml.gz", "page-sitemap.xml")
+    )
+    return f'''<?xml version="1.0" encoding="UTF-8"?>
+    <sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+        {sitemaps}</sitemapindex>'''
+
+
+def url_set(server, numbers, paths=()):
+    """
+    Sitemap of the recipes with numbers and other pages at paths
+    """
+    urls = "".join(
+        f"<url><loc>{server.base_url}/recipe-{number}/</loc>"
+        f"<lastmod>{server.lastmods.get(number, '2024-01-01')}</lastmod>"
+        f"</url>"
+        for number in numbers
+    ) + "".join(
+        f"<url><loc>{server.base_url}{path}</loc></url>" for path in paths
+    )
+    return f'''<?xml version="1.0" encoding="UTF-8"?>
+    <urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+        {urls}</urlset>'''
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """
+    Serves the fixture site. /flaky/ fails with a 503 the first time it
+    is asked for and /slow/<n>/ takes a moment to answer. Recipe pages
+    have an ETag, unless the server's etags is off, and a recipe's
+    instructions change with its number in the server's revisions.
+    The sitemaps list every recipe with its lastmod in the server's
+    lastmods
+    """
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.path, time.monotonic()))
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            self.respond()
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def respond(self):
+        status, body, etag = 200, "", None
+        if self.path.startswith("/category/"):
+            page = self.path.strip("/").split("/")[-1]
+            body = category_page(
+                self.server.base_url, int(page) if page.isdigit() else 0)
+        elif self.path.startswith("/recipe-"):
+            number = int(self.path.strip("/").split("-")[-1])
+            revision = self.server.revisions.get(number, 0)
+            body = recipe_page(number)
+            if revision:
+                body = body.replace("Bake.", f"Bake {revision} times.")
+            if self.server.etags:
+                etag = f'"{number}-{revision}"'
+            if etag is not None and \
+                    self.headers.get("If-None-Match") == etag:
+                status, body = 304, ""
+        elif self.path.startswith("/slow/"):
+            time.sleep(0.05)
+            body = self.path
+        elif self.path == "/sitemap_index.xml":
+            body = sitemap_index(self.server.base_url)
+        elif self.path == "/post-sitemap.xml":
+            body = url_set(self.server, range(3))
+        elif self.path == "/post-sitemap2.xml.gz":
+            body = gzip.compress(
+                url_set(self.server, [*range(3, NUM_RECIPES), 0]).encode())
+        elif self.path == "/page-sitemap.xml":
+            body = url_set(self.server, [], ["/about/"])
+        elif self.path == "/flaky/":
+            with self.server.lock:
+                self.server.flaky_calls += 1
+                if self.server.flaky_calls == 1:
+                    status = 503
+            body = "ok"
+        else:
+            status = 404
+
+        content = body if isinstance(body, bytes) else body.encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(content)))
+        if etag is not None:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+class FixtureServerMixin:
+    """
+    Runs the fixture site on a free local port for each test
+    """
+    def setUp(self):
+        super().setUp()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.in_flight = 0
+        self.server.max_in_flight = 0
+        self.server.flaky_calls = 0
+        self.server.etags = True
+        self.server.revisions = {}
+        self.server.lastmods = {}
+        threading.Thread(target=self.server.serve_forever, daemon=True)\
+            .start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        self.server.base_url = self.base_url
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        super().tearDown()
+
+
+class CrawlerTests(FixtureServerMixin, SimpleTestCase):
+    """
+    Test fetching with the crawler
+    """
+    def test_fetch_iter_fetches_every_url(self):
+        """
+        Test every url is yielded once with its response
+        """
+        urls = [f"{self.base_url}/slow/{number}/" for number in range(10)]
+
+        with Crawler(HEADERS, concurrency=4) as crawler:
+            fetched = {
+                url: response.text
+                for url, response in crawler.fetch_iter(urls)
+            }
+
+        self.assertEqual(set(fetched), set(urls))
+        for url, text in fetched.items():
+            self.assertTrue(url.endswith(text))
+
+    def test_concurrency_bounded_per_host(self):
+        """
+        Test no more than concurrency requests are in flight
+        """
+        urls = [f"{self.base_url}/slow/{number}/" for number in range(12)]
+
+        with Crawler(HEADERS, concurrency=3) as crawler:
+            list(crawler.fetch_iter(urls))
+
+        self.assertGreater(self.server.max_in_flight, 1)
+        self.assertLessEqual(self.server.max_in_flight, 3)
+
+    def test_politeness_delay(self):
+        """
+        Test requests to a host start at least delay seconds apart
+        """
+        urls = [f"{self.base_url}/slow/{number}/" for number in range(4)]
+
+        with Crawler(HEADERS, concurrency=4, delay=0.1) as crawler:
+            crawler.fetch_many(urls)
+
+        starts = [started for path, started in self.server.requests]
+        gaps = [later - earlier for earlier, later in zip(starts, starts[1:])]
+        self.assertGreaterEqual(min(gaps), 0.09)
+
+    def test_retry_with_backoff(self):
+        """
+        Test a server error is retried
+        """
+        with Crawler(HEADERS, backoff=0.01) as crawler:
+            response = crawler.fetch(f"{self.base_url}/flaky/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.flaky_calls, 2)
+
+    def test_fetch_many_keeps_order(self):
+        """
+        Test responses come back in the order of the urls
+        """
+        urls = [f"{self.base_url}/slow/{number}/" for number in range(6)]
+
+        with Crawler(HEADERS, concurrency=6) as crawler:
+            responses = crawler.fetch_many(urls)
+
+        self.assertEqual(
+            [response.text for response in responses],
+            [f"/slow/{number}/" for number in range(6)]
+        )
+
+
+class StreamedFetchTests(FixtureServerMixin, SimpleTestCase):
+    """
+    Test streaming bodies to temporary files
+    """
+    def test_bodies_streamed_to_files(self):
+        """
+        Test bodies are in response.file and bodies over the limit are
+        dropped
+        """
+        urls = [f"{self.base_url}/slow/1/", f"{self.base_url}/slow/100/"]
+
+        with Crawler(HEADERS) as crawler:
+            responses = crawler.fetch_many(urls, max_bytes=len("/slow/1/"))
+
+        self.assertEqual(responses[0].file.read(), b"/slow/1/")
+        self.assertIsNone(responses[1])
+
+    def test_too_large_not_retried(self):
+        """
+        Test a body over the limit is given up on at once
+        """
+        with Crawler(HEADERS, backoff=0.01) as crawler:
+            with self.assertRaises(ResponseTooLarge):
+                crawler.fetch(f"{self.base_url}/slow/100/", max_bytes=5)
+
+        self.assertEqual(len(self.server.requests), 1)
+
+
+class CrawlScrapeTests(FixtureServerMixin, TestCase):
+    """
+    Test scraping the fixture site concurrently
+    """
+    def test_scrape_concurrently(self):
+        """
+        Test every recipe across the category pages is saved
+        """
+        with Crawler(HEADERS, concurrency=3) as crawler:
+            href_list = get_urls(
+                f"{self.base_url}/category/", HEADERS, WEBSITE, crawler)
+            add_recipe_to_db(href_list, "bread", HEADERS, WEBSITE, crawler)
+
+        self.assertEqual(len(href_list), NUM_RECIPES)
+        recipes = BlogRecipe.objects.order_by("slug")
+        self.assertEqual(
+            [recipe.title for recipe in recipes],
+            [f"Recipe {number}" for number in range(NUM_RECIPES)]
+        )
+        detail = recipes[0].get_detail()
+        self.assertEqual(detail["ingredient_list"], [
+            {"title": "Dough", "ingredients": ["2 cups flour", "1 cup water"]}
+        ])
+        self.assertEqual(detail["notes"], ["Keeps for 0 days."])
+
+
+class CategoryScrapeTests(FixtureServerMixin, TestCase):
+    """
+    Test recipes listed in several categories are scraped once
+    """
+    def test_each_recipe_fetched_once(self):
+        """
+        Test every recipe is fetched once and put in all its categories
+        with a single insert
+        """
+        website = dict(
+            WEBSITE, category_entry_url=f"{self.base_url}/category/")
+
+        with Crawler(HEADERS) as crawler:
+            url_categories = get_category_urls(
+                website, ["bread", "baking/dinner"], HEADERS, crawler)
+            with CaptureQueriesContext(connection) as queries:
+                add_recipe_to_db(
+                    list(url_categories), url_categories, HEADERS, website,
+                    crawler
+                )
+
+        self.assertEqual(
+            list(url_categories.values()),
+            [["bread", "dinner"]] * NUM_RECIPES
+        )
+        recipe_requests = [
+            path for path, _ in self.server.requests
+            if path.startswith("/recipe-")
+        ]
+        self.assertEqual(len(recipe_requests), NUM_RECIPES)
+        for recipe in BlogRecipe.objects.all():
+            self.assertEqual(
+                sorted(recipe.categories.values_list("name", flat=True)),
+                ["bread", "dinner"]
+            )
+        category_inserts = [
+            query for query in queries.captured_queries
+            if query["sql"].startswith(
+                'INSERT INTO "core_blogrecipe_categories"')
+        ]
+        self.assertEqual(len(category_inserts), 1)
+
+
+class IncrementalScrapeTests(FixtureServerMixin, TestCase):
+    """
+    Test rerunning a scrape only writes the recipes that changed
+    """
+    def scrape(self, **kwargs):
+        """scrape every recipe of the fixture site into bread"""
+        self.server.requests.clear()
+        with Crawler(HEADERS) as crawler:
+            href_list = get_urls(
+                f"{self.base_url}/category/", HEADERS, WEBSITE, crawler)
+            add_recipe_to_db(
+                href_list, "bread", HEADERS, WEBSITE, crawler, **kwargs)
+
+    def updated_at(self):
+        """when each recipe was last written, by slug"""
+        return dict(BlogRecipe.objects.values_list("slug", "updated_at"))
+
+    def test_crawl_state_saved(self):
+        """
+        Test the validators and content hash of each page are saved
+        """
+        self.scrape()
+
+        state = CrawlState.objects.get(url=f"{self.base_url}/recipe-1/")
+        self.assertEqual(state.etag, '"1-0"')
+        self.assertEqual(state.recipe.slug, "recipe-1")
+        self.assertEqual(len(state.content_hash), 64)
+        self.assertEqual(CrawlState.objects.count(), NUM_RECIPES)
+
+    def test_unchanged_pages_skipped(self):
+        """
+        Test conditional requests for unchanged pages write nothing
+        """
+        self.scrape()
+        before = self.updated_at()
+
+        # crawl states, author, category, category links, the cache
+        # version and the crawl states again, however many recipes
+        with self.assertNumQueries(6):
+            self.scrape()
+
+        self.assertEqual(self.updated_at(), before)
+
+    def test_changed_page_written(self):
+        """
+        Test only the page that changed is written again
+        """
+        self.scrape()
+        before = self.updated_at()
+        self.server.revisions[2] = 1
+
+        self.scrape()
+
+        after = self.updated_at()
+        self.assertNotEqual(after.pop("recipe-2"), before.pop("recipe-2"))
+        self.assertEqual(after, before)
+        recipe = BlogRecipe.objects.get(slug="recipe-2")
+        self.assertEqual(
+            recipe.get_detail()["instruction_list"][0]["instructions"],
+            ["Mix.", "Bake 1 times."]
+        )
+        state = CrawlState.objects.get(url=f"{self.base_url}/recipe-2/")
+        self.assertEqual(state.etag, '"2-1"')
+
+    def test_failed_write_retried(self):
+        """
+        Test a recipe whose images failed to save is written again by
+        the next crawl rather than skipped as unchanged
+        """
+        with mock.patch.object(add_to_db, "set_images", side_effect=OSError), \
+                self.assertRaises(OSError):
+            self.scrape()
+        self.assertFalse(CrawlState.objects.exists())
+
+        self.scrape()
+
+        self.assertEqual(CrawlState.objects.count(), NUM_RECIPES)
+        self.assertFalse(BlogRecipe.objects.filter(detail=None).exists())
+
+    def test_same_content_without_validators(self):
+        """
+        Test pages without validators are fetched again but only
+        written when their content changed
+        """
+        self.server.etags = False
+        self.scrape()
+        before = self.updated_at()
+
+        self.scrape()
+
+        self.assertEqual(self.updated_at(), before)
+
+    def test_unchanged_recipes_added_to_category(self):
+        """
+        Test unchanged recipes still join a newly scraped category
+        """
+        self.scrape()
+        with Crawler(HEADERS) as crawler:
+            href_list = get_urls(
+                f"{self.base_url}/category/", HEADERS, WEBSITE, crawler)
+            add_recipe_to_db(href_list, "dinner", HEADERS, WEBSITE, crawler)
+
+        recipe = BlogRecipe.objects.get(slug="recipe-0")
+        self.assertEqual(
+            sorted(recipe.categories.values_list("name", flat=True)),
+            ["bread", "dinner"]
+        )
+
+    def test_full_scrape(self):
+        """
+        Test a full scrape writes every recipe again
+        """
+        self.scrape()
+        before = self.updated_at()
+
+        self.scrape(incremental=False)
+
+        after = self.updated_at()
+        for slug, updated_at in before.items():
+            self.assertGreater(after[slug], updated_at)
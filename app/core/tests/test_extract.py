@@ -0,0 +1,83 @@
+"""
+tests for extracting recipes from scraped pages
+"""
+from django.test import SimpleTestCase
+
+from core.management.commands.utils.extract import (
+    RecipeExtractor,
+    extract_pages
+)
+from core.tests.test_crawler import WEBSITE, recipe_page
+
+
+URL = "https://fixture-kitchen.test/recipe-1/"
+
+
+class RecipeExtractorTests(SimpleTestCase):
+    """
+    Test turning pages into recipe dicts
+    """
+    def test_extract_recipe(self):
+        """
+        Test every field of the recipe is extracted
+        """
+        recipe = RecipeExtractor(WEBSITE).extract(URL, recipe_page(1))
+
+        self.assertEqual(recipe, {
+            "url": URL,
+            "slug": "recipe-1",
+            "title": "Recipe 1",
+            "description": "Recipe number 1",
+            "prep_time": "10 minutes",
+            "cook_time": "20 minutes",
+            "total_time": "30 minutes",
+            "servings": "4",
+            "rating": 4.5,
+            "num_reviews": 12,
+            "ingredients": [("Dough", ["2 cups flour", "1 cup water"])],
+            "instructions": [("", ["Mix.", "Bake."])],
+            "notes": ["Keeps for 1 days."],
+            "images": [],
+        })
+
+    def test_page_without_recipe(self):
+        """
+        Test pages without the recipe card give None
+        """
+        recipe = RecipeExtractor(WEBSITE).extract(URL, "<p>Not found</p>")
+
+        self.assertIsNone(recipe)
+
+    def test_extract_links(self):
+        """
+        Test recipe links and the next page are extracted
+        """
+        html = '''<div class="archive">
+            <article><a href="/a/">A</a></article>
+            <article><a href="/b/">B</a></article>
+        </div>
+        <div class="nav-links"><a class="next" href="/p/2/">2</a></div>'''
+
+        links = RecipeExtractor(WEBSITE).extract_links(html)
+
+        self.assertEqual(links, (["/a/", "/b/"], "/p/2/"))
+
+    def test_worker_processes_keep_order(self):
+        """
+        Test parsing in worker processes gives the same recipes, in the
+        same order, as parsing in this process
+        """
+        pages = [
+            (f"https://fixture-kitchen.test/recipe-{number}/",
+             recipe_page(number))
+            for number in range(10)
+        ]
+
+        in_process = list(extract_pages(pages, WEBSITE))
+        in_workers = list(extract_pages(iter(pages), WEBSITE, workers=2))
+
+        self.assertEqual(in_workers, in_process)
+        self.assertEqual(
+            [recipe["title"] for recipe in in_workers],
+            [f"Recipe {number}" for number in range(10)]
+        )
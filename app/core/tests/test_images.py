@@ -0,0 +1,194 @@
+"""
+tests for processing scraped recipe images
+"""
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from PIL import Image, ImageDraw
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core import images
+from core.management.commands.utils import helpers
+from core.models import BlogAuthor, BlogImage, BlogRecipe
+
+
+def picture(size=(1200, 800), shade=0, image_format="JPEG"):
+    """
+    Encoded test picture: a gradient with a block whose place and
+    colour depend on shade
+    """
+    image = Image.linear_gradient("L").resize(size).convert("RGB")
+    draw = ImageDraw.Draw(image)
+    width, height = size
+    draw.rectangle(
+        (width * shade // 10, 0, width * shade // 10 + width // 4,
+         height // 2),
+        fill=(200, 40 * shade % 255, 30)
+    )
+    buffer = BytesIO()
+    image.save(buffer, image_format)
+    return buffer.getvalue()
+
+
+def process(content):
+    """process encoded image bytes as if they were downloaded"""
+    return images.process_image(BytesIO(content))
+
+
+def size_of(content):
+    """width and height of encoded image bytes"""
+    return Image.open(BytesIO(content)).size
+
+
+class ProcessImageTests(SimpleTestCase):
+    """
+    Test the thumbnails, variants and hashes of an image
+    """
+    def test_thumbnail_and_variants(self):
+        """
+        Test the thumbnail fits the bounds and variants are made at each
+        width up to the image's own, in every format
+        """
+        processed = process(picture((1200, 800)))
+
+        self.assertEqual((processed["width"], processed["height"]),
+                         (1200, 800))
+        self.assertEqual(size_of(processed["thumbnail"]), (400, 267))
+        formats = images.variant_formats()
+        self.assertEqual(
+            [(width, image_format)
+             for width, _, image_format, _ in processed["variants"]],
+            [(width, image_format)
+             for width in (480, 960, 1200) for image_format in formats]
+        )
+        for width, height, _, data in processed["variants"]:
+            self.assertEqual(size_of(data), (width, height))
+
+    def test_small_image(self):
+        """
+        Test small images are not scaled up
+        """
+        processed = process(
+            picture((300, 200), image_format="PNG"))
+
+        self.assertEqual(size_of(processed["thumbnail"]), (300, 200))
+        self.assertEqual(
+            {width for width, _, _, _ in processed["variants"]}, {300})
+
+    def test_large_image_bounded(self):
+        """
+        Test large images are stored at most ORIGINAL_SIZE
+        """
+        processed = process(picture((4200, 2800)))
+
+        self.assertEqual(
+            (processed["width"], processed["height"]), (2048, 1365))
+        self.assertEqual(size_of(processed["original"]), (2048, 1365))
+        self.assertEqual(
+            max(width for width, _, _, _ in processed["variants"]), 1440)
+
+    def test_too_many_pixels(self):
+        """
+        Test images with more pixels than allowed are not decoded
+        """
+        with mock.patch.object(images, "MAX_PIXELS", 1000):
+            self.assertIsNone(process(picture((100, 100))))
+
+    def test_not_an_image(self):
+        """
+        Test content that is not an image is skipped
+        """
+        self.assertIsNone(process(b"<html>Not found</html>"))
+
+    def test_perceptual_duplicates(self):
+        """
+        Test a resized copy is a duplicate and another picture is not
+        """
+        original = process(picture((1200, 800)))
+        smaller = process(picture((600, 400)))
+        other = process(picture((1200, 800), shade=6))
+
+        kept = [original["perceptual_hash"]]
+        self.assertTrue(
+            images.is_duplicate(smaller["perceptual_hash"], kept))
+        self.assertFalse(images.is_duplicate(other["perceptual_hash"], kept))
+
+
+class SaveImageTests(TestCase):
+    """
+    Test saving processed images
+    """
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.media = override_settings(MEDIA_ROOT=self.media_root)
+        self.media.enable()
+        author = BlogAuthor.objects.create(
+            name="Fixture Kitchen", website_link="http://example.com/")
+        self.recipes = [
+            BlogRecipe.objects.create(
+                title=f"Recipe {number}", author=author, rating=5,
+                num_reviews=1, prep_time="", cook_time="", total_time="",
+                servings=""
+            )
+            for number in range(2)
+        ]
+
+    def tearDown(self):
+        self.media.disable()
+        shutil.rmtree(self.media_root)
+
+    def test_files_saved(self):
+        """
+        Test the image, its thumbnail and variants are stored
+        """
+        processed = process(picture())
+
+        image = images.save_image(self.recipes[0], "cake.png", processed)
+
+        self.assertEqual(image.image_url.name, "uploads/blog-recipe/cake.jpg")
+        self.assertEqual(size_of(image.thumbnail.read()), (400, 267))
+        self.assertEqual(
+            image.variants.count(), len(processed["variants"]))
+        for variant in image.variants.all():
+            self.assertEqual(size_of(variant.file.read())[0], variant.width)
+
+    def test_same_download_shares_files(self):
+        """
+        Test an image downloaded again for another recipe reuses the
+        stored files
+        """
+        processed = process(picture())
+
+        first = images.save_image(self.recipes[0], "cake.jpg", processed)
+        second = images.save_image(self.recipes[1], "cake.jpg", processed)
+
+        self.assertNotEqual(first.id, second.id)
+        self.assertEqual(second.image_url.name, first.image_url.name)
+        self.assertEqual(second.thumbnail.name, first.thumbnail.name)
+        self.assertEqual(
+            sorted(second.variants.values_list("file", flat=True)),
+            sorted(first.variants.values_list("file", flat=True))
+        )
+        self.assertEqual(BlogImage.objects.count(), 2)
+
+    def test_stored_download_not_processed(self):
+        """
+        Test a download already stored for another recipe is copied
+        without being decoded again
+        """
+        website = {"name": "Fixture Kitchen"}
+        url = "http://example.com/cake.jpg"
+        content = picture()
+        helpers.save_images(
+            self.recipes[0], website, [(url, BytesIO(content))])
+
+        with mock.patch.object(helpers, "process_image") as process_image:
+            helpers.save_images(
+                self.recipes[1], website, [(url, BytesIO(content))])
+
+        process_image.assert_not_called()
+        first, second = (recipe.images.get() for recipe in self.recipes)
+        self.assertEqual(second.image_url.name, first.image_url.name)
+        self.assertEqual(second.variants.count(), first.variants.count())
@@ -0,0 +1,45 @@
+"""
+Tests for ingredient name normalization
+"""
+from django.test import SimpleTestCase
+
+from core.ingredients import ingredient_names
+
+
+class IngredientNamesTests(SimpleTestCase):
+
+    def test_quantities_units_and_descriptors_removed(self):
+        """
+        Test quantities, units and preparation notes are dropped
+        """
+        self.assertEqual(
+            ingredient_names("2 cups (250g) all-purpose flour, spooned"),
+            ["flour"]
+        )
+        self.assertEqual(
+            ingredient_names("1 cup (240ml) whole milk, at room temperature"),
+            ["milk"]
+        )
+
+    def test_plurals_and_aliases(self):
+        """
+        Test plurals and common aliases map to one name
+        """
+        self.assertEqual(ingredient_names("3 large eggs"), ["egg"])
+        self.assertEqual(
+            ingredient_names("1 cup granulated sugar"), ["sugar"])
+        self.assertEqual(
+            ingredient_names("2 cups old-fashioned rolled oats"), ["oats"])
+
+    def test_several_ingredients_in_one_line(self):
+        """
+        Test a line naming several ingredients yields each of them
+        """
+        self.assertEqual(
+            ingredient_names("salt and pepper, to taste"), ["salt", "pepper"])
+
+    def test_juice_of(self):
+        """
+        Test 'juice of a lemon' reads as lemon juice
+        """
+        self.assertEqual(ingredient_names("juice of 1 lemon"), ["lemon juice"])
@@ -275,3 +275,46 @@ class ModelTests(TestCase):
         )
         self.assertEqual(recipe, favorite.recipe)
         self.assertEqual(user, favorite.user)
+
+    def test_refresh_pantry_ingredients(self):
+        """
+        Test pantry ingredient names are rebuilt from the ingredients
+        """
+        author = models.BlogAuthor.objects.create(
+            name="sally\'s baking addiction",
+            website_link="https://sallysbakingaddiction.com/"
+        )
+        recipe = models.BlogRecipe.objects.create(
+            author=author,
+            title="My Favorite Cornbread Recipe",
+            slug="my-favorite-cornbread",
+            rating=4.8,
+            num_reviews=282,
+            link="https://sallysbakingaddiction.com/my-favorite-cornbread/",
+            prep_time="10 minutes",
+            cook_time="20 minutes",
+            total_time="1 hour",
+            servings="9 servings",
+            description="I was never a fan of cornbread until this recipe!"
+        )
+        ingredient_list = models.BlogIngredientList.objects.create(
+            recipe=recipe,
+            title=""
+        )
+        models.BlogIngredient.objects.create(
+            ingredient="1 cup (240ml) whole milk, at room temperature",
+            ingredient_list=ingredient_list
+        )
+        buttermilk = models.BlogIngredient.objects.create(
+            ingredient="1/2 cup (120ml) buttermilk",
+            ingredient_list=ingredient_list
+        )
+
+        recipe.refresh_pantry_ingredients()
+        buttermilk.delete()
+        recipe.refresh_pantry_ingredients()
+
+        names = recipe.pantry_ingredients.values_list('name', flat=True)
+        self.assertEqual(list(names), ['milk'])
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.ingredient_count, 1)
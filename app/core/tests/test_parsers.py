@@ -0,0 +1,164 @@
+"""
+parity tests for the parser backends, over saved pages of each site
+"""
+import json
+from pathlib import Path
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.management.commands.utils.extract import RecipeExtractor
+from core.management.commands.utils.parsers import (
+    DEFAULT_PARSER,
+    SelectolaxParser,
+    SoupParser,
+    UnsupportedSelector,
+    available_parsers,
+    get_parser
+)
+
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+
+with open(
+    'core/management/commands/utils/blog_data.json',
+    'r', encoding="utf-8"
+      ) as file:
+    data = json.load(file)
+
+
+def load_page(site):
+    """
+    Saved recipe page for a site in blog_data.json
+    """
+    return (FIXTURES / f'{site}.html').read_text(encoding='utf-8')
+
+
+def extract(site, parser):
+    """
+    Extract the saved page of a site with a parser
+    """
+    return extract_with(RecipeExtractor(data[site], parser), site)
+
+
+def extract_with(extractor, site):
+    """
+    Extract the saved page of a site with an extractor
+    """
+    return extractor.extract(f'https://example.com/{site}/', load_page(site))
+
+
+class ParserParityTests(SimpleTestCase):
+    """
+    Test every parser extracts the same recipes as html.parser
+    """
+    def test_backends_match_html_parser(self):
+        """
+        Test each available parser gives the html.parser result for
+        each site
+        """
+        for site in data:
+            expected = extract(site, DEFAULT_PARSER)
+            for parser in available_parsers():
+                with self.subTest(site=site, parser=parser):
+                    # selectors are compiled up front, so only they
+                    # can skip a backend and extraction errors fail
+                    try:
+                        extractor = RecipeExtractor(data[site], parser)
+                    except UnsupportedSelector as error:
+                        self.skipTest(str(error))
+                    self.assertEqual(extract_with(extractor, site), expected)
+
+    def test_configured_parsers_available(self):
+        """
+        Test the parser each site is configured with is installed
+        """
+        for site, website in data.items():
+            with self.subTest(site=site):
+                self.assertIn(
+                    website.get('parser', DEFAULT_PARSER),
+                    available_parsers()
+                )
+
+    def test_missing_package_falls_back(self):
+        """
+        Test a parser whose package is not installed gives html.parser
+        """
+        with mock.patch.object(SelectolaxParser, 'available', False), \
+                mock.patch('builtins.print'):
+            parser = get_parser('selectolax')
+        self.assertIsInstance(parser, SoupParser)
+
+    def test_unknown_parser(self):
+        """
+        Test asking for a parser that does not exist fails
+        """
+        with self.assertRaises(ValueError):
+            get_parser('regex')
+
+
+class SiteExtractionTests(SimpleTestCase):
+    """
+    Test the saved page of each site is extracted correctly, so parity
+    is checked against the right answers
+    """
+    def test_sallys_baking_addiction(self):
+        """
+        Test the tasty-recipes card of Sally's Baking Addiction
+        """
+        recipe = extract('sallys-baking-addiction', DEFAULT_PARSER)
+
+        self.assertEqual(recipe['title'], 'Homemade Soft Pretzels')
+        self.assertEqual(recipe['rating'], 4.8)
+        self.assertEqual(recipe['num_reviews'], 214)
+        self.assertEqual(recipe['servings'], '12 pretzels')
+        self.assertEqual(
+            [title for title, ingredients in recipe['ingredients']],
+            ['Pretzel Dough', 'Baking Soda Bath', 'Topping']
+        )
+        self.assertEqual(len(recipe['instructions'][0][1]), 5)
+        self.assertEqual(len(recipe['notes']), 2)
+        # lazy-load placeholders and the slider are left out
+        self.assertEqual(len(recipe['images']), 2)
+
+    def test_budget_bytes(self):
+        """
+        Test the WP Recipe Maker card of Budget Bytes
+        """
+        recipe = extract('budget-bytes', DEFAULT_PARSER)
+
+        self.assertEqual(
+            recipe['title'], 'One Pot Creamy Cajun Chicken Pasta')
+        self.assertEqual(recipe['prep_time'], '10')
+        self.assertEqual(recipe['ingredients'][0], ('Chicken', [
+            '2 Tbsp olive oil ($0.32)',
+            '1/2 lb. boneless, skinless chicken breast ($1.72)',
+            '1 Tbsp Cajun seasoning ($0.30)',
+        ]))
+        self.assertEqual(recipe['notes'], [
+            '*Use any Cajun seasoning blend you like.',
+            'Leftovers keep for 4 days in the fridge.',
+        ])
+        # the callout image is left out
+        self.assertEqual(len(recipe['images']), 2)
+
+    def test_half_baked_harvest(self):
+        """
+        Test the data attributes and nested instruction spans of Half
+        Baked Harvest
+        """
+        recipe = extract('half-baked-harvest', DEFAULT_PARSER)
+
+        self.assertEqual(recipe['rating'], 4.9)
+        self.assertEqual(recipe['num_reviews'], 52)
+        self.assertEqual(
+            recipe['description'],
+            'Slow cooker buffalo chicken chili, spicy, cozy and made with '
+            'pantry staples.'
+        )
+        self.assertEqual(recipe['instructions'][0], ('Chili', [
+            'Heat the oil in a skillet and cook the onion until fragrant.',
+            'Add everything to the crockpot.',
+            'Cook on low for 6 hours.',
+            'Shred the chicken and stir it back into the chili.',
+        ]))
@@ -0,0 +1,119 @@
+"""
+tests for recording and replaying responses
+"""
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+
+from core.management.commands.utils.crawler import Crawler
+from core.management.commands.utils.response_cache import (
+    CacheMiss,
+    ResponseCache
+)
+from core.tests.test_crawler import HEADERS, FixtureServerMixin
+
+
+class ResponseCacheTests(FixtureServerMixin, SimpleTestCase):
+    """
+    Test the on-disk response cache under the crawler
+    """
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        super().tearDown()
+
+    def record(self, urls):
+        """fetch urls from the fixture server, recording them"""
+        cache = ResponseCache(self.directory, "record")
+        with Crawler(HEADERS, cache=cache) as crawler:
+            return crawler.fetch_many(urls)
+
+    def test_replay_without_network(self):
+        """
+        Test recorded responses are replayed once the site is gone
+        """
+        urls = [f"{self.base_url}/recipe-{number}/" for number in range(3)]
+        recorded = self.record(urls)
+        self.server.shutdown()
+        self.server.requests.clear()
+
+        cache = ResponseCache(self.directory, "replay")
+        with Crawler(HEADERS, cache=cache, delay=1) as crawler:
+            replayed = crawler.fetch_many(urls)
+
+        self.assertEqual(self.server.requests, [])
+        for before, after in zip(recorded, replayed):
+            self.assertEqual(after.status_code, before.status_code)
+            self.assertEqual(after.text, before.text)
+            self.assertEqual(after.headers["ETag"], before.headers["ETag"])
+
+    def test_replay_streamed(self):
+        """
+        Test streamed bodies are recorded and replayed to files
+        """
+        url = f"{self.base_url}/recipe-1/"
+        cache = ResponseCache(self.directory, "record")
+        with Crawler(HEADERS, cache=cache) as crawler:
+            recorded = crawler.fetch(url, max_bytes=10_000).file.read()
+
+        cache = ResponseCache(self.directory, "replay")
+        with Crawler(HEADERS, cache=cache) as crawler:
+            replayed = crawler.fetch(url, max_bytes=10_000).file.read()
+            self.assertIsNone(crawler.fetch_many([url], max_bytes=10)[0])
+
+        self.assertEqual(replayed, recorded)
+        self.assertIn(b"Recipe 1", replayed)
+
+    def test_bodies_stored_once(self):
+        """
+        Test the same body at different urls is stored once
+        """
+        cache = ResponseCache(self.directory, "record")
+        cache.save("https://example.com/a/", 200, {}, b"same")
+        cache.save("https://example.com/b/", 200, {}, b"same")
+
+        bodies = [
+            name
+            for _, _, names in os.walk(os.path.join(self.directory, "bodies"))
+            for name in names
+        ]
+        self.assertEqual(len(bodies), 1)
+        self.assertEqual(
+            cache.load("https://example.com/b/").content, b"same")
+
+    def test_retried_responses_not_recorded(self):
+        """
+        Test a server error that was retried is not replayed
+        """
+        cache = ResponseCache(self.directory, "record")
+        with Crawler(HEADERS, cache=cache, backoff=0.01) as crawler:
+            crawler.fetch(f"{self.base_url}/flaky/")
+
+        response = cache.load(f"{self.base_url}/flaky/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.text, "ok")
+
+    def test_replay_miss(self):
+        """
+        Test urls that were never recorded fail without retries
+        """
+        cache = ResponseCache(self.directory, "replay")
+        with Crawler(HEADERS, cache=cache) as crawler:
+            with self.assertRaises(CacheMiss):
+                crawler.fetch(f"{self.base_url}/recipe-1/")
+            self.assertEqual(
+                crawler.fetch_many([f"{self.base_url}/recipe-1/"]), [None])
+
+        self.assertEqual(self.server.requests, [])
+
+    def test_unknown_mode(self):
+        """
+        Test asking for a mode that does not exist fails
+        """
+        with self.assertRaises(ValueError):
+            ResponseCache(self.directory, "rewind")
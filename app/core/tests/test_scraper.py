@@ -1,10 +1,19 @@
 """
-tests for scrape.py
+tests for scrape.py, replaying recorded pages of Sally's Baking
+Addiction so they run offline
 """
+import shutil
+import tempfile
+from io import BytesIO
+
+from PIL import Image
 from django.test import TestCase
 
+from core.management.commands.utils.crawler import Crawler
 from core.management.commands.utils.get_urls import get_urls
 from core.management.commands.utils.add_to_db import add_recipe_to_db
+from core.management.commands.utils.response_cache import ResponseCache
+from core.tests.test_parsers import load_page
 
 from core.models import (
     BlogRecipe,
@@ -31,18 +40,79 @@ HEADERS = {
 }
 
 
+SLUGS = ["soft-pretzels", "pretzel-rolls", "pretzel-bites"]
+IMAGES = [
+    "https://cdn.sallysbakingaddiction.com/wp-content/uploads/2013/11/"
+    "soft-pretzels.jpg",
+    "https://cdn.sallysbakingaddiction.com/wp-content/uploads/2013/11/"
+    "pretzel-twist.jpg",
+]
+
+
+def category_page(slugs, next_url=""):
+    """
+    Category page in the markup of Sally's Baking Addiction
+    """
+    articles = "".join(
+        f'<article class="post"><a href="https://sallysbakingaddiction.com/'
+        f'{slug}/"><h2>{slug}</h2></a></article>'
+        for slug in slugs
+    )
+    next_link = f'<a class="next" href="{next_url}">Next</a>' \
+        if next_url else ""
+    return f'''<html><body>
+        <div class="archive-content">{articles}</div>
+        <div class="nav-links">{next_link}</div>
+    </body></html>'''
+
+
+def record_site(cache):
+    """
+    Records two category pages, the recipes they link to and the
+    recipes' images as if they were crawled
+    """
+    html = {"Content-Type": "text/html; charset=UTF-8"}
+    next_url = f"{URL}page/2/"
+    cache.save(URL, 200, html, category_page(SLUGS[:2], next_url).encode())
+    cache.save(next_url, 200, html, category_page(SLUGS[2:]).encode())
+    for slug in SLUGS:
+        cache.save(
+            f"https://sallysbakingaddiction.com/{slug}/", 200, html,
+            load_page("sallys-baking-addiction").encode()
+        )
+
+    image = BytesIO()
+    Image.new("RGB", (4, 6), "brown").save(image, format="JPEG")
+    for image_url in IMAGES:
+        cache.save(
+            image_url, 200, {"Content-Type": "image/jpeg"}, image.getvalue())
+
+
 class ScrapeTests(TestCase):
     """
     Test for scraping through running scrape.py
     """
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        record_site(ResponseCache(f"{self.cache_dir}/responses", "record"))
+        self.crawler = Crawler(HEADERS, cache=ResponseCache(
+            f"{self.cache_dir}/responses", "replay"))
+        self.crawler.__enter__()
+        self.media = self.settings(MEDIA_ROOT=f"{self.cache_dir}/media")
+        self.media.enable()
+
+    def tearDown(self):
+        self.media.disable()
+        self.crawler.__exit__(None, None, None)
+        shutil.rmtree(self.cache_dir)
 
     def test_get_urls(self):
         """
         Test that urls are returned
         """
 
-        href_list = get_urls(URL, HEADERS, website)
-        self.assertTrue(href_list)
+        href_list = get_urls(URL, HEADERS, website, self.crawler)
+        self.assertEqual(len(href_list), len(SLUGS))
         for url in href_list:
             self.assertTrue(
                 url.startswith("https://sallysbakingaddiction.com/")
@@ -53,8 +123,9 @@ class ScrapeTests(TestCase):
         Test that recipes are added to the database
         """
 
-        href_list = get_urls(URL, HEADERS, website)
-        add_recipe_to_db(href_list[:2], "bread", HEADERS, website)
+        href_list = get_urls(URL, HEADERS, website, self.crawler)
+        add_recipe_to_db(
+            href_list[:2], "bread", HEADERS, website, self.crawler)
         self.assertTrue(href_list)
 
         recipes = BlogRecipe.objects.all()
@@ -89,13 +160,15 @@ class ScrapeTests(TestCase):
         Test that recipes are updated in the database
         """
 
-        href_list = get_urls(URL, HEADERS, website)
-        add_recipe_to_db(href_list[:2], "bread", HEADERS, website)
+        href_list = get_urls(URL, HEADERS, website, self.crawler)
+        add_recipe_to_db(
+            href_list[:2], "bread", HEADERS, website, self.crawler)
         recipes1 = BlogRecipe.objects.all()
         ingredients1 = BlogIngredient.objects.all()
         instructions1 = BlogInstruction.objects.all()
         notes1 = BlogNote.objects.all()
-        add_recipe_to_db(href_list[:2], "bread", HEADERS, website)
+        add_recipe_to_db(
+            href_list[:2], "bread", HEADERS, website, self.crawler)
         self.assertTrue(href_list)
 
         recipes2 = BlogRecipe.objects.all()
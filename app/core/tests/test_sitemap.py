@@ -0,0 +1,153 @@
+"""
+tests for finding recipes from sitemaps
+"""
+from datetime import datetime, timezone
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from core.management.commands.utils.add_to_db import add_recipe_to_db
+from core.management.commands.utils.crawler import Crawler
+from core.management.commands.utils import sitemap
+from core.management.commands.utils.sitemap import (
+    get_sitemap_urls,
+    parse_lastmod
+)
+from core.models import BlogRecipe
+from core.tests.test_crawler import (
+    HEADERS,
+    NUM_RECIPES,
+    WEBSITE,
+    FixtureServerMixin
+)
+
+
+class SitemapTests(FixtureServerMixin, TestCase):
+    """
+    Test reading the fixture site's sitemaps
+    """
+    def setUp(self):
+        super().setUp()
+        self.website = dict(WEBSITE, sitemap={
+            "url": f"{self.base_url}/sitemap_index.xml",
+            "include": "post-sitemap",
+        })
+
+    def scrape(self):
+        """scrape the recipes in the sitemaps, without a category"""
+        self.server.requests.clear()
+        with Crawler(HEADERS) as crawler:
+            lastmods = get_sitemap_urls(self.website, crawler)
+            add_recipe_to_db(
+                list(lastmods), None, HEADERS, self.website, crawler,
+                lastmods=lastmods
+            )
+
+    def fetched_recipes(self):
+        """paths of the recipe pages fetched by the last scrape"""
+        return sorted(
+            path for path, _ in self.server.requests
+            if path.startswith("/recipe-")
+        )
+
+    def test_recipe_urls(self):
+        """
+        Test every recipe is found once with its lastmod, in plain and
+        gzipped sitemaps, and other sitemaps are left out
+        """
+        self.server.lastmods[4] = "2024-03-05T10:30:00+01:00"
+
+        with Crawler(HEADERS) as crawler:
+            lastmods = get_sitemap_urls(self.website, crawler)
+
+        self.assertEqual(list(lastmods), [
+            f"{self.base_url}/recipe-{number}/"
+            for number in range(NUM_RECIPES)
+        ])
+        self.assertEqual(
+            lastmods[f"{self.base_url}/recipe-4/"],
+            datetime(2024, 3, 5, 9, 30, tzinfo=timezone.utc)
+        )
+        self.assertNotIn(
+            "/page-sitemap.xml", [path for path, _ in self.server.requests])
+
+    def test_size_limit(self):
+        """
+        Test sitemaps over the size limit are skipped, and gzipped ones
+        are measured unpacked
+        """
+        # the index fits, the recipe sitemaps are a little bigger and
+        # the gzipped one only once unpacked
+        with mock.patch.object(sitemap, "MAX_SITEMAP_BYTES", 360), \
+                Crawler(HEADERS) as crawler:
+            self.assertEqual(get_sitemap_urls(self.website, crawler), {})
+        self.assertIn(
+            "/post-sitemap2.xml.gz",
+            [path for path, _ in self.server.requests]
+        )
+
+    def test_scrape_from_sitemaps(self):
+        """
+        Test recipes found in the sitemaps are saved
+        """
+        self.scrape()
+
+        self.assertEqual(BlogRecipe.objects.count(), NUM_RECIPES)
+        self.assertEqual(len(self.fetched_recipes()), NUM_RECIPES)
+
+    def test_only_modified_recipes_fetched(self):
+        """
+        Test a rerun only fetches recipes modified since the last crawl
+        """
+        self.scrape()
+        self.server.lastmods[2] = "2999-01-01"
+        self.server.revisions[2] = 1
+
+        self.scrape()
+
+        self.assertEqual(self.fetched_recipes(), ["/recipe-2/"])
+        recipe = BlogRecipe.objects.get(slug="recipe-2")
+        self.assertEqual(
+            recipe.get_detail()["instruction_list"][0]["instructions"],
+            ["Mix.", "Bake 1 times."]
+        )
+
+    def test_categories_kept(self):
+        """
+        Test recipes found in the sitemaps keep their categories
+        """
+        with Crawler(HEADERS) as crawler:
+            add_recipe_to_db(
+                [f"{self.base_url}/recipe-1/"], "bread", HEADERS,
+                self.website, crawler
+            )
+        self.server.lastmods[1] = "2999-01-01"
+
+        self.scrape()
+
+        recipe = BlogRecipe.objects.get(slug="recipe-1")
+        self.assertEqual(
+            list(recipe.categories.values_list("name", flat=True)),
+            ["bread"]
+        )
+
+
+class ParseLastmodTests(SimpleTestCase):
+    """
+    Test reading the W3C dates of sitemaps
+    """
+    def test_formats(self):
+        """
+        Test dates, datetimes and bad values
+        """
+        self.assertEqual(
+            parse_lastmod("2024-01-02"),
+            datetime(2024, 1, 2, tzinfo=timezone.utc)
+        )
+        self.assertEqual(
+            parse_lastmod(" 2024-01-02T03:04:05Z "),
+            datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+        )
+        self.assertIsNone(parse_lastmod("yesterday"))
+        self.assertIsNone(parse_lastmod("2024-13-45"))
+        self.assertIsNone(parse_lastmod(None))
@@ -0,0 +1,142 @@
+"""
+Tests for the batched recipe content writer
+"""
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from core import models
+from core.management.commands.utils.writer import write_recipe_content
+
+
+def create_recipe(slug="my-favorite-cornbread"):
+    """
+    Create a sample blog recipe
+    """
+    author = models.BlogAuthor.objects.create(
+        name="sally\'s baking addiction",
+        website_link="https://sallysbakingaddiction.com/"
+    )
+    return models.BlogRecipe.objects.create(
+        author=author,
+        title="My Favorite Cornbread Recipe",
+        slug=slug,
+        rating=4.8,
+        num_reviews=282,
+        link="https://sallysbakingaddiction.com/my-favorite-cornbread/",
+        prep_time="10 minutes",
+        cook_time="20 minutes",
+        total_time="1 hour",
+        servings="9 servings",
+        description="I was never a fan of cornbread until this recipe!"
+    )
+
+
+def sections(num_sections, num_items, prefix="item"):
+    """
+    Scraped (title, items) sections
+    """
+    return [
+        (f"section {section}", [
+            f"{prefix} {section}-{item}" for item in range(num_items)
+        ])
+        for section in range(num_sections)
+    ]
+
+
+class WriteRecipeContentTests(TestCase):
+    """
+    Test writing scraped ingredients, instructions and notes
+    """
+    def setUp(self):
+        self.recipe = create_recipe()
+
+    def test_write_content(self):
+        """
+        Test scraped content is written in order
+        """
+        write_recipe_content(
+            self.recipe,
+            [("", ["1 cup flour", "2 eggs"]), ("topping", ["1 cup sugar"])],
+            [("", ["Mix.", "Bake."])],
+            ["Store covered."]
+        )
+
+        detail = self.recipe.build_detail()
+        self.assertEqual(detail["ingredient_list"], [
+            {"title": "", "ingredients": ["1 cup flour", "2 eggs"]},
+            {"title": "topping", "ingredients": ["1 cup sugar"]},
+        ])
+        self.assertEqual(detail["instruction_list"], [
+            {"title": "", "instructions": ["Mix.", "Bake."]},
+        ])
+        self.assertEqual(detail["notes"], ["Store covered."])
+        self.assertEqual(self.recipe.ingredient_count, 3)
+
+    def test_rewrite_updates_in_place(self):
+        """
+        Test re-scraped content replaces the old content, keeping the
+        rows that are still there
+        """
+        write_recipe_content(
+            self.recipe,
+            [("", ["1 cup flour", "2 eggs"]), ("topping", ["1 cup sugar"])],
+            [("", ["Mix.", "Bake."])],
+            ["Store covered.", "Freeze for 3 months."]
+        )
+        flour = models.BlogIngredient.objects.get(ingredient="1 cup flour")
+
+        write_recipe_content(
+            self.recipe,
+            [("", ["1 cup flour", "3 eggs", "1 cup milk"])],
+            [("", ["Mix.", "Bake."])],
+            ["Store covered."]
+        )
+
+        detail = self.recipe.build_detail()
+        self.assertEqual(detail["ingredient_list"], [
+            {
+                "title": "",
+                "ingredients": ["1 cup flour", "3 eggs", "1 cup milk"]
+            },
+        ])
+        self.assertEqual(detail["notes"], ["Store covered."])
+        self.assertTrue(models.BlogIngredient.objects.filter(
+            id=flour.id).exists())
+        self.assertEqual(
+            models.BlogIngredientList.objects.filter(
+                recipe=self.recipe).count(), 1)
+
+    def test_query_count_independent_of_size(self):
+        """
+        Test writing a recipe costs the same number of queries however
+        many rows it has
+        """
+        def count_write_queries(num_items):
+            recipe = create_recipe(slug=f"recipe-{num_items}")
+            with CaptureQueriesContext(connection) as queries:
+                write_recipe_content(
+                    recipe,
+                    sections(2, num_items),
+                    sections(2, num_items),
+                    [f"note {note}" for note in range(num_items)]
+                )
+            return len(queries)
+
+        self.assertEqual(count_write_queries(2), count_write_queries(20))
+
+    def test_unchanged_content_only_read(self):
+        """
+        Test re-writing the same content makes no writes
+        """
+        content = (sections(2, 5), sections(2, 5), ["Store covered."])
+        write_recipe_content(self.recipe, *content)
+
+        with CaptureQueriesContext(connection) as queries:
+            write_recipe_content(self.recipe, *content)
+
+        writes = [
+            query["sql"] for query in queries.captured_queries
+            if query["sql"].startswith(("INSERT", "UPDATE", "DELETE"))
+        ]
+        self.assertEqual(writes, [])
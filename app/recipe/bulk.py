@@ -0,0 +1,190 @@
+"""
+Creating, updating and deleting many of a user's recipes at once
+
+Items are validated by a single RecipeBulkSerializer, as building a
+serializer's fields costs more than validating an item. The valid ones
+are then written in a single transaction with bulk inserts and
+updates, so an import takes the same few queries however many recipes
+it has.
+Each item gets a result, in the order given:
+
+    {"index": 0, "status": 201, "id": 12}
+    {"index": 1, "status": 400, "errors": {"title": ["..."]}}
+"""
+from django.db import transaction
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+
+from core.models import Ingredient, Recipe, Tag
+from recipe.related import get_or_create_named, set_related
+from recipe.serializers import RecipeBulkSerializer
+
+
+MAX_ITEMS = 1000
+RELATED = (("tags", Tag), ("ingredients", Ingredient))
+
+
+def result(index, code, **fields):
+    """the result of the item at index"""
+    return {"index": index, "status": code, **fields}
+
+
+def response_status(results, success):
+    """
+    success when every item succeeded, 400 when none did and 207 when
+    only some did
+    """
+    succeeded = sum(item["status"] == success for item in results)
+    if succeeded == len(results):
+        return success
+    if not succeeded:
+        return status.HTTP_400_BAD_REQUEST
+    return status.HTTP_207_MULTI_STATUS
+
+
+def is_id(value):
+    """whether value is a whole number, as a recipe id must be"""
+    # JSON true and false are parsed as bools, which are ints
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def invalid_id(index):
+    """the result of an item whose id is not a whole number"""
+    return result(
+        index, status.HTTP_400_BAD_REQUEST,
+        errors={"id": ["A valid integer is required."]}
+    )
+
+
+def validate(serializer, item):
+    """(validated data, None) for a valid item, else (None, errors)"""
+    try:
+        return serializer.run_validation(item), None
+    except ValidationError as error:
+        return None, error.detail
+
+
+def write_related(user, written, created=False):
+    """
+    sets the tags and ingredients of each (recipe, validated data) in
+    written that gives them
+    """
+    for field, model in RELATED:
+        given = [
+            (recipe, data[field]) for recipe, data in written
+            if field in data
+        ]
+        if not given:
+            continue
+        named = get_or_create_named(model, user, [
+            item["name"] for _, items in given for item in items])
+        set_related(field, {
+            recipe.id: {named[item["name"]].id for item in items}
+            for recipe, items in given
+        }, created=created)
+
+
+def recipe_fields(data):
+    """validated data without the tags and ingredients"""
+    return {
+        key: value for key, value in data.items()
+        if key not in ("tags", "ingredients")
+    }
+
+
+@transaction.atomic
+def create_recipes(items, context):
+    """creates a recipe from each valid item"""
+    user = context["request"].user
+    serializer = RecipeBulkSerializer(context=context)
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        data, errors = validate(serializer, item)
+        if errors:
+            results[index] = result(
+                index, status.HTTP_400_BAD_REQUEST, errors=errors)
+        else:
+            valid.append((index, data))
+
+    recipes = Recipe.objects.bulk_create([
+        Recipe(user=user, **recipe_fields(data)) for _, data in valid])
+    written = [(recipe, data) for recipe, (_, data) in zip(recipes, valid)]
+    write_related(user, written, created=True)
+
+    for recipe, (index, _) in zip(recipes, valid):
+        results[index] = result(index, status.HTTP_201_CREATED, id=recipe.id)
+    return results, response_status(results, status.HTTP_201_CREATED)
+
+
+@transaction.atomic
+def update_recipes(items, context):
+    """updates the user's recipe given by the id of each valid item"""
+    user = context["request"].user
+    recipes = Recipe.objects.filter(user=user).in_bulk([
+        item["id"] for item in items
+        if isinstance(item, dict) and is_id(item.get("id"))
+    ])
+    serializer = RecipeBulkSerializer(partial=True, context=context)
+    results = [None] * len(items)
+    written = []
+    fields = set()
+    seen = set()
+    for index, item in enumerate(items):
+        recipe_id = item.get("id") if isinstance(item, dict) else None
+        if not is_id(recipe_id):
+            results[index] = invalid_id(index)
+            continue
+        if recipe_id not in recipes:
+            results[index] = result(
+                index, status.HTTP_404_NOT_FOUND,
+                errors={"id": ["No recipe with this id."]}
+            )
+            continue
+        if recipe_id in seen:
+            results[index] = result(
+                index, status.HTTP_400_BAD_REQUEST,
+                errors={"id": ["Given more than once."]}
+            )
+            continue
+        seen.add(recipe_id)
+        data, errors = validate(serializer, item)
+        if errors:
+            results[index] = result(
+                index, status.HTTP_400_BAD_REQUEST, errors=errors)
+            continue
+        recipe = recipes[recipe_id]
+        for key, value in recipe_fields(data).items():
+            setattr(recipe, key, value)
+            fields.add(key)
+        written.append((recipe, data))
+        results[index] = result(index, status.HTTP_200_OK, id=recipe_id)
+
+    if fields:
+        Recipe.objects.bulk_update(
+            [recipe for recipe, _ in written], sorted(fields))
+    write_related(user, written)
+    return results, response_status(results, status.HTTP_200_OK)
+
+
+@transaction.atomic
+def delete_recipes(items, context):
+    """deletes the user's recipes with the ids in items"""
+    user = context["request"].user
+    recipes = Recipe.objects.filter(user=user, id__in=[
+        item for item in items if is_id(item)])
+    found = set(recipes.values_list("id", flat=True))
+    recipes.delete()
+
+    results = []
+    for index, item in enumerate(items):
+        if not is_id(item):
+            results.append(invalid_id(index))
+        elif item in found:
+            results.append(result(index, status.HTTP_200_OK, id=item))
+        else:
+            results.append(result(
+                index, status.HTTP_404_NOT_FOUND,
+                errors={"id": ["No recipe with this id."]}
+            ))
+    return results, response_status(results, status.HTTP_200_OK)
@@ -0,0 +1,67 @@
+"""
+Set-based writes of the tags and ingredients of recipes
+
+Saving the tags and ingredients of any number of recipes takes at most
+three queries per relation: one for the names the user already has,
+one insert of the missing ones and, per recipe, only the through rows
+that change are inserted or deleted.
+"""
+from collections import defaultdict
+
+from django.db.models import Q
+
+from core.models import Recipe
+
+
+# through table column of each relation's tag or ingredient
+TARGETS = {"tags": "tag_id", "ingredients": "ingredient_id"}
+
+
+def get_or_create_named(model, user, names):
+    """
+    {name: object} of the user's tags or ingredients with names, with
+    the missing ones created in a single insert
+    """
+    names = list(dict.fromkeys(names))
+    if not names:
+        return {}
+    found = {}
+    # newest first, so the oldest of any duplicate names wins
+    for obj in model.objects.filter(
+            user=user, name__in=names).order_by("-id"):
+        found[obj.name] = obj
+    missing = [
+        model(user=user, name=name) for name in names if name not in found
+    ]
+    model.objects.bulk_create(missing)
+    found.update((obj.name, obj) for obj in missing)
+    return found
+
+
+def set_related(field, wanted, created=False):
+    """
+    set the tags or ingredients (field) of each recipe id in wanted, a
+    {recipe_id: set of ids}, only inserting and deleting the through
+    rows that change. created skips reading rows new recipes can't have
+    """
+    through = getattr(Recipe, field).through
+    target = TARGETS[field]
+    current = defaultdict(set)
+    if not created:
+        for recipe_id, target_id in through.objects.filter(
+                recipe_id__in=wanted).values_list("recipe_id", target):
+            current[recipe_id].add(target_id)
+
+    removed = Q()
+    added = []
+    for recipe_id, ids in wanted.items():
+        gone = current[recipe_id] - ids
+        if gone:
+            removed |= Q(recipe_id=recipe_id, **{f"{target}__in": gone})
+        added.extend(
+            through(recipe_id=recipe_id, **{target: target_id})
+            for target_id in ids - current[recipe_id]
+        )
+    if removed:
+        through.objects.filter(removed).delete()
+    through.objects.bulk_create(added)
@@ -2,6 +2,7 @@
 serializers for recipe apis
 """
 
+from django.db import transaction
 from rest_framework import serializers
 
 from core.models import (
@@ -9,6 +10,7 @@ from core.models import (
     Tag,
     Ingredient,
 )
+from recipe.related import get_or_create_named, set_related
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -27,6 +29,22 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
+class IngredientCountSerializer(IngredientSerializer):
+    """Serializer for ingredients with the number of recipes using them"""
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(IngredientSerializer.Meta):
+        fields = IngredientSerializer.Meta.fields + ('recipe_count',)
+
+
+class TagCountSerializer(TagSerializer):
+    """Serializer for tags with the number of recipes using them"""
+    recipe_count = serializers.IntegerField(read_only=True)
+
+    class Meta(TagSerializer.Meta):
+        fields = TagSerializer.Meta.fields + ('recipe_count',)
+
+
 class RecipeSerializer(serializers.ModelSerializer):
     """Serializer for recipes"""
     tags = TagSerializer(many=True, required=False)
@@ -40,47 +58,39 @@ class RecipeSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ('id',)
 
-    def _get_or_create_tags(self, tags, recipe):
-        """handle getting or creating tags"""
-        auth_user = self.context["request"].user
-        for tag in tags:
-            tag_obj, created = Tag.objects.get_or_create(
-                user=auth_user,
-                **tag,
-            )
-            recipe.tags.add(tag_obj)
-
-    def _get_or_create_ingredients(self, ingredients, recipe):
-        """handle getting or creating ingredients"""
-        auth_user = self.context["request"].user
-        for ingredient in ingredients:
-            ing_obj, create = Ingredient.objects.get_or_create(
-                user=auth_user,
-                **ingredient
-            )
-            recipe.ingredients.add(ing_obj)
+    def _set_named(self, recipe, field, model, items, created=False):
+        """set recipe's tags or ingredients to the ones named in items"""
+        named = get_or_create_named(
+            model, self.context["request"].user,
+            [item["name"] for item in items]
+        )
+        set_related(
+            field, {recipe.id: {obj.id for obj in named.values()}},
+            created=created
+        )
 
+    @transaction.atomic
     def create(self, validated_data):
         """Create a recipe"""
         tags = validated_data.pop("tags", [])
         ingredients = validated_data.pop('ingredients', [])
         recipe = Recipe.objects.create(**validated_data)
-        self._get_or_create_tags(tags, recipe)
-        self._get_or_create_ingredients(ingredients, recipe)
+        self._set_named(recipe, "tags", Tag, tags, created=True)
+        self._set_named(
+            recipe, "ingredients", Ingredient, ingredients, created=True)
 
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         """Update a recipe"""
         tags = validated_data.pop("tags", None)
         if tags is not None:
-            instance.tags.clear()
-            self._get_or_create_tags(tags, instance)
+            self._set_named(instance, "tags", Tag, tags)
 
         ingredients = validated_data.pop('ingredients', None)
         if ingredients is not None:
-            instance.ingredients.clear()
-            self._get_or_create_ingredients(ingredients, instance)
+            self._set_named(instance, "ingredients", Ingredient, ingredients)
 
         for key, value in validated_data.items():
             setattr(instance, key, value)
@@ -98,6 +108,15 @@ class RecipeDetailSerializer(RecipeSerializer):
         read_only_fields = ('id',)
 
 
+class RecipeBulkSerializer(RecipeSerializer):
+    """
+    Serializer for recipes written in bulk. Images are uploaded one
+    recipe at a time
+    """
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ("description",)
+
+
 class RecipeImageSerializer(serializers.ModelSerializer):
     """
     Serializer for uploading images to recipes
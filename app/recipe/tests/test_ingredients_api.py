@@ -4,6 +4,7 @@ tests for the ingredients API
 from decimal import Decimal
 
 from django.contrib.auth import get_user_model
+from django.db.models import Count
 from django.urls import reverse
 from django.test import TestCase
 
@@ -14,7 +15,7 @@ from core.models import (
     Ingredient,
     Recipe,)
 
-from recipe.serializers import IngredientSerializer
+from recipe.serializers import IngredientCountSerializer
 
 INGREDIENTS_URL = reverse("recipe:ingredient-list")
 
@@ -65,8 +66,9 @@ class PrivateIngredientsApiTests(TestCase):
         Ingredient.objects.create(user=self.user, name="Salt")
 
         res = self.client.get(INGREDIENTS_URL)
-        ingredients = Ingredient.objects.all().order_by("-name")
-        serializer = IngredientSerializer(ingredients, many=True)
+        ingredients = Ingredient.objects.annotate(
+            recipe_count=Count("recipe")).order_by("-name")
+        serializer = IngredientCountSerializer(ingredients, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
 
@@ -123,10 +125,11 @@ class PrivateIngredientsApiTests(TestCase):
         )
         recipe.ingredients.add(ingredient1)
         res = self.client.get(INGREDIENTS_URL, {"assigned_only": 1})
-        serializer1 = IngredientSerializer(ingredient1)
-        serializer2 = IngredientSerializer(ingredient2)
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertEqual(
+            [(item["id"], item["recipe_count"]) for item in res.data],
+            [(ingredient1.id, 1)]
+        )
+        self.assertNotIn(ingredient2.id, [item["id"] for item in res.data])
 
     def test_filter_ingredients_assigned_unique(self):
         """
@@ -150,3 +153,23 @@ class PrivateIngredientsApiTests(TestCase):
         recipe2.ingredients.add(ingredient)
         res = self.client.get(INGREDIENTS_URL, {"assigned_only": 1})
         self.assertEqual(len(res.data), 1)
+        self.assertEqual(res.data[0]["recipe_count"], 2)
+
+    def test_list_one_query(self):
+        """
+        Test the list and its recipe counts take a single query
+        """
+        for number in range(5):
+            recipe = Recipe.objects.create(
+                title=f"Recipe {number}",
+                time_minutes=5,
+                price=Decimal("3.00"),
+                user=self.user,
+            )
+            recipe.ingredients.add(
+                Ingredient.objects.create(user=self.user, name=f"{number}"))
+
+        with self.assertNumQueries(1):
+            res = self.client.get(INGREDIENTS_URL, {"assigned_only": 1})
+
+        self.assertEqual(len(res.data), 5)
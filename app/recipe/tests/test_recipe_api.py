@@ -4,6 +4,7 @@ tests for recipe api
 from decimal import Decimal
 import tempfile
 import os
+from unittest import mock
 
 from PIL import Image
 
@@ -12,7 +13,7 @@ from django.test import TestCase
 from django.urls import reverse
 
 from rest_framework import status
-from rest_framework.test import APIClient
+from rest_framework.test import APIClient, APIRequestFactory
 
 from core.models import (
     Recipe,
@@ -37,6 +38,9 @@ def detail_url(recipe_id):
     return reverse("recipe:recipe-detail", args=[recipe_id])
 
 
+BULK_URL = reverse("recipe:recipe-bulk")
+
+
 def image_upload_url(recipe_id):
     """
     Return url for recipe image upload
@@ -105,6 +109,27 @@ class PrivateRecipeApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
 
+    def test_list_query_count(self):
+        """
+        Test listing recipes takes the same queries however many recipes
+        and tags they have
+        """
+        for number in range(10):
+            recipe = create_recipe(user=self.user, title=f"Recipe {number}")
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f"Tag {number}"))
+            recipe.ingredients.add(Ingredient.objects.create(
+                user=self.user, name=f"Ingredient {number}"))
+
+        # recipes, then their tags and their ingredients
+        with self.assertNumQueries(3):
+            res = self.client.get(RECIPES_URL)
+        self.assertEqual(len(res.data), 10)
+
+        with self.assertNumQueries(3):
+            res = self.client.get(detail_url(recipe.id))
+        self.assertEqual(res.data["tags"][0]["name"], "Tag 9")
+
     def test_recipes_limited_to_user(self):
         """
         Test retrieving recipes for user
@@ -478,6 +503,320 @@ class PrivateRecipeApiTests(TestCase):
         self.assertIn(serializer2.data, res.data)
         self.assertNotIn(serializer3.data, res.data)
 
+    def test_filter_lists_each_recipe_once(self):
+        """
+        Test a recipe with several of the filtered tags is returned once
+        """
+        recipe = create_recipe(user=self.user)
+        tag1 = Tag.objects.create(user=self.user, name="vegan")
+        tag2 = Tag.objects.create(user=self.user, name="quick")
+        recipe.tags.add(tag1, tag2)
+
+        res = self.client.get(RECIPES_URL, {"tags": f"{tag1.id},{tag2.id}"})
+
+        self.assertEqual([item["id"] for item in res.data], [recipe.id])
+
+    def test_filter_match_all(self):
+        """
+        Test match=all only returns recipes with every tag and
+        ingredient
+        """
+        tag1 = Tag.objects.create(user=self.user, name="vegan")
+        tag2 = Tag.objects.create(user=self.user, name="quick")
+        lime = Ingredient.objects.create(user=self.user, name="lime")
+        both = create_recipe(user=self.user, title="Lime noodles")
+        both.tags.add(tag1, tag2)
+        both.ingredients.add(lime)
+        one_tag = create_recipe(user=self.user, title="Lime curry")
+        one_tag.tags.add(tag1)
+        one_tag.ingredients.add(lime)
+        no_lime = create_recipe(user=self.user, title="Noodles")
+        no_lime.tags.add(tag1, tag2)
+        params = {"tags": f"{tag1.id},{tag2.id}", "ingredients": lime.id}
+
+        res = self.client.get(RECIPES_URL, {**params, "match": "all"})
+        self.assertEqual([item["id"] for item in res.data], [both.id])
+
+        res = self.client.get(RECIPES_URL, params)
+        self.assertEqual(
+            [item["id"] for item in res.data], [one_tag.id, both.id])
+
+    def test_filter_invalid_match(self):
+        """
+        Test an unknown match mode is rejected
+        """
+        res = self.client.get(RECIPES_URL, {"tags": "1", "match": "some"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data, {"match": ["Must be any or all."]})
+
+
+class RecipeSerializerQueryTests(TestCase):
+    """
+    Test saving tags and ingredients takes a fixed number of queries
+    """
+    def setUp(self):
+        self.user = create_user(
+            email="test@example.com",
+            password="test123"
+        )
+        request = APIRequestFactory().post(RECIPES_URL)
+        request.user = self.user
+        self.context = {"request": request}
+        self.ingredients = [{"name": f"ingredient {n}"} for n in range(30)]
+
+    def save(self, payload, instance=None):
+        """
+        Validate and save payload with the recipe serializer
+        """
+        serializer = RecipeSerializer(
+            instance, data=payload, context=self.context,
+            partial=instance is not None
+        )
+        serializer.is_valid(raise_exception=True)
+        return serializer.save(user=self.user)
+
+    def test_create_queries(self):
+        """
+        Test creating a recipe with 30 ingredients and some existing tags
+        does not query per item
+        """
+        Tag.objects.create(user=self.user, name="Dinner")
+        payload = {
+            "title": "Big salad",
+            "time_minutes": 20,
+            "price": Decimal("8.00"),
+            "tags": [{"name": "Dinner"}, {"name": "Vegan"}],
+            "ingredients": self.ingredients,
+        }
+
+        # savepoint, recipe, and per relation: names, new rows,
+        # through rows, then the release
+        with self.assertNumQueries(9):
+            recipe = self.save(payload)
+
+        self.assertEqual(recipe.ingredients.count(), 30)
+        self.assertEqual(
+            sorted(recipe.tags.values_list("name", flat=True)),
+            ["Dinner", "Vegan"]
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_update_only_changes_diff(self):
+        """
+        Test updating ingredients only writes the through rows that
+        changed
+        """
+        recipe = self.save({
+            "title": "Big salad",
+            "time_minutes": 20,
+            "price": Decimal("8.00"),
+            "ingredients": self.ingredients,
+        })
+        through = Recipe.ingredients.through
+        kept_rows = set(through.objects.filter(
+            recipe=recipe,
+            ingredient__name__in=["ingredient 2", "ingredient 29"]
+        ).values_list("id", flat=True))
+        ingredients = self.ingredients[2:] + [{"name": "lemon"}]
+
+        # savepoint, names, new ingredient, current rows, delete, insert,
+        # recipe, release
+        with self.assertNumQueries(8):
+            self.save({"ingredients": ingredients}, recipe)
+
+        names = set(recipe.ingredients.values_list("name", flat=True))
+        self.assertEqual(names, {item["name"] for item in ingredients})
+        self.assertTrue(kept_rows <= set(
+            through.objects.values_list("id", flat=True)))
+
+    def test_update_unchanged(self):
+        """
+        Test saving the same tags again writes no through rows
+        """
+        recipe = self.save({
+            "title": "Big salad",
+            "time_minutes": 20,
+            "price": Decimal("8.00"),
+            "tags": [{"name": "Dinner"}],
+        })
+
+        # savepoint, names, current rows, recipe, release
+        with self.assertNumQueries(5):
+            self.save({"tags": [{"name": "Dinner"}]}, recipe)
+
+        self.assertEqual(recipe.tags.count(), 1)
+
+    def test_duplicate_names(self):
+        """
+        Test a name given twice is only created and assigned once
+        """
+        recipe = self.save({
+            "title": "Big salad",
+            "time_minutes": 20,
+            "price": Decimal("8.00"),
+            "ingredients": [{"name": "Lime"}, {"name": "Lime"}],
+        })
+
+        self.assertEqual(recipe.ingredients.count(), 1)
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user, name="Lime").count(), 1)
+
+
+class BulkRecipeApiTests(TestCase):
+    """
+    Test writing many recipes in one request
+    """
+    def setUp(self):
+        self.user = create_user(
+            email="test@example.com",
+            password="test123"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def payload(self, number, **params):
+        """
+        A recipe to import
+        """
+        defaults = {
+            "title": f"Recipe {number}",
+            "time_minutes": 10,
+            "price": "5.00",
+            "tags": [{"name": "Dinner"}],
+            "ingredients": [
+                {"name": "lime"}, {"name": f"ingredient {number}"}],
+        }
+        defaults.update(params)
+        return defaults
+
+    def test_create(self):
+        """
+        Test valid recipes are created and invalid ones reported by index
+        """
+        dinner = Tag.objects.create(user=self.user, name="Dinner")
+        payload = [self.payload(0), self.payload(1, title=""), self.payload(2)]
+
+        res = self.client.post(BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(
+            [(item["index"], item["status"]) for item in res.data],
+            [(0, 201), (1, 400), (2, 201)]
+        )
+        self.assertIn("title", res.data[1]["errors"])
+        recipe = Recipe.objects.get(id=res.data[2]["id"])
+        self.assertEqual(recipe.title, "Recipe 2")
+        self.assertEqual(list(recipe.tags.all()), [dinner])
+        self.assertEqual(
+            sorted(recipe.ingredients.values_list("name", flat=True)),
+            ["ingredient 2", "lime"]
+        )
+        self.assertEqual(
+            Ingredient.objects.filter(user=self.user, name="lime").count(), 1)
+
+    def test_create_query_count(self):
+        """
+        Test an import takes the same queries however many recipes it has
+        """
+        payload = [self.payload(number) for number in range(50)]
+
+        # savepoint, recipes, and per relation: names, new rows,
+        # through rows, then the release
+        with self.assertNumQueries(9):
+            res = self.client.post(BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 50)
+
+    def test_update(self):
+        """
+        Test recipes are updated by id, leaving out other users' recipes
+        """
+        recipe1 = create_recipe(user=self.user, title="Old 1")
+        recipe2 = create_recipe(user=self.user, title="Old 2")
+        recipe2.tags.add(Tag.objects.create(user=self.user, name="Lunch"))
+        other = create_recipe(user=create_user(
+            email="other@example.com", password="test123"))
+        payload = [
+            {"id": recipe1.id, "title": "New 1"},
+            {"id": recipe2.id, "price": "9.50", "tags": [{"name": "Dinner"}]},
+            {"id": other.id, "title": "Mine now"},
+            {"id": recipe1.id, "title": "Again"},
+        ]
+
+        res = self.client.patch(BULK_URL, payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(
+            [item["status"] for item in res.data], [200, 200, 404, 400])
+        recipe1.refresh_from_db()
+        recipe2.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(recipe1.title, "New 1")
+        self.assertEqual(recipe2.title, "Old 2")
+        self.assertEqual(recipe2.price, Decimal("9.50"))
+        self.assertEqual(
+            list(recipe2.tags.values_list("name", flat=True)), ["Dinner"])
+        self.assertEqual(other.title, "Sample recipe")
+
+    def test_delete(self):
+        """
+        Test recipes are deleted by id, leaving out other users' recipes
+        """
+        recipe = create_recipe(user=self.user)
+        other = create_recipe(user=create_user(
+            email="other@example.com", password="test123"))
+
+        res = self.client.delete(
+            BULK_URL, [recipe.id, other.id], format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual([item["status"] for item in res.data], [200, 404])
+        self.assertFalse(Recipe.objects.filter(id=recipe.id).exists())
+        self.assertTrue(Recipe.objects.filter(id=other.id).exists())
+
+    def test_boolean_ids_rejected(self):
+        """
+        Test true is not taken as the id 1
+        """
+        recipe = create_recipe(user=self.user, id=1, title="Kept")
+
+        res = self.client.patch(
+            BULK_URL, [{"id": True, "title": "Changed"}], format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("id", res.data[0]["errors"])
+
+        res = self.client.delete(BULK_URL, [True], format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("id", res.data[0]["errors"])
+
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, "Kept")
+
+    def test_all_invalid(self):
+        """
+        Test nothing is written when no item is valid
+        """
+        res = self.client.post(
+            BULK_URL, [self.payload(0, price="free")], format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_too_many_items(self):
+        """
+        Test requests must be a list no longer than the limit
+        """
+        with mock.patch("recipe.views.MAX_ITEMS", 2):
+            res = self.client.post(
+                BULK_URL, [self.payload(n) for n in range(3)], format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        res = self.client.post(BULK_URL, self.payload(0), format="json")
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Recipe.objects.exists())
+
 
 class ImageUploadTests(TestCase):
     """
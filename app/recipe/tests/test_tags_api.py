@@ -3,6 +3,7 @@ test for tags api
 """
 from decimal import Decimal
 from django.contrib.auth import get_user_model
+from django.db.models import Count
 from django.urls import reverse
 from django.test import TestCase
 
@@ -13,7 +14,7 @@ from core.models import (
     Tag,
     Recipe,
     )
-from recipe.serializers import TagSerializer
+from recipe.serializers import TagCountSerializer
 
 
 TAGS_URL = reverse('recipe:tag-list')
@@ -66,8 +67,9 @@ class PrivateTagsApiTests(TestCase):
         Tag.objects.create(user=self.user, name="Vegan")
         Tag.objects.create(user=self.user, name="Dessert")
         res = self.client.get(TAGS_URL)
-        tags = Tag.objects.all().order_by("-name")
-        serializer = TagSerializer(tags, many=True)
+        tags = Tag.objects.annotate(
+            recipe_count=Count("recipe")).order_by("-name")
+        serializer = TagCountSerializer(tags, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
 
@@ -122,10 +124,11 @@ class PrivateTagsApiTests(TestCase):
         )
         recipe.tags.add(tag1)
         res = self.client.get(TAGS_URL, {"assigned_only": 1})
-        serializer1 = TagSerializer(tag1)
-        serializer2 = TagSerializer(tag2)
-        self.assertIn(serializer1.data, res.data)
-        self.assertNotIn(serializer2.data, res.data)
+        self.assertEqual(
+            [(item["id"], item["recipe_count"]) for item in res.data],
+            [(tag1.id, 1)]
+        )
+        self.assertNotIn(tag2.id, [item["id"] for item in res.data])
 
     def test_filter_tags_assigned_unique(self):
         """
@@ -149,3 +152,23 @@ class PrivateTagsApiTests(TestCase):
         recipe2.tags.add(tag)
         res = self.client.get(TAGS_URL, {"assigned_only": 1})
         self.assertEqual(len(res.data), 1)
+        self.assertEqual(res.data[0]["recipe_count"], 2)
+
+    def test_list_one_query(self):
+        """
+        Test the list and its recipe counts take a single query
+        """
+        for number in range(5):
+            recipe = Recipe.objects.create(
+                title=f"Recipe {number}",
+                time_minutes=5,
+                price=Decimal("3.00"),
+                user=self.user,
+            )
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, name=f"{number}"))
+
+        with self.assertNumQueries(1):
+            res = self.client.get(TAGS_URL, {"assigned_only": 1})
+
+        self.assertEqual(len(res.data), 5)
@@ -7,8 +7,10 @@ from drf_spectacular.utils import (
     OpenApiParameter,
     OpenApiTypes
 )
+from django.db.models import Count, Exists, OuterRef
 from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
@@ -19,6 +21,12 @@ from core.models import (
     Ingredient
 )
 from recipe import serializers
+from recipe.bulk import (
+    MAX_ITEMS,
+    create_recipes,
+    delete_recipes,
+    update_recipes
+)
 
 
 @extend_schema_view(
@@ -37,6 +45,13 @@ from recipe import serializers
                 # location=OpenApiParameter.QUERY,
                 description="Filter by ingredients(commas separated)",
             ),
+            OpenApiParameter(
+                name="match",
+                type=OpenApiTypes.STR,
+                enum=["any", "all"],
+                description="Recipes with any (default) or all of the "
+                            "tags and ingredients",
+            ),
         ]
     ),
 
@@ -56,24 +71,49 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """
         return [int(str_id) for str_id in qs.split(",")]
 
+    def _filter_related(self, queryset, through, target, ids, match):
+        """
+        Filter recipes by EXISTS on a through table rather than a join,
+        so no recipe is listed twice. With match=all, a recipe needs
+        every one of the ids in its target column
+        """
+        rows = through.objects.all()
+        if match == "all":
+            for related_id in set(ids):
+                queryset = queryset.filter(Exists(rows.filter(
+                    recipe_id=OuterRef("pk"), **{target: related_id})))
+            return queryset
+        return queryset.filter(Exists(rows.filter(
+            recipe_id=OuterRef("pk"), **{f"{target}__in": ids})))
+
     def get_queryset(self):
         """
         Return objects for the current authenticated user only
         """
         tags = self.request.query_params.get("tags")
         ingredients = self.request.query_params.get("ingredients")
+        match = self.request.query_params.get("match", "any")
+        if match not in ("any", "all"):
+            raise ValidationError({"match": ["Must be any or all."]})
         queryset = self.queryset
 
         if tags:
             tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            queryset = self._filter_related(
+                queryset, Recipe.tags.through, "tag_id", tag_ids, match)
 
         if ingredients:
             ing_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ing_ids)
+            queryset = self._filter_related(
+                queryset, Recipe.ingredients.through, "ingredient_id",
+                ing_ids, match
+            )
 
+        # tags and ingredients are nested in every recipe, so they are
+        # fetched for all the listed recipes in one query each
         return queryset.filter(user=self.request.user) \
-            .order_by("-id").distinct()
+            .prefetch_related("tags", "ingredients") \
+            .order_by("-id")
 
     def get_serializer_class(self):
         """
@@ -83,6 +123,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return serializers.RecipeSerializer
         elif self.action == "upload_image":
             return serializers.RecipeImageSerializer
+        elif self.action == "bulk":
+            return serializers.RecipeBulkSerializer
         return self.serializer_class
 
     def perform_create(self, serializer):
@@ -91,6 +133,31 @@ class RecipeViewSet(viewsets.ModelViewSet):
         """
         serializer.save(user=self.request.user)
 
+    @extend_schema(
+        request=serializers.RecipeBulkSerializer(many=True),
+        description="Create (POST), update (PATCH, items with their id) "
+                    "or delete (DELETE, a list of ids) up to "
+                    f"{MAX_ITEMS} recipes in one transaction. Returns "
+                    "the status of each item",
+    )
+    @action(
+        methods=["POST", "PATCH", "DELETE"], detail=False, url_path="bulk")
+    def bulk(self, request):
+        """
+        Write many recipes at once
+        """
+        items = request.data
+        if not isinstance(items, list) or len(items) > MAX_ITEMS:
+            raise ValidationError({"non_field_errors": [
+                f"Expected a list of at most {MAX_ITEMS} items."]})
+        write = {
+            "POST": create_recipes,
+            "PATCH": update_recipes,
+            "DELETE": delete_recipes,
+        }[request.method]
+        results, code = write(items, self.get_serializer_context())
+        return Response(results, status=code)
+
     @action(methods=["POST"], detail=True, url_path="upload-image")
     def upload_image(self, request, pk=None):
         """
@@ -150,10 +217,14 @@ class BaseRecipeAttrViewSet(
             )
         queryset = self.queryset
         if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+            queryset = queryset.filter(Exists(self.through.objects.filter(
+                **{self.through_field: OuterRef("pk")})))
 
+        # recipe_count is grouped in the same query, from the through
+        # rows only
         return queryset.filter(user=self.request.user) \
-            .order_by("-name").distinct()
+            .annotate(recipe_count=Count("recipe")) \
+            .order_by("-name")
 
     # do i need this?
     def perform_create(self, serializer):
@@ -169,8 +240,10 @@ class TagViewSet(
     """
     Manage tags in the database
     """
-    serializer_class = serializers.TagSerializer
+    serializer_class = serializers.TagCountSerializer
     queryset = Tag.objects.all()
+    through = Recipe.tags.through
+    through_field = "tag_id"
 
 
 class IngredientViewSet(
@@ -179,5 +252,7 @@ class IngredientViewSet(
     """
     Manage ingredients in the database
     """
-    serializer_class = serializers.IngredientSerializer
+    serializer_class = serializers.IngredientCountSerializer
     queryset = Ingredient.objects.all()
+    through = Recipe.ingredients.through
+    through_field = "ingredient_id"
@@ -0,0 +1,115 @@
+"""
+Disk cache of resized images, evicting the least recently used
+
+Thumbnails are stored at a path built from the validated sizes, which
+is the path nginx tries before it passes a request on to the app when
+the query params are spelled the canonical way (?w=300&fmt=jpeg):
+
+    <THUMBNAIL_ROOT>/<fmt>/<w>x<h>/<source path>.<fmt>
+
+A file's mtime is its last use. The app touches it on every hit, and
+once the files add up to more than THUMBNAIL_CACHE_MAX_BYTES the
+oldest are removed until they are back under LOW_WATER of the limit.
+Hits nginx serves itself don't touch the file, so a popular thumbnail
+can be evicted and is then made again on its next request.
+"""
+import functools
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+
+
+LOW_WATER = 0.9
+
+
+class ThumbnailCache:
+    """
+    Thumbnails under root, at most max_bytes in total. Safe to use from
+    several threads, and from several processes sharing root
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        # bytes under root, counted on the first write
+        self.total = None
+
+    def path(self, source, image_format, width=None, height=None):
+        """path of the thumbnail of source at a size and format"""
+        size = f'{width or ""}x{height or ""}'
+        return os.path.join(
+            self.root, image_format, size, f'{source}.{image_format}')
+
+    def get(self, path):
+        """path marked as just used, or None when it is not cached"""
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def files(self):
+        """(mtime, size, path) of every cached file"""
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    # evicted by another process
+                    continue
+                yield stat.st_mtime, stat.st_size, path
+
+    def put(self, path, content):
+        """stores content at path, evicting old files to make room"""
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix='.')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                file.write(content)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+        with self.lock:
+            if self.total is None:
+                self.total = sum(size for _, size, _ in self.files())
+            else:
+                self.total += len(content)
+            if self.total > self.max_bytes:
+                self.evict()
+
+    def evict(self):
+        """
+        removes the least recently used files until the cache is under
+        LOW_WATER of its limit. The total is counted again first, as
+        other processes write to the same directory
+        """
+        files = sorted(self.files())
+        self.total = sum(size for _, size, _ in files)
+        target = self.max_bytes * LOW_WATER
+        for _, size, path in files:
+            if self.total <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            self.total -= size
+
+
+@functools.lru_cache(maxsize=None)
+def cache_for(root, max_bytes):
+    """one ThumbnailCache per directory, so its total is kept"""
+    return ThumbnailCache(root, max_bytes)
+
+
+def get_thumbnail_cache():
+    """the cache configured in settings"""
+    return cache_for(
+        settings.THUMBNAIL_ROOT, settings.THUMBNAIL_CACHE_MAX_BYTES)
@@ -0,0 +1,43 @@
+"""
+Resizing uploaded images to the size a client asks for
+"""
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from core.images import MAX_PIXELS, encode, fit_size
+
+
+MAX_DIMENSION = 2048
+CONTENT_TYPES = {'jpeg': 'image/jpeg', 'webp': 'image/webp'}
+# exif orientations that turn the picture a quarter turn
+QUARTER_TURNS = (5, 6, 7, 8)
+EXIF_ORIENTATION = 0x0112
+
+
+def resize(file, width=None, height=None, image_format='jpeg'):
+    """
+    the image in file scaled down, keeping its shape, to fit width and
+    height (either may be None) and encoded in image_format. Images are
+    never scaled up. Returns None when the file is not an image or is
+    too big to decode
+    """
+    bounds = (width or MAX_DIMENSION, height or MAX_DIMENSION)
+    try:
+        image = Image.open(file)
+        if image.width * image.height > MAX_PIXELS:
+            return None
+        # the bounds apply after exif_transpose, so JPEGs that are turned
+        # upright are decoded against the bounds turned the other way
+        stored_bounds = bounds[::-1] \
+            if image.getexif().get(EXIF_ORIENTATION) in QUARTER_TURNS \
+            else bounds
+        image.draft('RGB', fit_size(image.size, stored_bounds))
+        image.load()
+        image = ImageOps.exif_transpose(image)
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        return None
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    size = fit_size(image.size, bounds)
+    if size != image.size:
+        image = image.resize(size, Image.Resampling.LANCZOS)
+    return encode(image, image_format)
@@ -0,0 +1,191 @@
+"""
+tests for the thumbnails api
+"""
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from PIL import Image
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.images import variant_formats
+from thumbnails import views
+from thumbnails.cache import ThumbnailCache
+
+
+SOURCE = "uploads/recipe/pasta.jpg"
+
+
+def thumbnail_url(source):
+    """
+    Return url for the thumbnail of an upload
+    """
+    return reverse("thumbnails:thumbnail", args=[source])
+
+
+def size_of(content):
+    """
+    Width and height of encoded image bytes
+    """
+    return Image.open(BytesIO(content)).size
+
+
+class ThumbnailApiTests(SimpleTestCase):
+    """
+    Test resizing uploads on request
+    """
+    def setUp(self):
+        self.client = APIClient()
+        self.media_root = tempfile.mkdtemp()
+        self.thumbnail_root = tempfile.mkdtemp()
+        self.settings = override_settings(
+            MEDIA_ROOT=self.media_root,
+            THUMBNAIL_ROOT=self.thumbnail_root
+        )
+        self.settings.enable()
+
+        path = os.path.join(self.media_root, SOURCE)
+        os.makedirs(os.path.dirname(path))
+        Image.linear_gradient("L").resize((1200, 800)).convert("RGB") \
+            .save(path, "JPEG")
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.media_root)
+        shutil.rmtree(self.thumbnail_root)
+
+    def test_resize_to_width(self):
+        """
+        Test a thumbnail keeps the upload's shape and can be cached for
+        a year
+        """
+        res = self.client.get(thumbnail_url(SOURCE), {"w": 300})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "image/jpeg")
+        self.assertIn("max-age=31536000", res["Cache-Control"])
+        self.assertIn("immutable", res["Cache-Control"])
+        self.assertEqual(size_of(res.content), (300, 200))
+
+    def test_fit_in_box_without_upscaling(self):
+        """
+        Test both bounds are kept to and small uploads are not enlarged
+        """
+        res = self.client.get(thumbnail_url(SOURCE), {"w": 400, "h": 100})
+        self.assertEqual(size_of(res.content), (150, 100))
+
+        res = self.client.get(thumbnail_url(SOURCE), {"w": 2000})
+        self.assertEqual(size_of(res.content), (1200, 800))
+
+    def test_cached_after_first_request(self):
+        """
+        Test the thumbnail is stored where nginx looks for it and is not
+        made again
+        """
+        first = self.client.get(thumbnail_url(SOURCE), {"w": 300})
+        cached = os.path.join(
+            self.thumbnail_root, "jpeg", "300x", f"{SOURCE}.jpeg")
+        self.assertTrue(os.path.exists(cached))
+
+        with mock.patch.object(views, "resize") as resize:
+            second = self.client.get(thumbnail_url(SOURCE), {"w": 300})
+
+        resize.assert_not_called()
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(second.streaming_content), first.content)
+        self.assertIn("immutable", second["Cache-Control"])
+
+    def test_equivalent_params_share_file(self):
+        """
+        Test params spelled differently for the same size are cached once
+        """
+        self.client.get(thumbnail_url(SOURCE), {"w": 300})
+
+        for params in ({"w": "0300"}, {"w": 300, "h": ""}):
+            with self.subTest(params=params):
+                with mock.patch.object(views, "resize") as resize:
+                    res = self.client.get(thumbnail_url(SOURCE), params)
+                resize.assert_not_called()
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            os.listdir(os.path.join(self.thumbnail_root, "jpeg")), ["300x"])
+
+    def test_webp(self):
+        """
+        Test thumbnails can be encoded as WebP
+        """
+        if "webp" not in variant_formats():
+            self.skipTest("Pillow is built without WebP")
+        res = self.client.get(thumbnail_url(SOURCE), {"w": 300, "fmt": "webp"})
+
+        self.assertEqual(res["Content-Type"], "image/webp")
+        self.assertEqual(Image.open(BytesIO(res.content)).format, "WEBP")
+
+    def test_invalid_params(self):
+        """
+        Test sizes out of range and unknown formats are rejected
+        """
+        for params in ({"w": 0}, {"h": "big"}, {"w": 5000}, {"fmt": "gif"}):
+            with self.subTest(params=params):
+                res = self.client.get(thumbnail_url(SOURCE), params)
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertIn(next(iter(params)), res.json())
+
+    def test_only_uploads(self):
+        """
+        Test only existing images in the upload directories are served
+        """
+        not_image = os.path.join(
+            self.media_root, "uploads", "recipe", "notes.txt")
+        with open(not_image, "w") as file:
+            file.write("not an image")
+
+        for source in (
+            "uploads/recipe/missing.jpg",
+            "uploads/recipe/notes.txt",
+            "uploads/recipe/../../secret.jpg",
+            "other/pasta.jpg",
+        ):
+            with self.subTest(source=source):
+                res = self.client.get(thumbnail_url(source), {"w": 300})
+                self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ThumbnailCacheTests(SimpleTestCase):
+    """
+    Test the size of the thumbnail cache is bounded
+    """
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_least_recently_used_evicted(self):
+        """
+        Test the files used longest ago are removed once the cache is
+        over its limit
+        """
+        cache = ThumbnailCache(self.root, max_bytes=250)
+        paths = [cache.path(f"uploads/recipe/{number}.jpg", "jpeg", 100)
+                 for number in range(3)]
+        for age, path in zip((30, 20), paths):
+            cache.put(path, b"x" * 100)
+            os.utime(path, (0, 1000 - age))
+        # the oldest is used again, so the second is the least recent
+        self.assertEqual(cache.get(paths[0]), paths[0])
+
+        cache.put(paths[2], b"x" * 100)
+
+        self.assertTrue(os.path.exists(paths[0]))
+        self.assertFalse(os.path.exists(paths[1]))
+        self.assertTrue(os.path.exists(paths[2]))
+        self.assertEqual(cache.total, 200)
+        self.assertIsNone(cache.get(paths[1]))
@@ -0,0 +1,13 @@
+"""
+URL mappings for the thumbnails app.
+"""
+from django.urls import path
+
+from thumbnails import views
+
+
+app_name = 'thumbnails'
+
+urlpatterns = [
+    path('<path:source>', views.thumbnail, name='thumbnail'),
+]
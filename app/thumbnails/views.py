@@ -0,0 +1,86 @@
+"""
+views for on-demand thumbnails of uploaded images
+"""
+import os
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_GET
+
+from core.images import variant_formats
+from thumbnails.cache import get_thumbnail_cache
+from thumbnails.resize import CONTENT_TYPES, MAX_DIMENSION, resize
+
+
+# Recipe.image and BlogImage uploads
+SOURCE_DIRS = ('uploads/recipe/', 'uploads/blog-recipe/')
+# uploads get unique names, so a thumbnail url never changes content
+CACHE_SECONDS = 60 * 60 * 24 * 365
+
+
+def parse_params(params):
+    """
+    (width, height, format) from the query params, or a dict of errors
+    """
+    errors = {}
+    sizes = []
+    for name in ('w', 'h'):
+        value = params.get(name)
+        try:
+            size = int(value) if value else None
+        except ValueError:
+            size = 0
+        if size is not None and not 1 <= size <= MAX_DIMENSION:
+            errors[name] = [
+                f'Must be a whole number from 1 to {MAX_DIMENSION}.']
+        sizes.append(size)
+    image_format = params.get('fmt') or 'jpeg'
+    if image_format not in variant_formats():
+        errors['fmt'] = [
+            f'Must be one of {", ".join(variant_formats())}.']
+    if errors:
+        return errors
+    return sizes[0], sizes[1], image_format
+
+
+def cached_response(response):
+    """response marked as cacheable for a year by browsers and proxies"""
+    patch_cache_control(
+        response, public=True, max_age=CACHE_SECONDS, immutable=True)
+    return response
+
+
+@require_GET
+def thumbnail(request, source):
+    """
+    The uploaded image at source (a path under MEDIA_ROOT) scaled down
+    to fit ?w= and ?h= and encoded as ?fmt= (jpeg by default). Made on
+    the first request and read from the thumbnail cache after that
+    """
+    source = os.path.normpath(source)
+    if not source.startswith(SOURCE_DIRS):
+        raise Http404
+    params = parse_params(request.GET)
+    if isinstance(params, dict):
+        return JsonResponse(params, status=400)
+    width, height, image_format = params
+    content_type = CONTENT_TYPES[image_format]
+
+    cache = get_thumbnail_cache()
+    # keyed by the parsed sizes, so w=100, w=0100 and w=100&h= share a
+    # file. nginx tries the raw params and finds the canonical spellings
+    path = cache.path(source, image_format, width, height)
+    if cache.get(path):
+        return cached_response(
+            FileResponse(open(path, 'rb'), content_type=content_type))
+
+    try:
+        with open(os.path.join(settings.MEDIA_ROOT, source), 'rb') as file:
+            content = resize(file, width, height, image_format)
+    except (FileNotFoundError, IsADirectoryError):
+        raise Http404
+    if content is None:
+        raise Http404
+    cache.put(path, content)
+    return cached_response(HttpResponse(content, content_type=content_type))
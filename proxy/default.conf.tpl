@@ -5,9 +5,23 @@ server {
         alias /vol/static;
     }
 
+    # thumbnails the app has already made are served from its cache,
+    # the rest are passed to the app to make
+    location ~ ^/v1/api/thumbnails/(?<source>uploads/.+)$ {
+        root                    /vol/static/thumbnails;
+        try_files               /${arg_fmt}/${arg_w}x${arg_h}/${source}.${arg_fmt} @app;
+        add_header              Cache-Control "public, max-age=31536000, immutable";
+    }
+
     location / {
         uwsgi_pass              ${APP_HOST}:${APP_PORT};
         include                 /etc/nginx/uwsgi_params;
         client_max_body_size    10M;
     }
+
+    location @app {
+        uwsgi_pass              ${APP_HOST}:${APP_PORT};
+        include                 /etc/nginx/uwsgi_params;
+        client_max_body_size    10M;
+    }
 }